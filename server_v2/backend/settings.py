@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     
     # Local apps
     'authentication',
+    'gmail',
     'job_applications',
 ]
 
@@ -173,6 +174,29 @@ OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 # Email parsing settings
 USE_OPENAI_FALLBACK = True
 
+# LLM fallback extraction, used when regex extraction finds nothing.
+# BASE_URL may point at any OpenAI-compatible API, e.g. benchmarks.llm_stub
+LLM_EXTRACTOR = {
+    'BASE_URL': os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1'),
+    'MODEL': os.environ.get('OPENAI_MODEL', 'gpt-3.5-turbo'),
+    'BATCH_SIZE': 8,  # emails per prompt
+    'MAX_CONCURRENCY': 4,  # requests in flight per process
+    'TIMEOUT': 20,  # seconds per request
+    'FAILURE_THRESHOLD': 5,  # consecutive failures that open the circuit
+    'RESET_TIMEOUT': 60,  # seconds before a trial request after opening
+}
+
+# Extraction pipeline overrides per parser ('gmail', 'job_applications'):
+# 'STAGES' lists stage names in the order they run (see
+# gmail.extraction.available_stages()), 'CONFIDENCE_THRESHOLD' is the score
+# above which the fallback stage is skipped. Parsers' defaults apply otherwise.
+EMAIL_EXTRACTION_PIPELINES = {}
+
+# Extra keywords for email parsing, per category ('title', 'seniority',
+# 'company_suffix'), added to the defaults in gmail/keywords.py. Matching
+# time does not grow with the vocabulary size.
+EMAIL_KEYWORDS = {}
+
 # NLP settings
 SPACY_MODEL = 'en_core_web_sm'
 
@@ -196,7 +220,7 @@ GMAIL_API_SCOPES = [
 # Cache settings
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': 'redis://redis:6379/1',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -207,6 +231,17 @@ CACHES = {
 # Cache timeout in seconds (5 minutes)
 CACHE_TIMEOUT = 300
 
+# Minimum seconds between two ApplicationMetrics snapshots of a user (1 hour);
+# unchanged metrics are never stored again. 0 stores every change.
+APPLICATION_METRICS_SNAPSHOT_INTERVAL = 3600
+
+# Gmail API quota (units per second) shared by all worker processes via CACHES
+GMAIL_USER_QUOTA_UNITS_PER_SECOND = 250
+GMAIL_PROJECT_QUOTA_UNITS_PER_SECOND = 20000
+
+# HTML-to-text backend for email bodies: 'html.parser' (stdlib) or 'lxml' (if installed)
+EMAIL_HTML_TEXT_BACKEND = 'html.parser'
+
 # Logging configuration
 LOGGING = {
     'version': 1,
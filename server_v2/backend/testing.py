@@ -0,0 +1,7 @@
+"""Settings shared by the test suites and benchmarks."""
+
+# Local-memory stand-in for the Redis cache in CACHES, for use with override_settings;
+# its contents are shared by every user, so clear it where leftovers would matter
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+}
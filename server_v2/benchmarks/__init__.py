@@ -0,0 +1,12 @@
+"""Offline benchmarks for the server.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the
+``server_v2`` directory and prints its results to stdout.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
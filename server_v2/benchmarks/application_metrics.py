@@ -0,0 +1,120 @@
+"""Benchmark MetricsService.calculate_metrics as applications grow.
+
+Creates a throwaway database and, for each ``--sizes`` value, a user owning
+that many applications, then compares:
+
+- the previous implementation, which loads the responded applications and
+  then every application into Python to average response times and rank
+  companies;
+- the database-side implementation, with grouped queries.
+
+Reports queries, milliseconds and peak Python memory per call, checks both
+return the same metrics, and counts the snapshots ``--repeat`` calls store.
+
+Usage:
+    python -m benchmarks.application_metrics [--sizes 1000,10000,100000]
+        [--repeat 3]
+"""
+
+import argparse
+import logging
+import tracemalloc
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from job_applications.models import ApplicationMetrics, JobApplication
+from job_applications.services.metrics_service import MetricsService
+from job_applications.services.stats_rollup import StatsRollupService
+
+from .fake_applications import create_applications, create_user, temporary_database
+from .fake_gmail import timed
+
+
+def python_loop_metrics(user, metrics: dict) -> dict:
+    """Average response time and company rankings computed in Python, as before.
+
+    Takes the rollup-based counts from ``metrics`` and recomputes the rest.
+    """
+    applications = JobApplication.objects.filter(user=user)
+    total_seconds = 0.0
+    count = 0
+    for app in applications.exclude(status='applied'):
+        delta = app.last_updated - app.application_date
+        if delta.total_seconds() >= 0:
+            total_seconds += delta.total_seconds()
+            count += 1
+    avg_response_time = round(total_seconds / 86400 / count if count > 0 else 0.0, 2)
+
+    company_stats = defaultdict(lambda: {'total': 0, 'responded': 0})
+    for app in applications:
+        company_stats[app.company_name]['total'] += 1
+        if app.status != 'applied':
+            company_stats[app.company_name]['responded'] += 1
+    company_rates = {
+        company: {
+            'response_rate': round((stats['responded'] / stats['total']) * 100, 2),
+            'total_applications': stats['total']
+        }
+        for company, stats in company_stats.items()
+        if stats['total'] >= 2
+    }
+    sorted_companies = sorted(company_rates.items(), key=lambda x: (-x[1]['response_rate'], x[0]))
+    return dict(metrics, avg_response_time=avg_response_time,
+                best_companies=dict(sorted_companies[:3]), worst_companies=dict(sorted_companies[-3:]))
+
+
+def measure(name: str, func):
+    """Run ``func`` twice, printing its queries and time, then its peak traced memory.
+
+    Memory is traced in the second run only, as tracing slows Python down.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        result, elapsed = timed(func)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'  {name:<22}{len(queries):>9}{elapsed * 1000:>12.1f}{peak / 1e6:>12.2f}')
+    return result
+
+
+def run(sizes, repeat: int) -> None:
+    # Capturing queries turns on SQL debug logging; keep the output to the results
+    logging.getLogger('django.db.backends').setLevel(logging.WARNING)
+    with temporary_database():
+        for size in sizes:
+            user = create_user(f'benchmark{size}')
+            create_applications(user, size)
+            # Responded applications were last updated a few days after applying
+            JobApplication.objects.filter(user=user).exclude(status='applied').update(
+                last_updated=F('application_date') + timezone.timedelta(days=3)
+            )
+            StatsRollupService.rebuild([user.pk])
+
+            print(f'\n{size:,} applications, {connection.vendor}')
+            print(f'  {"variant":<22}{"queries":>9}{"ms/call":>12}{"peak MB":>12}')
+            metrics = measure('database-side', lambda: MetricsService.calculate_metrics(user))
+            previous = measure('python loops (before)', lambda: python_loop_metrics(user, metrics))
+            print('  metrics identical' if previous == metrics else '  METRICS DIFFER')
+
+            for _ in range(repeat):
+                MetricsService.calculate_metrics(user)
+            snapshots = ApplicationMetrics.objects.filter(user=user).count()
+            print(f'  {repeat + 2} calls stored {snapshots} snapshot(s)')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma-separated numbers of applications')
+    parser.add_argument('--repeat', type=int, default=3, help='extra calls to count snapshots')
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(',')], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark page-number against cursor pagination of the applications list.
+
+Creates a throwaway database with one user owning ``--applications``
+applications (plus another user's), then times fetching page 1 and page
+``--page`` of the newest-first list, 20 rows a page:
+
+- page-number pagination (``?page=N``): a COUNT(*) of the user's
+  applications, then the page's rows after an OFFSET;
+- cursor pagination (the default): the page's rows after the previous
+  page's last (application_date, id), one index range scan.
+
+Only the paginator's queries are timed, not serialization. Reports queries
+and milliseconds per page, and checks both modes return the same rows.
+
+Usage:
+    python -m benchmarks.application_pages [--applications 100000]
+        [--page 500] [--repeat 5]
+"""
+
+import argparse
+import logging
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from job_applications.models import JobApplication
+from job_applications.pagination import KeysetPagination
+
+from .fake_applications import create_applications, create_user, temporary_database
+from .fake_gmail import timed
+
+URL = '/api/job_applications/applications/'
+
+
+def page_number(queryset, url: str):
+    """Return the rows of a page-number page and the paginator."""
+    paginator = PageNumberPagination()
+    return paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(url))), paginator
+
+
+def keyset(queryset, url: str):
+    """Return the rows of a cursor page and the paginator."""
+    paginator = KeysetPagination()
+    return paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(url))), paginator
+
+
+def cursor_url(queryset, page: int) -> str:
+    """Follow next links to the URL of cursor page ``page``."""
+    url = URL
+    for _ in range(page - 1):
+        _, paginator = keyset(queryset, url)
+        url = paginator.get_next_link()
+    return url
+
+
+def measure(name: str, func, repeat: int):
+    """Run ``func`` ``repeat`` times, printing queries and time per call."""
+    with CaptureQueriesContext(connection) as queries:
+        results, elapsed = timed(lambda: [func() for _ in range(repeat)])
+    print(f'{name:<24}{len(queries) / repeat:>9.1f}{elapsed / repeat * 1000:>12.2f}')
+    return [application.pk for application in results[-1][0]]
+
+
+def run(applications: int, page: int, repeat: int) -> None:
+    # Capturing queries turns on SQL debug logging; keep the output to the results
+    logging.getLogger('django.db.backends').setLevel(logging.WARNING)
+    with temporary_database():
+        user = create_user('benchmark')
+        create_applications(user, applications)
+        create_applications(create_user('other'), applications // 10, seed=1)
+        queryset = JobApplication.objects.filter(user=user).order_by('-application_date', '-id')
+        deep_url = cursor_url(queryset, page)
+        print(f'{applications:,} applications for the user, {connection.vendor}')
+        print(f'{"variant":<24}{"queries":>9}{"ms/page":>12}')
+
+        same = True
+        for number, url in [(1, URL), (page, deep_url)]:
+            numbered = measure(f'page number, page {number}',
+                               lambda: page_number(queryset, f'{URL}?page={number}'), repeat)
+            cursored = measure(f'cursor, page {number}', lambda: keyset(queryset, url), repeat)
+            same = same and numbered == cursored
+        print('pages identical' if same else 'PAGES DIFFER')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--applications', type=int, default=100_000)
+    parser.add_argument('--page', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.applications, args.page, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
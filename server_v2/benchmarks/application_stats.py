@@ -0,0 +1,168 @@
+"""Benchmark JobTracker.get_application_stats at scale.
+
+Creates a throwaway database with one user owning ``--applications``
+applications (plus another user's, so queries must filter), then times the
+statistics:
+
+- nine separate count and group queries;
+- a single conditional-aggregation query;
+- the user's statistics rollup plus one query over the last 30 days,
+  uncached (the implementation);
+- reads served by the per-user statistics cache (an in-process cache here).
+
+Reports queries and milliseconds per call, checks that every variant returns
+the same payload, then times saving an application, rollup upkeep included.
+
+Usage:
+    python -m benchmarks.application_stats [--applications 100000]
+        [--repeat 5]
+"""
+
+import argparse
+import logging
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from backend.testing import LOCMEM_CACHES
+from job_applications.models import JobApplication
+from job_applications.services.stats_rollup import StatsRollupService
+from job_applications.utils.job_tracker import JobTracker
+from job_applications.utils.stats_cache import StatsCache
+
+from .fake_applications import create_applications, create_user, temporary_database
+from .fake_gmail import timed
+
+
+def window_start(days: int):
+    """Start of the window of the last ``days`` days."""
+    return timezone.now() - timedelta(days=days)
+
+
+def rates(stats: dict, total_applications: int, interviewed: int, offers: int, responses: int) -> dict:
+    """Add the rates to ``stats``."""
+    if total_applications > 0:
+        stats.update({
+            'interview_rate': round(interviewed / total_applications * 100, 1),
+            'offer_rate': round(offers / total_applications * 100, 1),
+            'response_rate': round(responses / total_applications * 100, 1),
+        })
+    return stats
+
+
+def nine_query_stats(user) -> dict:
+    """The statistics with one query per figure."""
+    thirty_days_ago = window_start(30)
+    seven_days_ago = window_start(7)
+    applications = JobApplication.objects.filter(user=user)
+    total_applications = applications.count()
+    recent_applications = applications.filter(application_date__gte=thirty_days_ago)
+    stats = {
+        'total_applications': total_applications,
+        'applications_last_30_days': recent_applications.count(),
+        'applications_last_7_days': applications.filter(application_date__gte=seven_days_ago).count(),
+        'status_breakdown': dict(applications.values_list('status').annotate(count=Count('id')).order_by('status')),
+        'recent_status_breakdown': dict(
+            recent_applications.values_list('status').annotate(count=Count('id')).order_by('status')
+        ),
+        'interview_rate': 0.0,
+        'offer_rate': 0.0,
+        'response_rate': 0.0,
+        'ghosted_applications': applications.filter(status='applied', application_date__lte=thirty_days_ago).count(),
+    }
+    if total_applications == 0:
+        return stats
+    return rates(
+        stats, total_applications,
+        interviewed=applications.filter(status__in=JobApplication.INTERVIEW_STATUSES).count(),
+        offers=applications.filter(status='offer_received').count(),
+        responses=applications.exclude(status='applied').count(),
+    )
+
+
+def one_query_stats(user) -> dict:
+    """The statistics from one query grouped by status, with conditional counts."""
+    thirty_days_ago = window_start(30)
+    rows = list(
+        JobApplication.objects.filter(user=user)
+        .values('status')
+        .annotate(
+            total=Count('id'),
+            last_30_days=Count('id', filter=Q(application_date__gte=thirty_days_ago)),
+            last_7_days=Count('id', filter=Q(application_date__gte=window_start(7))),
+            ghosted=Count('id', filter=Q(status='applied', application_date__lte=thirty_days_ago)),
+        )
+        .order_by('status')
+    )
+    total_applications = sum(row['total'] for row in rows)
+    status_breakdown = {row['status']: row['total'] for row in rows}
+    stats = {
+        'total_applications': total_applications,
+        'applications_last_30_days': sum(row['last_30_days'] for row in rows),
+        'applications_last_7_days': sum(row['last_7_days'] for row in rows),
+        'status_breakdown': status_breakdown,
+        'recent_status_breakdown': {row['status']: row['last_30_days'] for row in rows if row['last_30_days']},
+        'interview_rate': 0.0,
+        'offer_rate': 0.0,
+        'response_rate': 0.0,
+        'ghosted_applications': sum(row['ghosted'] for row in rows),
+    }
+    return rates(
+        stats, total_applications,
+        interviewed=sum(status_breakdown.get(status, 0) for status in JobApplication.INTERVIEW_STATUSES),
+        offers=status_breakdown.get('offer_received', 0),
+        responses=total_applications - status_breakdown.get('applied', 0),
+    )
+
+
+def measure(name: str, func, repeat: int):
+    """Run ``func`` ``repeat`` times, printing queries and time per call."""
+    with CaptureQueriesContext(connection) as queries:
+        results, elapsed = timed(lambda: [func() for _ in range(repeat)])
+    print(f'{name:<28}{len(queries) / repeat:>9.1f}{elapsed / repeat * 1000:>12.2f}')
+    return results[-1]
+
+
+def run(applications: int, repeat: int) -> None:
+    # Capturing queries turns on SQL debug logging; keep the output to the results
+    logging.getLogger('django.db.backends').setLevel(logging.WARNING)
+    with temporary_database(), override_settings(CACHES=LOCMEM_CACHES):
+        user = create_user('benchmark')
+        create_applications(user, applications)
+        create_applications(create_user('other'), applications // 10, seed=1)
+        # Bulk inserts bypass the rollup upkeep
+        StatsRollupService.rebuild()
+        tracker = JobTracker(user)
+        print(f'{applications:,} applications for the user, {connection.vendor}')
+        print(f'{"variant":<28}{"queries":>9}{"ms/call":>12}')
+
+        results = [
+            measure('nine queries', lambda: nine_query_stats(user), repeat),
+            measure('one aggregate query', lambda: one_query_stats(user), repeat),
+            measure('rollup', tracker._compute_application_stats, repeat),
+        ]
+        with patch('job_applications.utils.job_tracker.stats_cache', StatsCache()):
+            tracker.get_application_stats()
+            results.append(measure('cached', tracker.get_application_stats, repeat))
+
+        print('payloads identical' if all(result == results[0] for result in results) else 'PAYLOADS DIFFER')
+
+        measure('save, rollup upkeep incl.', lambda: JobApplication.objects.create(
+            user=user, company_name='Benchmark', position='Engineer'), repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--applications', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.applications, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
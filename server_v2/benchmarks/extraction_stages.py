@@ -0,0 +1,87 @@
+"""Break down email parsing time by extraction pipeline stage.
+
+Parses the ``benchmarks.gmail_parser`` corpus, with a share of the bodies
+turned into HTML newsletters from ``benchmarks.html_text``, through the
+Gmail and job applications parsers (result caches off, LLM fallback off),
+then prints each pipeline's per-stage totals: runs, skips, time and its
+share of the pipeline, and the bytes going in and out of the stage.
+
+``--stages`` runs the Gmail parser with another stage order, as the
+EMAIL_EXTRACTION_PIPELINES setting would, to compare orders.
+
+Usage:
+    python -m benchmarks.extraction_stages [--emails 5000] [--html 0.2]
+        [--stages decode,html_to_text,strip_quotes,compose,normalize,extract,score]
+"""
+
+import argparse
+import random
+from typing import Dict, List, Optional
+
+from django.test import override_settings
+
+from gmail.extraction import ExtractionPipeline
+from gmail.parser import EmailParser as GmailEmailParser
+from job_applications.utils.email_parser import EmailParser as JobEmailParser
+
+from .fake_gmail import format_rate, timed
+from .gmail_parser import make_corpus
+from .html_text import make_newsletter
+
+
+def make_emails(count: int, html_share: float) -> List[Dict]:
+    """Build the corpus, with ``html_share`` of the bodies as HTML."""
+    rng = random.Random(1)
+    emails = make_corpus(count)
+    for index, email in enumerate(emails):
+        if rng.random() < html_share:
+            email['body'] = make_newsletter(index, 20) + email['body'].replace('\n', '<br>')
+    return emails
+
+
+def report(name: str, pipeline: ExtractionPipeline, emails: int, elapsed: float) -> None:
+    """Print the per-stage totals of ``pipeline``."""
+    stats = pipeline.stats()
+    total = sum(stage['seconds'] for stage in stats.values()) or 1.0
+    print(f'\n{name}: {elapsed:.2f}s, {format_rate(emails, elapsed)}')
+    print(f'{"stage":<14}{"runs":>8}{"skipped":>9}{"seconds":>10}{"share":>8}'
+          f'{"us/email":>10}{"MB in":>9}{"MB out":>9}')
+    for stage, totals in stats.items():
+        runs = totals['runs'] or 1
+        print(f'{stage:<14}{totals["runs"]:>8}{totals["skipped"]:>9}{totals["seconds"]:>10.3f}'
+              f'{totals["seconds"] / total:>8.1%}{totals["seconds"] / runs * 1e6:>10.1f}'
+              f'{totals["bytes_in"] / 1e6:>9.2f}{totals["bytes_out"] / 1e6:>9.2f}')
+
+
+def run(emails: int, html_share: float, stages: Optional[List[str]]) -> None:
+    corpus = make_emails(emails, html_share)
+    print(f'{emails:,} emails, {html_share:.0%} HTML')
+
+    gmail_parser = type('BenchmarkGmailParser', (GmailEmailParser,), {'cache': None})
+    job_parser = type('BenchmarkJobParser', (JobEmailParser,), {
+        'cache': None,
+        'fallback_extractor': staticmethod(lambda: None),
+    })
+
+    config = {'gmail': {'STAGES': stages}} if stages else {}
+    with override_settings(EMAIL_EXTRACTION_PIPELINES=config):
+        gmail = gmail_parser()
+        _, elapsed = timed(lambda: [gmail.parse_email(email) for email in corpus])
+    report('gmail.parser.EmailParser', gmail_parser.pipeline(), emails, elapsed)
+
+    job = job_parser()
+    _, elapsed = timed(lambda: [job.parse_email(email['body'], email['subject']) for email in corpus])
+    report('job_applications EmailParser', job_parser.pipeline(), emails, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=5000)
+    parser.add_argument('--html', type=float, default=0.2, help='share of HTML bodies')
+    parser.add_argument('--stages', help='comma-separated Gmail stage order')
+    args = parser.parse_args()
+    run(args.emails, args.html, args.stages.split(',') if args.stages else None)
+
+
+if __name__ == '__main__':
+    main()
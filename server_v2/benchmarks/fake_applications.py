@@ -0,0 +1,65 @@
+"""Throwaway database of generated job applications for the benchmarks.
+
+``temporary_database()`` creates the test database of the configured
+backend (an in-memory SQLite database with the default settings), applies
+the migrations and drops it afterwards, so benchmarks never touch real
+data. ``create_applications()`` fills it with applications spread over
+statuses, companies and the last year.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterator
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from job_applications.models import JobApplication
+
+STATUSES = [status for status, _ in JobApplication.STATUS_CHOICES]
+# Most applications never get past "applied"
+STATUS_WEIGHTS = [50, 10, 8, 4, 20, 2, 6]
+COMPANIES = [f'Company {index}' for index in range(500)]
+
+
+@contextmanager
+def temporary_database() -> Iterator[None]:
+    """Create and migrate a test database for the duration of the block."""
+    setup_test_environment()
+    name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(name, verbosity=0)
+        teardown_test_environment()
+
+
+def create_user(username: str):
+    """Create a user to own generated applications."""
+    return get_user_model().objects.create_user(username=username, email=f'{username}@example.com',
+                                                password='benchmark')
+
+
+def create_applications(user, count: int, seed: int = 0, batch_size: int = 5000) -> None:
+    """Insert ``count`` applications for ``user`` with bulk inserts.
+
+    Bulk inserts send no signals, like a data import.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    batch = []
+    for index in range(count):
+        batch.append(JobApplication(
+            user=user,
+            company_name=rng.choice(COMPANIES),
+            position=f'Engineer {index % 50}',
+            status=rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+            application_date=now - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+        ))
+        if len(batch) == batch_size:
+            JobApplication.objects.bulk_create(batch)
+            batch = []
+    JobApplication.objects.bulk_create(batch)
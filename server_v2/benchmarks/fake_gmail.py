@@ -0,0 +1,314 @@
+"""Local fake of the Gmail REST API used by the benchmarks.
+
+The server answers the subset of Gmail v1 endpoints the ``gmail`` package
+uses, including the multipart/mixed ``/batch`` endpoint, from an in-memory
+mailbox of generated messages. Every HTTP round trip is delayed by a fixed
+latency so that request counts dominate the results the way they do against
+the real API.
+"""
+
+import base64
+import json
+import threading
+import time
+import urllib.parse
+from email.parser import Parser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+API_PREFIX = '/gmail/v1/users/me/'
+
+SAMPLE_BODY = """<html><body>
+<p>Dear Candidate {index},</p>
+<p>Thank you for applying for the position of Senior Developer at Acme Corp.</p>
+<p>Position: Backend Engineer</p>
+<p>Company: Example Widgets Inc</p>
+<p>We will review your application and get back to you shortly.</p>
+{filler}</body></html>
+"""
+
+# Typical recruiting emails are HTML-heavy; pad bodies to a realistic size
+BODY_FILLER = '<p style="color:#333333;font-family:Arial">Lorem ipsum dolor sit amet.</p>\n'
+DEFAULT_BODY_SIZE = 16 * 1024
+
+
+def make_message(index: int, body_size: int = DEFAULT_BODY_SIZE, thread_size: int = 3) -> Dict:
+    """Build a full-format Gmail message resource for the fake mailbox."""
+    message_id = f'{index:016x}'
+    filler = BODY_FILLER * (body_size // len(BODY_FILLER))
+    body = base64.urlsafe_b64encode(SAMPLE_BODY.format(index=index, filler=filler).encode()).decode()
+    return {
+        'id': message_id,
+        'threadId': f'{index // thread_size:016x}',
+        'labelIds': ['INBOX'],
+        'snippet': 'Thank you for applying',
+        'historyId': str(1000 + index),
+        'payload': {
+            'mimeType': 'multipart/alternative',
+            'headers': [
+                {'name': 'Subject', 'value': f'Your application #{index}'},
+                {'name': 'From', 'value': 'Recruiting <jobs@example.com>'},
+                {'name': 'To', 'value': 'candidate@example.com'},
+                {'name': 'Date', 'value': 'Mon, 3 Mar 2025 10:00:00 +0000'},
+            ],
+            'parts': [
+                {'mimeType': 'text/plain', 'body': {'data': body}},
+                {'mimeType': 'text/html', 'body': {'data': body}},
+            ],
+        },
+    }
+
+
+def parse_fields(spec: str) -> Dict:
+    """Parse a Google partial-response ``fields`` mask into a nested dict.
+
+    ``'id,payload(headers,parts/body)'`` becomes
+    ``{'id': None, 'payload': {'headers': None, 'parts': {'body': None}}}``,
+    where None selects the whole value.
+    """
+    tree, _ = _parse_field_list(spec, 0)
+    return tree
+
+
+def _parse_field_list(spec: str, pos: int) -> Tuple[Dict, int]:
+    tree: Dict = {}
+    while pos < len(spec):
+        end = pos
+        while end < len(spec) and spec[end] not in ',()':
+            end += 1
+        path = spec[pos:end].strip().split('/')
+        pos = end
+        selection = None
+        if pos < len(spec) and spec[pos] == '(':
+            selection, pos = _parse_field_list(spec, pos + 1)
+            pos += 1
+        node = tree
+        for name in path[:-1]:
+            node = node.setdefault(name, {})
+        node[path[-1]] = selection
+        if pos < len(spec) and spec[pos] == ')':
+            break
+        pos += 1
+    return tree, pos
+
+
+def apply_fields(value, tree: Optional[Dict]):
+    """Trim ``value`` to the fields selected by a parsed mask."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [apply_fields(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {name: apply_fields(value[name], sub) for name, sub in tree.items() if name in value}
+    return value
+
+
+class FakeGmailServer:
+    """Threaded HTTP server serving a fake Gmail mailbox on localhost.
+
+    Every ``thread_size`` consecutive messages form one thread.
+
+    Args:
+        message_count: Number of messages in the mailbox
+        latency: Seconds added to every HTTP round trip
+        body_size: Approximate size of each message body, in bytes
+        thread_size: Number of messages per thread
+    """
+
+    def __init__(self, message_count: int = 500, latency: float = 0.02,
+                 body_size: int = DEFAULT_BODY_SIZE, thread_size: int = 3):
+        self.messages = [make_message(i, body_size, thread_size) for i in range(message_count)]
+        self.by_id = {message['id']: message for message in self.messages}
+        self.threads: Dict[str, List[Dict]] = {}
+        for message in self.messages:
+            self.threads.setdefault(message['threadId'], []).append(message)
+        self.latency = latency
+        self.http_requests = 0
+        self.api_calls = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._httpd.server_address
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def discovery_document(self) -> Dict:
+        """Return the Gmail discovery document rewritten to point at this server."""
+        document = json.loads(get_static_doc('gmail', 'v1'))
+        document['rootUrl'] = self.root_url
+        document['baseUrl'] = self.root_url + document['servicePath']
+        return document
+
+    def build_service(self):
+        """Build a googleapiclient Gmail service pointed at this server."""
+        return build_from_document(self.discovery_document(), http=httplib2.Http())
+
+    def dispatch(self, method: str, target: str, body: str = '') -> Tuple[int, Dict]:
+        """Answer a single (non-batch) API call.
+
+        Returns:
+            Tuple of (HTTP status, JSON body)
+        """
+        parsed = urllib.parse.urlparse(target)
+        query = urllib.parse.parse_qs(parsed.query)
+        path = parsed.path
+        if not path.startswith(API_PREFIX):
+            return 404, {'error': {'code': 404, 'message': f'Unknown path {path}'}}
+        resource = path[len(API_PREFIX):]
+        with self._lock:
+            self.api_calls += 1
+
+        status, payload = 404, {'error': {'code': 404, 'message': f'Unsupported call {method} {path}'}}
+        if method == 'GET' and resource == 'messages':
+            status, payload = 200, self._list_messages(query)
+        elif method == 'GET' and resource.startswith('messages/'):
+            message = self.by_id.get(resource.split('/', 1)[1])
+            if message is None:
+                return 404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}}
+            status, payload = 200, self._format_message(message, query)
+        elif method == 'GET' and resource == 'threads':
+            status, payload = 200, self._list_threads(query)
+        elif method == 'GET' and resource.startswith('threads/'):
+            thread_id = resource.split('/', 1)[1]
+            if thread_id not in self.threads:
+                return 404, {'error': {'code': 404, 'message': 'Requested entity was not found.'}}
+            messages = [self._format_message(message, query) for message in self.threads[thread_id]]
+            status, payload = 200, {'id': thread_id, 'historyId': messages[-1]['historyId'], 'messages': messages}
+
+        if status == 200 and 'fields' in query:
+            payload = apply_fields(payload, parse_fields(query['fields'][0]))
+        return status, payload
+
+    def _format_message(self, message: Dict, query: Dict[str, List[str]]) -> Dict:
+        """Render ``message`` in the requested ``format``."""
+        if query.get('format', ['full'])[0] != 'metadata':
+            return message
+        wanted = {name.lower() for name in query.get('metadataHeaders', [])}
+        headers = [
+            header for header in message['payload']['headers']
+            if not wanted or header['name'].lower() in wanted
+        ]
+        metadata = {key: value for key, value in message.items() if key != 'payload'}
+        metadata['payload'] = {'mimeType': message['payload']['mimeType'], 'headers': headers}
+        return metadata
+
+    def _list_messages(self, query: Dict[str, List[str]]) -> Dict:
+        offset = int(query.get('pageToken', ['0'])[0] or 0)
+        limit = int(query.get('maxResults', ['100'])[0])
+        page = self.messages[offset:offset + limit]
+        result = {
+            'messages': [{'id': m['id'], 'threadId': m['threadId']} for m in page],
+            'resultSizeEstimate': len(page),
+        }
+        if offset + limit < len(self.messages):
+            result['nextPageToken'] = str(offset + limit)
+        return result
+
+    def _list_threads(self, query: Dict[str, List[str]]) -> Dict:
+        thread_ids = list(self.threads)
+        offset = int(query.get('pageToken', ['0'])[0] or 0)
+        limit = int(query.get('maxResults', ['100'])[0])
+        page = thread_ids[offset:offset + limit]
+        result = {
+            'threads': [{'id': thread_id, 'snippet': ''} for thread_id in page],
+            'resultSizeEstimate': len(page),
+        }
+        if offset + limit < len(thread_ids):
+            result['nextPageToken'] = str(offset + limit)
+        return result
+
+    def _handle_batch(self, content_type: str, body: str) -> Tuple[str, str]:
+        """Answer a multipart/mixed batch request.
+
+        Returns:
+            Tuple of (response content type, response body)
+        """
+        envelope = Parser().parsestr(f'Content-Type: {content_type}\r\n\r\n{body}')
+        boundary = 'batch_fake_gmail_boundary'
+        chunks = []
+        for part in envelope.get_payload():
+            request_line, _, rest = part.get_payload().partition('\n')
+            method, target, _ = request_line.split(' ', 2)
+            status, payload = self.dispatch(method, target)
+            chunks.append(
+                f'--{boundary}\r\n'
+                'Content-Type: application/http\r\n'
+                f'Content-ID: <response-{part["Content-ID"][1:-1]}>\r\n\r\n'
+                f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\n'
+                'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{json.dumps(payload)}\r\n'
+            )
+        chunks.append(f'--{boundary}--\r\n')
+        return f'multipart/mixed; boundary={boundary}', ''.join(chunks)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Avoid Nagle/delayed-ACK stalls on reused keep-alive connections
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, content_type: str, body: str):
+                data = body.encode('utf-8')
+                with server._lock:
+                    server.bytes_sent += len(data)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _start(self) -> str:
+                with server._lock:
+                    server.http_requests += 1
+                time.sleep(server.latency)
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length).decode('utf-8') if length else ''
+
+            def do_GET(self):
+                self._start()
+                status, payload = server.dispatch('GET', self.path)
+                self._reply(status, 'application/json; charset=UTF-8', json.dumps(payload))
+
+            def do_POST(self):
+                body = self._start()
+                if self.path.startswith('/batch'):
+                    content_type, response = server._handle_batch(self.headers['Content-Type'], body)
+                    self._reply(200, content_type, response)
+                    return
+                status, payload = server.dispatch('POST', self.path, body)
+                self._reply(status, 'application/json; charset=UTF-8', json.dumps(payload))
+
+        return Handler
+
+
+def timed(func, *args, **kwargs) -> Tuple[object, float]:
+    """Call ``func`` and return its result with the elapsed wall time."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def format_rate(count: int, seconds: float) -> str:
+    """Format a throughput figure for benchmark output."""
+    rate: Optional[float] = count / seconds if seconds else None
+    return f'{rate:,.1f}/s' if rate is not None else 'n/a'
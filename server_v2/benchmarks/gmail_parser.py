@@ -0,0 +1,79 @@
+"""Benchmark field extraction of the Gmail email parser.
+
+Builds a synthetic corpus by scaling up the sample emails in
+``job_applications/tests/data/sample_emails.py`` with varied names,
+companies, job references and letter case, then extracts every field from
+each email twice: once searching the text separately for each pattern
+(``EmailParser.extract_field``) and once with the shared keyword index
+(``EmailParser.extract_fields``). The results of both are checked to be
+identical. Email text is prepared up front so only extraction is timed.
+
+Usage:
+    python -m benchmarks.gmail_parser [--emails 100000]
+"""
+
+import argparse
+import random
+from typing import Dict, List
+
+from gmail.parser import EmailParser
+from job_applications.tests.data import sample_emails
+
+from .fake_gmail import format_rate, timed
+
+NAMES = ['John Smith', 'Mike Brown', 'Sarah Johnson', 'Alex Lee', 'David Wilson', 'Maria Garcia']
+COMPANIES = ['Tech Corp', 'Tech Solutions Inc', 'Data Analytics Corp', 'StartUp Tech', 'Acme Ltd']
+
+
+def make_corpus(count: int, seed: int = 0) -> List[Dict]:
+    """Build ``count`` email dictionaries from the sample emails."""
+    rng = random.Random(seed)
+    samples = [value for name, value in sorted(vars(sample_emails).items())
+               if name.startswith('SAMPLE_') and isinstance(value, str)]
+    corpus = []
+    for index in range(count):
+        body = samples[index % len(samples)]
+        for name in NAMES:
+            body = body.replace(name, rng.choice(NAMES))
+        for company in COMPANIES:
+            body = body.replace(company, rng.choice(COMPANIES))
+        body += f'\nJob ID: REQ-{index:06d}\n'
+        if rng.random() < 0.2:
+            body = body.upper()
+        corpus.append({
+            'subject': f'Application {index} at {rng.choice(COMPANIES)}',
+            'sender': 'jobs@example.com',
+            'body': body,
+        })
+    return corpus
+
+
+def run(emails: int) -> None:
+    parser = EmailParser()
+    texts = [parser._extract_text_content(email) for email in make_corpus(emails)]
+    print(f'{emails:,} emails, {sum(map(len, texts)) / len(texts):,.0f} characters on average')
+    print(f'{"mode":<16}{"seconds":>10}{"rate":>16}')
+
+    modes = (
+        ('per-pattern', lambda text: {field: parser.extract_field(text, patterns, field)
+                                      for field, patterns in parser.PATTERNS.items()}),
+        ('keyword index', parser.extract_fields),
+    )
+    results = []
+    for mode, extract in modes:
+        extracted, elapsed = timed(lambda: [extract(text) for text in texts])
+        results.append(extracted)
+        print(f'{mode:<16}{elapsed:>10.2f}{format_rate(len(texts), elapsed):>16}')
+
+    print('results identical' if results[0] == results[1] else 'RESULTS DIFFER')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=100_000)
+    args = parser.parse_args()
+    run(args.emails)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark full-format versus header-only Gmail listing.
+
+Lists the same messages once with full-format gets, which download every
+body, and once with ``GmailEmailService.list_email_headers``, which asks for
+metadata-format messages trimmed with ``fields=`` masks. Both modes use HTTP
+batch requests so the difference is the response size and decode work.
+
+Usage:
+    python -m benchmarks.gmail_partial_response [--messages 200]
+        [--latency 0.02] [--body-size 16384]
+"""
+
+import argparse
+from unittest.mock import patch
+
+from gmail.email import GmailEmailService
+
+from .fake_gmail import FakeGmailServer, format_rate, timed
+
+
+def run(messages: int, latency: float, body_size: int) -> None:
+    with FakeGmailServer(message_count=messages, latency=latency, body_size=body_size) as server:
+        service = server.build_service()
+        print(f'{messages} messages, {body_size / 1024:.0f} KiB bodies, '
+              f'{latency * 1000:.0f} ms per round trip')
+        print(f'{"mode":<10}{"fetched":>10}{"requests":>10}{"KiB":>12}{"seconds":>10}{"rate":>14}')
+
+        modes = (
+            ('full', lambda: GmailEmailService.fetch_emails(
+                '', max_results=messages, batch=True, concurrency=1)),
+            ('headers', lambda: GmailEmailService.list_email_headers(
+                '', max_results=messages, service=service)),
+        )
+        for mode, fetch in modes:
+            server.http_requests = 0
+            server.bytes_sent = 0
+            with patch('gmail.email.GmailAuthService.get_service', return_value=service), \
+                    patch.object(GmailEmailService, '_rate_limit'):
+                emails, elapsed = timed(fetch)
+            print(f'{mode:<10}{len(emails):>10}{server.http_requests:>10}'
+                  f'{server.bytes_sent / 1024:>12,.0f}{elapsed:>10.2f}'
+                  f'{format_rate(len(emails), elapsed):>14}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='seconds of simulated latency per HTTP round trip')
+    parser.add_argument('--body-size', type=int, default=16 * 1024,
+                        help='approximate size of each message body, in bytes')
+    args = parser.parse_args()
+    run(args.messages, args.latency, args.body_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark per-request Gmail service construction versus the service cache.
+
+Each simulated request obtains a Gmail service for the same credentials and
+makes one messages.get call against a local fake Gmail endpoint. Uncached
+requests do what ``googleapiclient.discovery.build`` does: parse the
+discovery document and open a new HTTP transport. Cached requests go through
+``gmail.service_cache.GmailServiceCache``.
+
+Usage:
+    python -m benchmarks.gmail_service_cache [--requests 200] [--latency 0]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import build_http
+import google_auth_httplib2
+
+from gmail.service_cache import GmailServiceCache
+
+from .fake_gmail import FakeGmailServer
+
+
+def uncached_service(server: FakeGmailServer, credentials):
+    document = json.loads(get_static_doc('gmail', 'v1'))
+    document['rootUrl'] = server.root_url
+    document['baseUrl'] = server.root_url + document['servicePath']
+    http = google_auth_httplib2.AuthorizedHttp(credentials, http=build_http())
+    return build_from_document(document, http=http)
+
+
+def run(requests: int, latency: float) -> None:
+    credentials = Credentials('benchmark-token')
+    with FakeGmailServer(message_count=1, latency=latency, body_size=1024) as server:
+        message_id = server.messages[0]['id']
+        cache = GmailServiceCache(document=server.discovery_document())
+        modes = (
+            ('uncached', lambda: uncached_service(server, credentials)),
+            ('cached', lambda: cache.get(credentials)),
+        )
+        print(f'{requests} requests, {latency * 1000:.0f} ms server latency')
+        print(f'{"mode":<10}{"mean ms":>10}{"p50 ms":>10}{"p99 ms":>10}')
+
+        for mode, get_service in modes:
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                service = get_service()
+                service.users().messages().get(userId='me', id=message_id, format='metadata').execute()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(f'{mode:<10}{statistics.mean(timings):>10.2f}'
+                  f'{timings[len(timings) // 2]:>10.2f}{timings[int(len(timings) * 0.99)]:>10.2f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds of simulated latency per HTTP round trip')
+    args = parser.parse_args()
+    run(args.requests, args.latency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark per-message versus per-thread Gmail retrieval.
+
+Fetches the same conversations once as individual messages (batched
+messages.get) and once as whole threads (batched threads.get), and reports
+API calls, HTTP round trips and Gmail quota units for each.
+
+Usage:
+    python -m benchmarks.gmail_thread_fetch [--messages 300] [--thread-size 5]
+        [--latency 0.02]
+"""
+
+import argparse
+from unittest.mock import patch
+
+from gmail.email import GmailEmailService
+from gmail.rate_limit import TokenBucketRateLimiter
+
+from .fake_gmail import FakeGmailServer, format_rate, timed
+
+
+def run(messages: int, thread_size: int, latency: float) -> None:
+    with FakeGmailServer(message_count=messages, latency=latency, body_size=2048,
+                         thread_size=thread_size) as server:
+        service = server.build_service()
+        threads = len(server.threads)
+        print(f'{messages} messages in {threads} threads of {thread_size}, '
+              f'{latency * 1000:.0f} ms per round trip')
+        print(f'{"mode":<10}{"messages":>10}{"api calls":>11}{"requests":>10}'
+              f'{"quota":>8}{"seconds":>10}{"rate":>14}')
+
+        modes = (
+            ('messages', lambda: GmailEmailService.fetch_emails(
+                '', max_results=messages, batch=True, concurrency=1)),
+            ('threads', lambda: GmailEmailService.fetch_threads(
+                '', max_results=threads, service=service)),
+        )
+        for mode, fetch in modes:
+            server.http_requests = server.api_calls = 0
+            units = [0]
+
+            def count_units(method='messages.get', user_key='me', count=1):
+                units[0] += TokenBucketRateLimiter.units_for(method, count)
+
+            with patch('gmail.email.GmailAuthService.get_service', return_value=service), \
+                    patch.object(GmailEmailService, '_rate_limit', side_effect=count_units):
+                result, elapsed = timed(fetch)
+            fetched = sum(len(item['messages']) for item in result) if mode == 'threads' else len(result)
+            print(f'{mode:<10}{fetched:>10}{server.api_calls:>11}{server.http_requests:>10}'
+                  f'{units[0]:>8}{elapsed:>10.2f}{format_rate(fetched, elapsed):>14}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--thread-size', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='seconds of simulated latency per HTTP round trip')
+    args = parser.parse_args()
+    run(args.messages, args.thread_size, args.latency)
+
+
+if __name__ == '__main__':
+    main()
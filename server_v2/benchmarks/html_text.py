@@ -0,0 +1,87 @@
+"""Benchmark HTML-to-text extraction backends on newsletter-style emails.
+
+Generates large table-layout newsletters (inline styles, a style block, a
+hidden preheader, tracking pixels, scripts and hundreds of links) and
+converts each to text with BeautifulSoup's ``html.parser`` (the previous
+approach, as a baseline) and with every backend available from
+``gmail.html_text``. Reports throughput and the peak memory allocated while
+converting one email, measured with ``tracemalloc``.
+
+Usage:
+    python -m benchmarks.html_text [--emails 50] [--items 400]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from gmail.html_text import available_backends, html_to_text
+
+from .fake_gmail import format_rate
+
+
+def make_newsletter(index: int, items: int) -> str:
+    """Build one newsletter with ``items`` job listings."""
+    rows = []
+    for item in range(items):
+        rows.append(
+            f'<tr><td style="padding:8px;font-family:Arial,sans-serif;font-size:14px">'
+            f'<a href="https://jobs.example.com/{index}/{item}?utm_source=newsletter" '
+            f'style="color:#1a73e8;text-decoration:none"><b>Senior Engineer {item}</b></a><br>'
+            f'<span style="color:#5f6368">Company {item % 37} &middot; Remote</span></td>'
+            f'<td align="right" style="padding:8px"><img src="https://t.example.com/{index}/{item}.gif" '
+            f'width="1" height="1" alt=""></td></tr>'
+        )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Jobs digest</title>'
+        '<style>' + 'td { padding: 0; } .btn { color: #fff; } ' * 50 + '</style></head>'
+        '<body><div style="display:none;max-height:0;overflow:hidden">'
+        + 'New roles picked for you. ' * 20 + '</div>'
+        '<table width="100%" cellpadding="0" cellspacing="0"><tr><td>'
+        f'<h1>Your job digest #{index}</h1><table>' + ''.join(rows) + '</table>'
+        '<p style="font-size:11px">You are receiving this email because you subscribed.</p>'
+        '</td></tr></table><script>window.trackOpen && window.trackOpen();</script></body></html>'
+    )
+
+
+def measure(convert, documents):
+    """Return (seconds for all documents, peak bytes allocated for one)."""
+    tracemalloc.start()
+    convert(documents[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for document in documents:
+        convert(document)
+    return time.perf_counter() - start, peak
+
+
+def run(emails: int, items: int) -> None:
+    documents = [make_newsletter(index, items) for index in range(emails)]
+    size = sum(map(len, documents))
+    print(f'{emails} newsletters, {size / emails / 1024:,.0f} KiB each')
+    print(f'{"backend":<22}{"seconds":>10}{"rate":>14}{"MiB/s":>10}{"peak KiB":>12}')
+
+    backends = [('bs4 html.parser', lambda html: BeautifulSoup(html, 'html.parser').get_text(separator='\n'))]
+    backends += [(name, lambda html, name=name: html_to_text(html, backend=name))
+                 for name in available_backends()]
+    for name, convert in backends:
+        elapsed, peak = measure(convert, documents)
+        print(f'{name:<22}{elapsed:>10.2f}{format_rate(emails, elapsed):>14}'
+              f'{size / elapsed / 2**20:>10.1f}{peak / 1024:>12,.0f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=50)
+    parser.add_argument('--items', type=int, default=400,
+                        help='job listings per newsletter')
+    args = parser.parse_args()
+    run(args.emails, args.items)
+
+
+if __name__ == '__main__':
+    main()
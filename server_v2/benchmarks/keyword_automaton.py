@@ -0,0 +1,73 @@
+"""Benchmark keyword detection as the vocabulary grows.
+
+Takes the job title and company values the Gmail parser extracts from the
+``benchmarks.gmail_parser`` corpus, plus subject lines, and looks for title
+keywords and company suffixes in each: once testing every keyword with
+``in`` (the previous approach) and once with one pass of
+``gmail.keywords.KeywordAutomaton``, for vocabularies of increasing size
+padded with generated job titles. The hits of both are checked to agree.
+
+Usage:
+    python -m benchmarks.keyword_automaton [--emails 2000]
+        [--sizes 10,100,1000,5000]
+"""
+
+import argparse
+import random
+import string
+from typing import Dict, List
+
+from gmail.keywords import COMPANY_SUFFIX, DEFAULT_VOCABULARY, TITLE, KeywordAutomaton
+from gmail.parser import EmailParser
+
+from .fake_gmail import format_rate, timed
+from .gmail_parser import make_corpus
+
+
+def make_vocabulary(size: int) -> Dict[str, List[str]]:
+    """Pad the default titles with made-up ones up to ``size`` keywords."""
+    rng = random.Random(size)
+    titles = list(DEFAULT_VOCABULARY[TITLE])
+    while len(titles) < size:
+        titles.append(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14))) + 'ist')
+    return {TITLE: titles, COMPANY_SUFFIX: DEFAULT_VOCABULARY[COMPANY_SUFFIX]}
+
+
+def scan_each(values: List[str], vocabulary: Dict[str, List[str]]) -> List[bool]:
+    """Test every title keyword against every value."""
+    return [any(term in value.lower() for term in vocabulary[TITLE]) for value in values]
+
+
+def run(emails: int, sizes: List[int]) -> None:
+    parser = EmailParser()
+    parser.cache = None
+    corpus = make_corpus(emails)
+    values = [email['subject'] for email in corpus]
+    for email in corpus:
+        result = parser.parse_email(email)
+        values.extend(value for value in (result['job_title'], result['company_name']) if value)
+    print(f'{len(values):,} values, {sum(map(len, values)) / len(values):.0f} characters on average')
+    print(f'{"keywords":>9}{"method":>11}{"seconds":>10}{"rate":>16}')
+
+    for size in sizes:
+        vocabulary = make_vocabulary(size)
+        (automaton, build) = timed(lambda: KeywordAutomaton(vocabulary))
+        each, each_elapsed = timed(lambda: scan_each(values, vocabulary))
+        found, elapsed = timed(lambda: [bool(automaton.find(value, (TITLE,))) for value in values])
+        print(f'{size:>9,}{"per word":>11}{each_elapsed:>10.3f}{format_rate(len(values), each_elapsed):>16}')
+        print(f'{"":>9}{"automaton":>11}{elapsed:>10.3f}{format_rate(len(values), elapsed):>16}'
+              f'  (built in {build:.3f}s)')
+        if found != each:
+            print('RESULTS DIFFER')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000)
+    parser.add_argument('--sizes', default='10,100,1000,5000')
+    args = parser.parse_args()
+    run(args.emails, [int(size) for size in args.sizes.split(',')])
+
+
+if __name__ == '__main__':
+    main()
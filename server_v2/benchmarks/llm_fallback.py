@@ -0,0 +1,110 @@
+"""Benchmark the LLM fallback extractor against a local stub API.
+
+Generates emails the regex patterns cannot read (no "Position:" lines, no
+"position at" phrasing), so every one falls back to the LLM, and parses them
+with the job_applications parser against ``benchmarks.llm_stub``:
+
+- one email per request, one request at a time (the previous behaviour);
+- batched prompts, sent one at a time;
+- batched prompts sent concurrently;
+- the same again with a warm result cache.
+
+Reports emails per second, API requests, tokens per email and the cost of
+1,000 emails at the given per-million-token prices.
+
+Usage:
+    python -m benchmarks.llm_fallback [--emails 200] [--latency 0.3]
+        [--per-email 0.02] [--batch-size 8] [--concurrency 4]
+        [--input-price 0.5] [--output-price 1.5]
+"""
+
+import argparse
+import random
+from typing import Dict, List
+
+from gmail.parse_cache import ParseCache
+from job_applications.utils.email_parser import EmailParser
+from job_applications.utils.llm_extractor import LLMExtractor
+
+from .fake_gmail import format_rate, timed
+from .llm_stub import StubLLMServer
+
+TITLES = ['Senior Data Engineer', 'Frontend Developer', 'Product Manager', 'Business Analyst', 'UX Designer']
+COMPANIES = ['Acme Robotics', 'Globex', 'Initech Labs', 'Umbrella Health', 'Stark Industries']
+
+
+def make_emails(count: int) -> List[Dict]:
+    """Build emails that mention a title and company only in free text."""
+    rng = random.Random(7)
+    emails = []
+    for index in range(count):
+        title, company = rng.choice(TITLES), rng.choice(COMPANIES)
+        emails.append({
+            'subject': f'Following up #{index}',
+            'body': (
+                f'Hi Sam,\n\nThanks for your interest in the {title} opening. We would love '
+                f'for you to join {company} next month, and the team enjoyed talking to you.\n'
+                f'Could you do a call on Tuesday at {9 + index % 8}:00?\n\nBest,\nAlex'
+            ),
+        })
+    return emails
+
+
+def parser_class(extractor: LLMExtractor) -> type:
+    """Return an EmailParser subclass falling back to ``extractor``, without a regex cache."""
+    return type('BenchmarkEmailParser', (EmailParser,), {
+        'cache': None,
+        'fallback_extractor': staticmethod(lambda: extractor),
+    })
+
+
+def run(emails: int, latency: float, per_email: float, batch_size: int, concurrency: int,
+        input_price: float, output_price: float) -> None:
+    corpus = make_emails(emails)
+    print(f'{emails} emails, stub latency {latency}s + {per_email}s per email')
+    print(f'{"configuration":<26}{"seconds":>9}{"rate":>12}{"requests":>10}'
+          f'{"tokens/email":>14}{"$/1k emails":>13}{"found":>7}')
+
+    with StubLLMServer(latency, per_email) as server:
+        shared_cache = ParseCache(cache_alias=None)
+        configurations = [
+            ('one email per request', 1, 1, ParseCache(cache_alias=None), False),
+            (f'batches of {batch_size}', batch_size, 1, ParseCache(cache_alias=None), True),
+            (f'batches x{concurrency} concurrent', batch_size, concurrency, shared_cache, True),
+            ('repeat, cached', batch_size, concurrency, shared_cache, True),
+        ]
+        for name, size, workers, cache, batched in configurations:
+            extractor = LLMExtractor('stub-key', server.base_url, batch_size=size, max_concurrency=workers)
+            extractor.cache = cache
+            parser = parser_class(extractor)
+
+            if batched:
+                results, elapsed = timed(lambda: [result.value for result in parser.parse_batch(corpus, workers=1)])
+            else:
+                results, elapsed = timed(lambda: [parser().parse_email(email['body'], email['subject'])
+                                                  for email in corpus])
+
+            stats = extractor.stats.as_dict()
+            tokens = stats['prompt_tokens'] + stats['completion_tokens']
+            cost = (stats['prompt_tokens'] * input_price + stats['completion_tokens'] * output_price) / 1e6
+            found = sum(bool(result['position'] and result['company_name']) for result in results)
+            print(f'{name:<26}{elapsed:>9.2f}{format_rate(emails, elapsed):>12}{stats["requests"]:>10}'
+                  f'{tokens / emails:>14.1f}{cost / emails * 1000:>13.4f}{found / emails:>7.0%}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds per request')
+    parser.add_argument('--per-email', type=float, default=0.02, help='seconds per email in a prompt')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--input-price', type=float, default=0.5, help='$ per million prompt tokens')
+    parser.add_argument('--output-price', type=float, default=1.5, help='$ per million completion tokens')
+    args = parser.parse_args()
+    run(args.emails, args.latency, args.per_email, args.batch_size, args.concurrency,
+        args.input_price, args.output_price)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Local stub of an OpenAI-compatible chat completions API.
+
+The server answers ``POST /v1/chat/completions`` requests in the format sent
+by ``job_applications.utils.llm_extractor``: it finds the
+``<email id="...">`` sections of the prompt, pulls a position and company
+out of each with simple rules, and replies with the JSON the extractor asks
+for. Responses carry ``usage`` token counts (estimated at four characters
+per token) so cost can be measured, and are delayed by a fixed latency plus
+a per-email generation time, so request counts and batch sizes dominate the
+results the way they do against a real model.
+
+Usage:
+    python -m benchmarks.llm_stub [--port 8765] [--latency 0.3]
+        [--per-email 0.02]
+
+then point the extractor at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+_EMAIL = re.compile(r'<email id="([^"]*)">\n(.*?)\n</email>', re.S)
+_POSITION = re.compile(r'\b(?:the|our|an?)\s+((?:[A-Z][A-Za-z]+\s+){0,3}(?:Engineer|Developer|Manager|Analyst|Designer))\b')
+_COMPANY = re.compile(r'\b(?:at|with|join)\s+((?:[A-Z][\w&]*\s?){1,3})')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of ``text``."""
+    return max(1, len(text) // 4)
+
+
+def extract(text: str) -> Dict[str, str]:
+    """Pull a position and company out of one email, as a model would."""
+    position = _POSITION.search(text)
+    company = _COMPANY.search(text)
+    return {
+        'position': position.group(1).strip() if position else '',
+        'company_name': company.group(1).strip() if company else '',
+    }
+
+
+class StubLLMServer:
+    """Threaded HTTP server answering chat completions on localhost.
+
+    Args:
+        latency: Seconds added to every request
+        per_email: Seconds added per email in the prompt, for generation time
+        port: Port to listen on; 0 picks a free one
+    """
+
+    def __init__(self, latency: float = 0.3, per_email: float = 0.02, port: int = 0):
+        self.latency = latency
+        self.per_email = per_email
+        self.requests = 0
+        self.emails = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address
+        return f'http://{host}:{port}/v1'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def complete(self, request: Dict) -> Dict:
+        """Build the chat completion response for a request."""
+        prompt = '\n'.join(message['content'] for message in request['messages'])
+        emails: List = _EMAIL.findall(prompt)
+        results = [{'id': email_id, **extract(text)} for email_id, text in emails]
+        content = json.dumps({'results': results})
+        usage = {'prompt_tokens': estimate_tokens(prompt), 'completion_tokens': estimate_tokens(content)}
+
+        with self._lock:
+            self.requests += 1
+            self.emails += len(emails)
+            self.prompt_tokens += usage['prompt_tokens']
+            self.completion_tokens += usage['completion_tokens']
+        time.sleep(self.latency + self.per_email * len(emails))
+
+        return {
+            'object': 'chat.completion',
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {**usage, 'total_tokens': usage['prompt_tokens'] + usage['completion_tokens']},
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._reply(404, {'error': {'message': 'Not found'}})
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                with server._lock:
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    self._reply(200, server.complete(json.loads(self.rfile.read(length))))
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+            def _reply(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--per-email', type=float, default=0.02)
+    args = parser.parse_args()
+    with StubLLMServer(args.latency, args.per_email, args.port) as server:
+        print(f'Serving chat completions at {server.base_url}')
+        try:
+            server._thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark multi-process batch parsing.
+
+Parses the same synthetic corpus as ``benchmarks.gmail_parser`` with
+``EmailParser.parse_batch`` at increasing worker counts and reports emails
+per second, so the speed-up with the number of cores is visible. One worker
+parses in the calling process, which is the baseline.
+
+Usage:
+    python -m benchmarks.parse_batch [--emails 20000] [--workers 1 2 4]
+        [--parser gmail|job_applications]
+"""
+
+import argparse
+import os
+
+from gmail.parser import EmailParser as GmailEmailParser
+from job_applications.utils.email_parser import EmailParser as JobEmailParser
+
+from .fake_gmail import format_rate, timed
+from .gmail_parser import make_corpus
+
+PARSERS = {
+    'gmail': GmailEmailParser,
+    'job_applications': JobEmailParser,
+}
+
+
+def run(emails: int, workers: list, parser: str) -> None:
+    parser_class = PARSERS[parser]
+    corpus = make_corpus(emails)
+    print(f'{emails:,} emails, {parser} parser, {os.cpu_count()} CPUs')
+    print(f'{"workers":<10}{"seconds":>10}{"rate":>16}{"errors":>10}')
+
+    for count in workers:
+        results, elapsed = timed(lambda: list(parser_class.parse_batch(corpus, workers=count)))
+        errors = sum(result.error is not None for result in results)
+        print(f'{count:<10}{elapsed:>10.2f}{format_rate(len(results), elapsed):>16}{errors:>10}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument('--parser', choices=sorted(PARSERS), default='gmail')
+    args = parser.parse_args()
+    run(args.emails, args.workers, args.parser)
+
+
+if __name__ == '__main__':
+    main()
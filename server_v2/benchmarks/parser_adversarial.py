@@ -0,0 +1,112 @@
+"""Benchmark email parsing on adversarial (backtracking-heavy) input.
+
+Builds single-line bodies packed with field keywords but without the text
+that would complete a match, e.g. ``"position job at data " * n``, at sizes
+doubling from 1k to 256k characters. Each is parsed with both email parsers
+(cache disabled) and with their previous, unbounded matching: the gmail
+patterns scanned without a match window, and the original unanchored
+job_applications patterns. Reports p50/p99 parse time per size; the legacy
+columns stop once a single parse exceeds ``--legacy-limit`` seconds, as they
+grow quadratically or worse.
+
+Usage:
+    python -m benchmarks.parser_adversarial [--max-size 262144] [--repeat 20]
+        [--legacy-limit 5]
+"""
+
+import argparse
+import re
+import statistics
+import time
+
+from gmail.parser import EmailParser as GmailEmailParser, PatternSet
+from job_applications.utils.email_parser import EmailParser as JobEmailParser
+
+GMAIL_FILLER = 'position job at data '
+JOB_FILLER = 'applying for position job at data '
+
+# job_applications position/company patterns before they were anchored
+JOB_LEGACY_PATTERNS = [
+    r'Position:\s*([^:\n]+)',
+    r'Job Title:\s*([^:\n]+)',
+    r'Role:\s*([^:\n]+)',
+    r'(?i)position.*?(?:for|of)\s+([^:\n,]+)',
+    r'(?i)applying for.*?position.*?of\s+([^:\n,]+)',
+    r'Company:\s*([^:\n]+)',
+    r'Organization:\s*([^:\n]+)',
+    r'(?i)position at\s+([^:\n,]+)',
+    r'(?i)role at\s+([^:\n,]+)',
+    r'(?i)job.*?at\s+([^:\n,]+)',
+]
+
+
+def make_body(filler: str, size: int) -> str:
+    """Repeat ``filler`` to ``size`` characters."""
+    return (filler * (size // len(filler) + 1))[:size]
+
+
+def percentiles(samples: list) -> tuple:
+    """Return the p50 and p99 of ``samples`` in milliseconds."""
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, round(0.99 * (len(ordered) - 1)))]
+    return statistics.median(ordered) * 1000, p99 * 1000
+
+
+def sample(func, arg, repeat: int) -> list:
+    """Time ``repeat`` calls of ``func(arg)``."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(max_size: int, repeat: int, legacy_limit: float) -> None:
+    gmail_parser = GmailEmailParser()
+    gmail_parser.cache = None
+    job_parser = JobEmailParser()
+    job_parser.cache = None
+    unbounded = PatternSet(GmailEmailParser.PATTERNS)
+    job_legacy = [re.compile(pattern) for pattern in JOB_LEGACY_PATTERNS]
+
+    cases = [
+        ('gmail', GMAIL_FILLER, lambda body: gmail_parser.parse_email({'body': body}),
+         unbounded.scan),
+        ('job_applications', JOB_FILLER, job_parser.parse_email,
+         lambda body: [regex.search(body) for regex in job_legacy]),
+    ]
+
+    print(f'{"parser":<18}{"chars":>9}{"p50 ms":>10}{"p99 ms":>10}'
+          f'{"legacy p50":>12}{"legacy p99":>12}')
+    for name, filler, parse, legacy in cases:
+        legacy_enabled = True
+        size = 1024
+        while size <= max_size:
+            body = make_body(filler, size)
+            p50, p99 = percentiles(sample(parse, body, repeat))
+            legacy_cells = f'{"skipped":>12}{"":>12}'
+            if legacy_enabled:
+                first = sample(legacy, body, 1)
+                if first[0] > legacy_limit:
+                    legacy_enabled = False
+                    legacy_p50, legacy_p99 = percentiles(first)
+                else:
+                    legacy_p50, legacy_p99 = percentiles(first + sample(legacy, body, repeat - 1))
+                legacy_cells = f'{legacy_p50:>12.1f}{legacy_p99:>12.1f}'
+            print(f'{name:<18}{size:>9,}{p50:>10.2f}{p99:>10.2f}{legacy_cells}')
+            size *= 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-size', type=int, default=256 * 1024)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--legacy-limit', type=float, default=5.0,
+                        help='stop timing the legacy matching once a parse takes this long (seconds)')
+    args = parser.parse_args()
+    run(args.max_size, args.repeat, args.legacy_limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,30 +12,55 @@ from typing import Optional
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+
+from .credential_cache import CredentialCache
+from .service_cache import get_gmail_service
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+TOKEN_FILE = 'token.json'
 
 
 class GmailAuthService:
     """Service for handling Gmail API authentication."""
 
+    credential_cache = CredentialCache()
+
     @classmethod
     def get_credentials(cls) -> Optional[Credentials]:
-        """Get valid user credentials from storage.
+        """Get valid user credentials.
+
+        Credentials are kept in memory after the first load and refreshed in
+        the background before they expire (see credential_cache), so this
+        only touches storage or the network on a cold start.
+
+        Returns:
+            Credentials object if successful, None otherwise.
+        """
+        token_path = Path(TOKEN_FILE)
+        return cls.credential_cache.get(
+            str(token_path.resolve()),
+            load=lambda: cls._load_credentials(token_path),
+            save=lambda creds: cls._save_credentials(creds, token_path),
+        )
+
+    @classmethod
+    def _load_credentials(cls, token_path: Path) -> Optional[Credentials]:
+        """Load user credentials from storage.
 
         The file token.json stores the user's access and refresh tokens, and is
         created automatically when the authorization flow completes for the first time.
 
+        Args:
+            token_path: Path of the token file
+
         Returns:
             Credentials object if successful, None otherwise.
         """
         creds = None
-        token_path = Path("token.json")
 
         if token_path.exists():
             try:
@@ -67,18 +92,25 @@ class GmailAuthService:
                     return None
 
             # Save the credentials for the next run
-            try:
-                with open(token_path, 'w') as token:
-                    token.write(creds.to_json())
-                logger.debug("Saved credentials to %s", token_path)
-            except Exception as e:
-                logger.warning("Could not save token: %s", e)
+            cls._save_credentials(creds, token_path)
 
         return creds
 
+    @staticmethod
+    def _save_credentials(creds: Credentials, token_path: Path) -> None:
+        """Write credentials to the token file."""
+        try:
+            with open(token_path, 'w') as token:
+                token.write(creds.to_json())
+            logger.debug("Saved credentials to %s", token_path)
+        except Exception as e:
+            logger.warning("Could not save token: %s", e)
+
     @classmethod
     def get_service(cls):
-        """Create a Gmail API service instance.
+        """Get a Gmail API service instance.
+
+        Services are cached per credential and thread (see service_cache).
 
         Returns:
             Gmail API service instance if successful, None otherwise.
@@ -89,9 +121,7 @@ class GmailAuthService:
             return None
 
         try:
-            service = build('gmail', 'v1', credentials=creds)
-            logger.debug("Successfully created Gmail API service")
-            return service
+            return get_gmail_service(creds)
         except Exception as e:
             logger.error("Error building service: %s", e)
             return None
@@ -0,0 +1,175 @@
+"""Process-level cache of Gmail OAuth2 credentials.
+
+Credentials are loaded from storage once per key and kept in memory. Tokens
+are refreshed in the background shortly before they expire, so requests keep
+using the current token instead of waiting for a refresh. Refreshes of the
+same key are coalesced into a single call (single-flight), and refreshed
+tokens are written back to storage off the request path.
+
+A caller only blocks on a refresh when it is handed a token that has already
+expired, e.g. on the first request after the process was idle past expiry.
+"""
+
+import datetime
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from google.auth.transport.requests import Request
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Refresh this long before expiry; google-auth itself treats tokens as expired
+# a few minutes early, so this must be larger than its threshold
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+MAX_WORKERS = 2
+
+
+def _utcnow() -> datetime.datetime:
+    """Current UTC time as a naive datetime, matching ``Credentials.expiry``."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class CredentialCache:
+    """In-memory credentials keyed by user, with proactive background refresh.
+
+    Args:
+        refresh_margin: How long before expiry to refresh a token
+        max_workers: Threads used for refreshes and storage write-back
+    """
+
+    def __init__(self, refresh_margin: datetime.timedelta = REFRESH_MARGIN, max_workers: int = MAX_WORKERS):
+        self.refresh_margin = refresh_margin
+        self._credentials: Dict[str, object] = {}
+        self._savers: Dict[str, Optional[Callable]] = {}
+        self._refreshing: Dict[str, Future] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gmail-credentials')
+
+    def get(self, key: str, load: Callable, save: Optional[Callable] = None):
+        """Return cached credentials for ``key``, loading them on first use.
+
+        Args:
+            key: Identifier of the user the credentials belong to
+            load: Callable returning credentials from storage, or None
+            save: Callable persisting refreshed credentials
+
+        Returns:
+            Credentials object if available, None otherwise
+        """
+        with self._lock:
+            creds = self._credentials.get(key)
+
+        if creds is None:
+            creds = load()
+            if creds is None:
+                return None
+            with self._lock:
+                creds = self._credentials.setdefault(key, creds)
+                self._savers[key] = save
+            self._schedule(key, creds)
+
+        if not creds.valid:
+            if not creds.refresh_token:
+                self.invalidate(key)
+                return None
+            # Nothing usable to hand out: wait for the (shared) refresh
+            try:
+                self.refresh(key).result()
+            except Exception:
+                self.invalidate(key)
+                return None
+        elif self._refresh_due(creds):
+            self.refresh(key)
+
+        return creds
+
+    def refresh(self, key: str) -> Future:
+        """Refresh the credentials of ``key`` in the background.
+
+        Concurrent calls for the same key share one refresh.
+
+        Returns:
+            Future resolving to the refreshed credentials
+        """
+        with self._lock:
+            future = self._refreshing.get(key)
+            if future is None:
+                future = self._executor.submit(self._refresh, key)
+                self._refreshing[key] = future
+        return future
+
+    def invalidate(self, key: str) -> None:
+        """Forget the credentials of ``key`` so the next get reloads them."""
+        with self._lock:
+            self._credentials.pop(key, None)
+            self._savers.pop(key, None)
+            timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def clear(self) -> None:
+        """Forget all cached credentials."""
+        with self._lock:
+            keys = list(self._credentials)
+        for key in keys:
+            self.invalidate(key)
+
+    def _refresh_due(self, creds) -> bool:
+        """Whether ``creds`` expire within the refresh margin."""
+        expiry = getattr(creds, 'expiry', None)
+        if not isinstance(expiry, datetime.datetime) or not creds.refresh_token:
+            return False
+        return expiry - _utcnow() <= self.refresh_margin
+
+    def _refresh(self, key: str):
+        """Refresh credentials in place, then write them back asynchronously."""
+        try:
+            with self._lock:
+                creds = self._credentials.get(key)
+                save = self._savers.get(key)
+            if creds is None:
+                return None
+
+            try:
+                creds.refresh(Request())
+            except Exception as e:
+                logger.error("Error refreshing credentials for %s: %s", key, e)
+                raise
+            logger.info("Refreshed credentials for %s", key)
+
+            if save:
+                self._executor.submit(self._save, key, save, creds)
+            self._schedule(key, creds)
+            return creds
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    @staticmethod
+    def _save(key: str, save: Callable, creds) -> None:
+        try:
+            save(creds)
+        except Exception as e:
+            logger.warning("Could not save credentials for %s: %s", key, e)
+
+    def _schedule(self, key: str, creds) -> None:
+        """Arrange a background refresh ``refresh_margin`` before expiry."""
+        expiry = getattr(creds, 'expiry', None)
+        if not isinstance(expiry, datetime.datetime) or not creds.refresh_token:
+            return
+
+        delay = max(0.0, (expiry - _utcnow() - self.refresh_margin).total_seconds())
+        timer = threading.Timer(delay, self.refresh, args=(key,))
+        timer.daemon = True
+        with self._lock:
+            if key not in self._credentials:
+                return
+            previous = self._timers.get(key)
+            self._timers[key] = timer
+        if previous:
+            previous.cancel()
+        timer.start()
@@ -4,17 +4,17 @@ This module provides functionality for fetching and parsing emails from Gmail.
 It handles email retrieval, content extraction, and parsing.
 """
 
-import base64
 import logging
-import time
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from email.mime.text import MIMEText
 
-from bs4 import BeautifulSoup
 from googleapiclient.errors import HttpError
 
+from . import retry
 from .auth import GmailAuthService
+from .mime import get_text_body
 from .parser import EmailParser
+from .rate_limit import TokenBucketRateLimiter
 from .exceptions import (
     GmailAPIError,
     GmailAuthError,
@@ -26,121 +26,632 @@ from .exceptions import (
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Rate limiting constants
-MAX_REQUESTS_PER_SECOND = 5
-REQUEST_INTERVAL = 1.0 / MAX_REQUESTS_PER_SECOND
+# Gmail accepts at most 100 calls in a single HTTP batch request
+BATCH_SIZE = 100
+
+# Headers requested by callers that do not need message bodies
+METADATA_HEADERS = ['Subject', 'From', 'To', 'Date']
+
+# Gmail partial-response masks (``fields=``), so responses carry only what is read
+LIST_FIELDS = {
+    'messages': 'messages/id,nextPageToken',
+    'threads': 'threads/id,nextPageToken',
+}
+METADATA_FIELDS = 'id,threadId,labelIds,payload/headers'
 
 
 class GmailEmailService:
     """Service for handling Gmail email operations."""
 
-    _last_request_time = 0
-    MAX_RETRIES = 3
-    RETRY_DELAY = 1  # seconds
+    rate_limiter = TokenBucketRateLimiter()
+    retry_policy = retry.default_policy
+    # Time budget shared by all calls of one fetch operation, retries included
+    OPERATION_DEADLINE = 300  # seconds
 
     @classmethod
-    def _rate_limit(cls):
-        """Implement rate limiting for API requests."""
-        current_time = time.time()
-        time_since_last_request = current_time - cls._last_request_time
-        if time_since_last_request < REQUEST_INTERVAL:
-            time.sleep(REQUEST_INTERVAL - time_since_last_request)
-        cls._last_request_time = time.time()
+    def _rate_limit(cls, method: str = 'messages.get', user_key: str = 'me', count: int = 1):
+        """Wait until the Gmail quota allows ``count`` calls of ``method``.
+
+        Args:
+            method: Gmail API method name, used to look up its quota cost
+            user_key: Identifier of the mailbox owner
+            count: Number of calls about to be made
+        """
+        cls.rate_limiter.acquire(method, user_key, count)
+
+    @classmethod
+    def _record_result(cls, error: Optional[Exception] = None, user_key: str = 'me', count: int = 1):
+        """Feed the outcome of API calls back into the adaptive rate limiter.
+
+        Args:
+            error: Error the calls failed with, or None if they succeeded
+            user_key: Identifier of the mailbox owner
+            count: Number of calls with this outcome
+        """
+        if isinstance(error, HttpError) and error.resp.status == 429:
+            cls.rate_limiter.throttled(user_key)
+        elif error is None:
+            cls.rate_limiter.succeeded(user_key)
+        else:
+            cls.rate_limiter.failed(user_key, count)
 
     @classmethod
-    def fetch_emails(cls, query: str, max_results: int = 10, parse_content: bool = False) -> List[Dict]:
+    def _execute(cls, request, method: str, user_key: str = 'me'):
+        """Execute an API request under the retry policy.
+
+        Every attempt is rate limited and its outcome fed back to the
+        adaptive rate limiter.
+
+        Args:
+            request: Unexecuted googleapiclient HttpRequest
+            method: Gmail API method name, e.g. 'messages.get'
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            The decoded response
+
+        Raises:
+            HttpError: If the call fails and retrying is not allowed
+        """
+        def attempt():
+            cls._rate_limit(method, user_key)
+            try:
+                response = request.execute()
+            except HttpError as e:
+                cls._record_result(e, user_key)
+                raise
+            cls._record_result(user_key=user_key)
+            return response
+
+        return cls.retry_policy.call(attempt)
+
+    @classmethod
+    def fetch_emails(
+        cls,
+        query: str,
+        max_results: int = 10,
+        parse_content: bool = False,
+        batch: bool = False,
+        concurrency: Optional[int] = None,
+        headers_only: bool = False,
+    ) -> List[Dict]:
         """Fetch emails from Gmail API.
 
+        Synchronous wrapper around GmailIngestionPipeline, which overlaps
+        listing, fetching, decoding and parsing.
+
         Args:
             query: Gmail search query
             max_results: Maximum number of emails to fetch
             parse_content: Whether to parse email content for job details
+            batch: Whether to retrieve messages through Gmail HTTP batch
+                requests (up to BATCH_SIZE gets per round trip) instead of
+                one request per message
+            concurrency: Number of concurrent fetch workers
+            headers_only: Whether to fetch only METADATA_HEADERS and leave
+                ``body`` as None (see fetch_email_body); ignored when
+                parse_content is set, since parsing needs the body
 
         Returns:
             List of email dictionaries containing metadata and content
         """
+        from .pipeline import GmailIngestionPipeline
+
         try:
             service = GmailAuthService.get_service()
             if not service:
                 logger.error("Failed to get Gmail service")
                 return []
 
-            emails = []
-            page_token = None
-            remaining_results = max_results
+            pipeline = GmailIngestionPipeline(
+                service_factory=GmailAuthService.get_service,
+                concurrency=concurrency,
+                batch=batch,
+                format='metadata' if headers_only and not parse_content else 'full',
+            )
+            with retry.deadline(cls.OPERATION_DEADLINE):
+                return pipeline.run_sync(service, query, max_results, parse_content)
 
-            while remaining_results > 0:
-                # Apply rate limiting
-                cls._rate_limit()
+        except HttpError as error:
+            raise GmailAPIError(f"Gmail API error: {str(error)}", error.resp.status)
+        except Exception as e:
+            logger.error('Error fetching emails: %s', e)
+            return []
 
-                # Get list of messages
-                try:
-                    results = service.users().messages().list(
-                        userId='me',
-                        q=query,
-                        maxResults=min(remaining_results, 100),  # Gmail API max is 100
-                        pageToken=page_token
-                    ).execute()
-                except HttpError as e:
-                    if e.resp.status == 429:  # Too Many Requests
-                        logger.warning("Rate limit hit, waiting before retry")
-                        time.sleep(5)  # Wait 5 seconds before retrying
-                        continue
-                    raise GmailAPIError(f"Gmail API error: {str(e)}", e.resp.status)
+    @classmethod
+    def iter_emails(
+        cls,
+        query: str,
+        max_results: int = 10,
+        parse_content: bool = False,
+        batch: bool = False,
+        concurrency: Optional[int] = None,
+        headers_only: bool = False,
+        service_factory: Optional[Callable] = None,
+        user_key: str = 'me',
+    ) -> Iterator[Dict]:
+        """Yield emails from Gmail API as soon as each one is decoded.
+
+        Unlike fetch_emails, emails are yielded in completion order rather
+        than list order, and only the pipeline's bounded working set is held
+        in memory at any time. The consumer sets the pace, so there is no
+        operation deadline; each call is still bounded by the retry policy.
+
+        Args:
+            query: Gmail search query
+            max_results: Maximum number of emails to fetch
+            parse_content: Whether to parse email content for job details
+            batch: Whether to retrieve messages through Gmail HTTP batch requests
+            concurrency: Number of concurrent fetch workers
+            headers_only: Whether to fetch only METADATA_HEADERS and leave
+                ``body`` as None; ignored when parse_content is set
+            service_factory: Callable returning a Gmail API service, used
+                instead of the stored credentials
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Yields:
+            Email dictionaries containing metadata and content
+
+        Raises:
+            GmailAuthError: If no Gmail service is available
+            GmailAPIError: If listing fails
+        """
+        from .pipeline import GmailIngestionPipeline
+
+        service_factory = service_factory or GmailAuthService.get_service
+        service = service_factory()
+        if not service:
+            raise GmailAuthError("Failed to get Gmail service")
+
+        pipeline = GmailIngestionPipeline(
+            service_factory=service_factory,
+            concurrency=concurrency,
+            batch=batch,
+            format='metadata' if headers_only and not parse_content else 'full',
+            user_key=user_key,
+        )
+        try:
+            for _, email_data in pipeline.iter_sync(service, query, max_results, parse_content):
+                yield email_data
+        except HttpError as error:
+            raise GmailAPIError(f"Gmail API error: {str(error)}", error.resp.status)
 
-                messages = results.get('messages', [])
-                if not messages:
-                    break
+    @classmethod
+    def list_email_headers(
+        cls,
+        query: str,
+        max_results: int = 10,
+        service=None,
+        user_key: str = 'me',
+    ) -> List[Dict]:
+        """List emails with headers only, without downloading their bodies.
+
+        Each page of results is fetched with one HTTP batch of metadata-format
+        gets. The ``body`` of every returned email is None; use
+        fetch_email_body to load it when it is needed.
 
-                for message in messages:
-                    try:
-                        # Apply rate limiting for each message fetch
-                        cls._rate_limit()
-
-                        # Get full message details
-                        msg = service.users().messages().get(
-                            userId='me',
-                            id=message['id'],
-                            format='full'
-                        ).execute()
-
-                        # Extract email data
-                        email_data = {
-                            'id': msg['id'],
-                            'thread_id': msg['threadId'],
-                            'labels': msg['labelIds'],
-                            'subject': cls._get_header_value(msg, 'Subject'),
-                            'from': cls._get_header_value(msg, 'From'),
-                            'to': cls._get_header_value(msg, 'To'),
-                            'date': cls._get_header_value(msg, 'Date'),
-                            'body': cls._get_body(msg)
-                        }
-
-                        # Parse content if requested
-                        if parse_content:
-                            parsed_data = EmailParser.parse_email(email_data)
-                            email_data.update(parsed_data)
-
-                        emails.append(email_data)
-                        logger.debug("Successfully processed email %s", msg['id'])
+        Args:
+            query: Gmail search query
+            max_results: Maximum number of emails to return
+            service: Gmail API service to use instead of the stored credentials
+            user_key: Identifier of the mailbox owner, for rate limiting
 
-                    except Exception as e:
-                        logger.error("Error processing message %s: %s", message['id'], e)
+        Returns:
+            List of email dictionaries in list order
+
+        Raises:
+            GmailAPIError: If listing fails
+        """
+        service = service or GmailAuthService.get_service()
+        if not service:
+            logger.error("Failed to get Gmail service")
+            return []
+
+        emails = []
+        with retry.deadline(cls.OPERATION_DEADLINE):
+            for page in cls._iter_message_pages(service, query, max_results, user_key):
+                message_ids = [message['id'] for message in page]
+                fetched, errors = cls._fetch_messages_batch(
+                    service, message_ids, format='metadata', user_key=user_key)
+                for message_id, error in errors.items():
+                    logger.error("Error processing message %s: %s", message_id, error)
+                emails.extend(
+                    cls._build_email_data(fetched[message_id], include_body=False)
+                    for message_id in message_ids if message_id in fetched
+                )
+        return emails
+
+    @classmethod
+    def fetch_threads(
+        cls,
+        query: str,
+        max_results: int = 10,
+        parse_content: bool = False,
+        service=None,
+        user_key: str = 'me',
+    ) -> List[Dict]:
+        """Fetch whole conversations, one record per thread.
+
+        Threads are listed and retrieved with threads().get in HTTP batches,
+        so a conversation costs one call however many messages it holds.
+
+        Args:
+            query: Gmail search query
+            max_results: Maximum number of threads to fetch
+            parse_content: Whether to parse each conversation for job details
+            service: Gmail API service to use instead of the stored credentials
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            List of thread dictionaries (see _build_thread_data) in list order
+
+        Raises:
+            GmailAPIError: If listing fails
+        """
+        service = service or GmailAuthService.get_service()
+        if not service:
+            logger.error("Failed to get Gmail service")
+            return []
+
+        threads = []
+        with retry.deadline(cls.OPERATION_DEADLINE):
+            for page in cls._iter_pages(service, 'threads', query, max_results, user_key):
+                thread_ids = [thread['id'] for thread in page]
+                fetched, errors = cls._fetch_threads_batch(service, thread_ids, user_key)
+                for thread_id, error in errors.items():
+                    logger.error("Error processing thread %s: %s", thread_id, error)
+                for thread_id in thread_ids:
+                    if thread_id not in fetched:
                         continue
+                    try:
+                        threads.append(cls._build_thread_data(fetched[thread_id], parse_content))
+                    except Exception as e:
+                        logger.error("Error processing thread %s: %s", thread_id, e)
+        return threads
 
-                # Update remaining results and page token
-                remaining_results -= len(messages)
-                page_token = results.get('nextPageToken')
-                if not page_token:
-                    break
+    @classmethod
+    def fetch_email_body(cls, message_id: str, service=None, user_key: str = 'me') -> str:
+        """Fetch the body of a single email.
 
-            return emails
+        Args:
+            message_id: ID of the message
+            service: Gmail API service to use instead of the stored credentials
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            Email body text
 
+        Raises:
+            GmailAPIError: If the message cannot be retrieved
+        """
+        service = service or GmailAuthService.get_service()
+        if not service:
+            raise GmailAuthError("Failed to get Gmail service")
+        try:
+            msg = cls._fetch_message(service, message_id, user_key=user_key)
         except HttpError as error:
             raise GmailAPIError(f"Gmail API error: {str(error)}", error.resp.status)
-        except Exception as e:
-            logger.error('Error fetching emails: %s', e)
-            return []
+        return cls._get_body(msg)
+
+    @classmethod
+    def _iter_message_pages(cls, service, query: str, max_results: int, user_key: str = 'me'):
+        """Yield pages of message stubs matching ``query``.
+
+        Args:
+            service: Gmail API service instance
+            query: Gmail search query
+            max_results: Maximum number of messages to list
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Yields:
+            Lists of message stubs (``{'id': ...}``)
+
+        Raises:
+            GmailAPIError: If listing fails with anything but a rate limit error
+        """
+        return cls._iter_pages(service, 'messages', query, max_results, user_key)
+
+    @classmethod
+    def _iter_pages(cls, service, resource: str, query: str, max_results: int, user_key: str = 'me'):
+        """Yield pages of ``resource`` ('messages' or 'threads') stubs matching ``query``.
+
+        Args:
+            service: Gmail API service instance
+            resource: Gmail collection to list
+            query: Gmail search query
+            max_results: Maximum number of items to list
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Yields:
+            Lists of stubs (``{'id': ...}``)
+
+        Raises:
+            GmailAPIError: If listing fails, after any retries
+        """
+        page_token = None
+        remaining_results = max_results
+
+        while remaining_results > 0:
+            # Get list of items
+            request = getattr(service.users(), resource)().list(
+                userId='me',
+                q=query,
+                maxResults=min(remaining_results, 100),  # Gmail API max is 100
+                pageToken=page_token,
+                fields=LIST_FIELDS[resource],
+            )
+            try:
+                results = cls._execute(request, f'{resource}.list', user_key)
+            except HttpError as e:
+                raise GmailAPIError(f"Gmail API error: {str(e)}", e.resp.status)
+
+            items = results.get(resource, [])
+            if not items:
+                break
+
+            yield items
+
+            # Update remaining results and page token
+            remaining_results -= len(items)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+    @classmethod
+    def _fetch_message(cls, service, message_id: str, format: str = 'full', user_key: str = 'me') -> Dict:
+        """Retrieve a single message, rate limited and retried.
+
+        Args:
+            service: Gmail API service instance
+            message_id: ID of the message to retrieve
+            format: Gmail message format to request
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            Message resource returned by messages().get
+        """
+        return cls._execute(cls._message_request(service, message_id, format), 'messages.get', user_key)
+
+    @staticmethod
+    def _message_request(service, message_id: str, format: str = 'full'):
+        """Build a messages().get request.
+
+        Metadata requests ask only for METADATA_HEADERS and are trimmed with
+        a partial-response mask.
+
+        Args:
+            service: Gmail API service instance
+            message_id: ID of the message to retrieve
+            format: Gmail message format to request ('full' or 'metadata')
+
+        Returns:
+            Unexecuted HttpRequest
+        """
+        if format == 'metadata':
+            return service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format=format,
+                metadataHeaders=METADATA_HEADERS,
+                fields=METADATA_FIELDS,
+            )
+        return service.users().messages().get(userId='me', id=message_id, format=format)
+
+    @classmethod
+    def _fetch_messages_batch(
+        cls,
+        service,
+        message_ids: List[str],
+        format: str = 'full',
+        user_key: str = 'me',
+    ) -> Tuple[Dict[str, Dict], Dict[str, Exception]]:
+        """Retrieve messages in Gmail HTTP batch requests of up to BATCH_SIZE.
+
+        Gmail charges quota for every call inside a batch, so each batch is
+        rate limited for the number of gets it carries. A failure of one item
+        does not affect the others; a failure of the whole batch request is
+        recorded against every message in it.
+
+        Args:
+            service: Gmail API service instance
+            message_ids: IDs of the messages to retrieve
+            format: Gmail message format to request
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            Tuple of (messages keyed by ID, errors keyed by ID)
+        """
+        return cls._execute_batches(
+            service,
+            message_ids,
+            lambda message_id: cls._message_request(service, message_id, format),
+            'messages.get',
+            user_key,
+        )
+
+    @classmethod
+    def _fetch_threads_batch(
+        cls,
+        service,
+        thread_ids: List[str],
+        user_key: str = 'me',
+    ) -> Tuple[Dict[str, Dict], Dict[str, Exception]]:
+        """Retrieve full-format threads in Gmail HTTP batch requests.
+
+        Args:
+            service: Gmail API service instance
+            thread_ids: IDs of the threads to retrieve
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            Tuple of (threads keyed by ID, errors keyed by ID)
+        """
+        return cls._execute_batches(
+            service,
+            thread_ids,
+            lambda thread_id: service.users().threads().get(userId='me', id=thread_id, format='full'),
+            'threads.get',
+            user_key,
+        )
+
+    @classmethod
+    def _execute_batches(
+        cls,
+        service,
+        ids: List[str],
+        make_request: Callable,
+        method: str,
+        user_key: str = 'me',
+    ) -> Tuple[Dict[str, Dict], Dict[str, Exception]]:
+        """Run ``make_request(id)`` for every ID in batches of up to BATCH_SIZE.
+
+        Args:
+            service: Gmail API service instance
+            ids: IDs to retrieve
+            make_request: Builds the unexecuted request for one ID
+            method: Gmail API method name, for rate limiting
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            Tuple of (responses keyed by ID, errors keyed by ID)
+        """
+        fetched: Dict[str, Dict] = {}
+        errors: Dict[str, Exception] = {}
+
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                fetched[request_id] = response
+
+        policy = cls.retry_policy
+        state = policy.start()
+        pending = list(ids)
+        while pending:
+            state.attempts += 1
+            for start in range(0, len(pending), BATCH_SIZE):
+                chunk = pending[start:start + BATCH_SIZE]
+                batch = service.new_batch_http_request(callback=_collect)
+                for item_id in chunk:
+                    batch.add(make_request(item_id), request_id=item_id)
+
+                cls._rate_limit(method, user_key, count=len(chunk))
+                try:
+                    batch.execute()
+                except Exception as e:
+                    logger.error("Error executing batch of %d %s calls: %s", len(chunk), method, e)
+                    for item_id in chunk:
+                        if item_id not in fetched:
+                            errors.setdefault(item_id, e)
+
+                failed = [errors[item_id] for item_id in chunk if item_id in errors]
+                throttled = next(
+                    (error for error in failed
+                     if isinstance(error, HttpError) and error.resp.status == 429),
+                    None,
+                )
+                if throttled is not None:
+                    cls._record_result(throttled, user_key)
+                else:
+                    # Only items that came back count as successes
+                    if len(failed) < len(chunk):
+                        cls._record_result(user_key=user_key)
+                    if failed:
+                        cls._record_result(failed[0], user_key, count=len(failed))
+
+            # Resend only the items that failed transiently, all after one backoff
+            retryable = [item_id for item_id in pending
+                         if item_id in errors and policy.is_retryable(errors[item_id])]
+            if not retryable:
+                break
+            # Back off for the longest Retry-After any of them asked for
+            error = max((errors[item_id] for item_id in retryable),
+                        key=lambda e: policy.retry_after(e) or 0)
+            delay = state.next_delay(error)
+            if delay is None:
+                state.finish(gave_up=True)
+                return fetched, errors
+            logger.warning("Retrying %d failed %s calls in %.2fs", len(retryable), method, delay)
+            state.sleep(delay)
+            for item_id in retryable:
+                del errors[item_id]
+            pending = retryable
+
+        state.finish()
+        return fetched, errors
+
+    @classmethod
+    def _build_email_data(cls, msg: Dict, parse_content: bool = False, include_body: bool = True) -> Dict:
+        """Convert a Gmail API message resource into an email dictionary.
+
+        Args:
+            msg: Message resource returned by messages().get
+            parse_content: Whether to parse email content for job details
+            include_body: Whether ``msg`` carries the body; when False (a
+                metadata-format message) ``body`` is set to None
+
+        Returns:
+            Email dictionary containing metadata and content
+        """
+        email_data = {
+            'id': msg['id'],
+            'thread_id': msg['threadId'],
+            'labels': msg.get('labelIds', []),
+            'subject': cls._get_header_value(msg, 'Subject'),
+            'from': cls._get_header_value(msg, 'From'),
+            'to': cls._get_header_value(msg, 'To'),
+            'date': cls._get_header_value(msg, 'Date'),
+            'body': cls._get_body(msg) if include_body else None
+        }
+
+        # Parse content if requested
+        if parse_content:
+            parsed_data = EmailParser().parse_email(email_data)
+            email_data.update(parsed_data)
+
+        return email_data
+
+    @classmethod
+    def _build_thread_data(cls, thread: Dict, parse_content: bool = False) -> Dict:
+        """Convert a Gmail API thread resource into an application-candidate record.
+
+        Args:
+            thread: Thread resource returned by threads().get
+            parse_content: Whether to parse the whole conversation for job details
+
+        Returns:
+            Dictionary with the thread's subject, participants, first and last
+            dates, and its messages as email dictionaries, oldest first
+        """
+        messages = [cls._build_email_data(msg) for msg in thread.get('messages', [])]
+        participants = []
+        for message in messages:
+            if message['from'] and message['from'] not in participants:
+                participants.append(message['from'])
+
+        thread_data = {
+            'thread_id': thread['id'],
+            'subject': messages[0]['subject'] if messages else '',
+            'participants': participants,
+            'first_date': messages[0]['date'] if messages else '',
+            'last_date': messages[-1]['date'] if messages else '',
+            'message_ids': [message['id'] for message in messages],
+            'messages': messages,
+        }
+
+        # Parse the conversation as one document, so details mentioned in
+        # any message count towards the candidate. Each message is cleaned on
+        # its own: the history quoted in one must not cut off the next.
+        if parse_content and messages:
+            bodies = [EmailParser.clean_body(message['body']) for message in messages if message['body']]
+            conversation = {
+                'subject': thread_data['subject'],
+                'body': '\n\n'.join(body.text for body in bodies),
+            }
+            thread_data.update(EmailParser().parse_email(conversation))
+            thread_data['stripped_bytes'] = thread_data.get('stripped_bytes', 0) + sum(body.removed for body in bodies)
+
+        return thread_data
 
     @staticmethod
     def _get_header_value(message: Dict, header_name: str) -> str:
@@ -163,7 +674,8 @@ class GmailEmailService:
     def _get_body(cls, message: Dict) -> str:
         """Extract email body from message.
 
-        Handles both plain text and HTML message parts.
+        Walks nested MIME parts, prefers HTML over plain text, skips
+        attachments and decodes only the chosen part, using its charset.
 
         Args:
             message: Email message dictionary
@@ -172,37 +684,7 @@ class GmailEmailService:
             Email body text
         """
         try:
-            parts = message.get('payload', {}).get('parts', [])
-            if not parts:
-                # Handle messages without parts
-                data = message['payload'].get('body', {}).get('data', '')
-                if data:
-                    return base64.urlsafe_b64decode(data).decode('utf-8')
-                return ''
-
-            # Try to find HTML part first, then fall back to plain text
-            html_part = None
-            text_part = None
-
-            for part in parts:
-                mime_type = part.get('mimeType', '')
-                if mime_type == 'text/html':
-                    html_part = part
-                    break
-                elif mime_type == 'text/plain':
-                    text_part = part
-
-            # Use HTML if available, otherwise use plain text
-            part = html_part or text_part
-            if not part:
-                return ''
-
-            data = part.get('body', {}).get('data', '')
-            if not data:
-                return ''
-
-            return base64.urlsafe_b64decode(data).decode('utf-8')
-
+            return get_text_body(message.get('payload', {}))
         except Exception as e:
             logger.error("Error extracting email body: %s", e)
             return ''
@@ -0,0 +1,543 @@
+"""Composable pipeline extracting job details from emails.
+
+Parsing an email is a chain of steps: decode the body, reduce HTML to text,
+drop quoted history, assemble and normalise the text, extract fields, score
+them and, when the score is low, ask a fallback extractor. Both email
+parsers run these steps as an ``ExtractionPipeline`` of ``Stage`` objects.
+Stages are registered by name (``register_stage``), and a pipeline is built
+from a list of names, so the order can be changed in the
+``EMAIL_EXTRACTION_PIPELINES`` setting without code changes.
+
+Every stage run is measured: its wall time and the size in bytes of the text
+going in and coming out are recorded per email on the context
+(``ExtractionContext.runs``) and summed per pipeline (``stats()``), so the
+hot path can be tuned from data. Stages marked ``skip_when_confident`` (such
+as the LLM fallback) are skipped for emails whose score already reached the
+pipeline's confidence threshold.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .html_text import html_to_text, looks_like_html
+from .mime import get_text_body
+from .quoted_text import strip_quoted_text
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Value and confidence of one extracted field
+FieldResult = Tuple[Optional[str], float]
+
+
+def text_size(text: str) -> int:
+    """Return the UTF-8 size of ``text`` in bytes."""
+    return len(text) if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+
+
+class StageRun(NamedTuple):
+    """Measurements of one stage on one email."""
+
+    stage: str
+    seconds: float
+    bytes_in: int
+    bytes_out: int
+    skipped: bool = False
+
+
+class ExtractionContext:
+    """State of one email as it moves through a pipeline.
+
+    Args:
+        email: Email dictionary with a 'body' (text or bytes) or a Gmail
+            'payload', and optional header fields such as 'subject'
+    """
+
+    def __init__(self, email: Dict):
+        self.email = email
+        self.text = ''
+        self.fields: Dict[str, FieldResult] = {}
+        self.confidence = 0.0
+        self.runs: List[StageRun] = []
+        # Scoring function of the last score stage, to rescore after a fallback
+        self.scorer: Optional[Callable[[Dict[str, float]], float]] = None
+
+    @property
+    def values(self) -> Dict[str, Optional[str]]:
+        """Extracted value per field."""
+        return {field: value for field, (value, _) in self.fields.items()}
+
+    @property
+    def scores(self) -> Dict[str, float]:
+        """Confidence per field."""
+        return {field: confidence for field, (_, confidence) in self.fields.items()}
+
+    def bytes_removed(self, stage: str) -> int:
+        """Bytes of text removed by ``stage``, or 0 if it did not run."""
+        return sum(run.bytes_in - run.bytes_out for run in self.runs
+                   if run.stage == stage and not run.skipped)
+
+    def rescore(self) -> None:
+        """Recompute the overall confidence after the fields changed."""
+        if self.scorer is not None:
+            self.confidence = self.scorer(self.scores)
+
+
+class Stage:
+    """One step of an extraction pipeline.
+
+    Subclasses implement ``run``; stages that gain from seeing many emails at
+    once (e.g. to batch remote calls) also override ``run_many``. Text stages
+    only transform ``context.text``; ``ExtractionPipeline.prepare`` runs just
+    those.
+    """
+
+    name = ''
+    # Whether the stage only transforms the text
+    text_stage = True
+    # Whether the stage is skipped once the email's score is high enough
+    skip_when_confident = False
+
+    def run(self, context: ExtractionContext) -> None:
+        raise NotImplementedError
+
+    def run_many(self, contexts: List[ExtractionContext]) -> None:
+        for context in contexts:
+            self.run(context)
+
+    def input_size(self, context: ExtractionContext) -> int:
+        """Size in bytes of what the stage reads."""
+        return text_size(context.text)
+
+
+_STAGES: Dict[str, type] = {}
+
+
+def register_stage(name: str):
+    """Class decorator making a Stage subclass available as ``name``."""
+    def decorator(stage_class: type) -> type:
+        stage_class.name = name
+        _STAGES[name] = stage_class
+        return stage_class
+    return decorator
+
+
+def available_stages() -> List[str]:
+    """Names of the registered stages."""
+    return list(_STAGES)
+
+
+@register_stage('decode')
+class DecodeStage(Stage):
+    """Take the body text from the email, decoding bytes or a Gmail payload.
+
+    Line endings are normalised to '\\n', so later stages measure only what
+    they remove.
+
+    Args:
+        max_length: Characters of the body kept, or None for all
+        charset: Charset of bodies given as bytes
+    """
+
+    def __init__(self, max_length: Optional[int] = None, charset: str = 'utf-8'):
+        self.max_length = max_length
+        self.charset = charset
+
+    def input_size(self, context: ExtractionContext) -> int:
+        body = context.email.get('body')
+        if isinstance(body, bytes):
+            return len(body)
+        if body is None and context.email.get('payload'):
+            return len(context.email['payload'].get('body', {}).get('data') or '')
+        return text_size(str(body or ''))
+
+    def run(self, context: ExtractionContext) -> None:
+        body = context.email.get('body')
+        if body is None and context.email.get('payload'):
+            body = get_text_body(context.email['payload'])
+        elif isinstance(body, bytes):
+            body = body.decode(self.charset, errors='replace')
+        text = str(body or '')[:self.max_length]
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        context.text = text
+
+
+@register_stage('html_to_text')
+class HtmlToTextStage(Stage):
+    """Reduce an HTML body to its visible text.
+
+    Args:
+        backend: HTML text backend; defaults to the EMAIL_HTML_TEXT_BACKEND setting
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend
+
+    def run(self, context: ExtractionContext) -> None:
+        if looks_like_html(context.text):
+            context.text = html_to_text(context.text, backend=self.backend)
+
+
+@register_stage('strip_quotes')
+class StripQuotesStage(Stage):
+    """Remove quoted replies, signatures and disclaimers."""
+
+    def run(self, context: ExtractionContext) -> None:
+        context.text = strip_quoted_text(context.text).text
+
+
+@register_stage('compose')
+class ComposeStage(Stage):
+    """Put header fields of the email in front of the body text.
+
+    Args:
+        headers: (email key, label) pairs; each present header becomes
+            ``label + value + separator``
+        separator: Text after each header
+        skip_empty: Leave out headers with empty values, not just missing ones
+    """
+
+    def __init__(self, headers: Sequence[Tuple[str, str]] = (), separator: str = '\n', skip_empty: bool = False):
+        self.headers = headers
+        self.separator = separator
+        self.skip_empty = skip_empty
+
+    def run(self, context: ExtractionContext) -> None:
+        prefix = ''.join(
+            f'{label}{context.email[key]}{self.separator}'
+            for key, label in self.headers
+            if key in context.email and (context.email[key] or not self.skip_empty)
+        )
+        if prefix:
+            context.text = prefix + context.text
+
+
+@register_stage('normalize')
+class NormalizeStage(Stage):
+    """Normalise line endings and whitespace, and cap the text length.
+
+    Args:
+        collapse_whitespace: Trim lines, collapse runs of whitespace within
+            them and drop empty lines
+        max_length: Characters kept, or None for all
+    """
+
+    def __init__(self, collapse_whitespace: bool = True, max_length: Optional[int] = None):
+        self.collapse_whitespace = collapse_whitespace
+        self.max_length = max_length
+
+    def run(self, context: ExtractionContext) -> None:
+        text = context.text
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        if self.collapse_whitespace:
+            lines = (re.sub(r'\s+', ' ', line.strip()) for line in text.split('\n'))
+            text = '\n'.join(line for line in lines if line)
+        context.text = text[:self.max_length]
+
+
+@register_stage('extract')
+class ExtractStage(Stage):
+    """Extract field values and their confidence from the text.
+
+    Args:
+        extract: Callable taking the context and returning a
+            (value, confidence) pair per field
+    """
+
+    text_stage = False
+
+    def __init__(self, extract: Optional[Callable[[ExtractionContext], Dict[str, FieldResult]]] = None):
+        if extract is None:
+            raise ImproperlyConfigured("The extract stage needs an extract function")
+        self.extract = extract
+
+    def run(self, context: ExtractionContext) -> None:
+        context.fields = self.extract(context)
+
+
+def mean_score(scores: Dict[str, float]) -> float:
+    """Unweighted mean of the field confidences."""
+    return sum(scores.values()) / len(scores) if scores else 0.0
+
+
+@register_stage('score')
+class ScoreStage(Stage):
+    """Combine the field confidences into the email's overall confidence.
+
+    Args:
+        score: Callable taking the confidence per field; defaults to their mean
+    """
+
+    text_stage = False
+
+    def __init__(self, score: Callable[[Dict[str, float]], float] = mean_score):
+        self.score = score
+
+    def run(self, context: ExtractionContext) -> None:
+        context.scorer = self.score
+        context.rescore()
+
+
+@register_stage('fallback')
+class FallbackStage(Stage):
+    """Fill empty fields from a fallback extractor, such as an LLM.
+
+    Runs only for emails below the pipeline's confidence threshold. Emails
+    are handed to the extractor together, so it can batch them.
+
+    Args:
+        get_extractor: Callable returning an object with
+            ``extract_many(texts)`` (e.g. an LLMExtractor), or None when the
+            fallback is disabled; without it the stage does nothing
+        field_map: Pipeline field name to extractor field name, for fields
+            named differently; fields not mapped keep their name
+        confidence: Confidence given to values from the extractor
+    """
+
+    text_stage = False
+    skip_when_confident = True
+
+    def __init__(self, get_extractor: Optional[Callable[[], object]] = None,
+                 field_map: Optional[Dict[str, str]] = None, confidence: float = 0.6):
+        self.get_extractor = get_extractor or (lambda: None)
+        self.field_map = field_map or {}
+        self.confidence = confidence
+
+    def run(self, context: ExtractionContext) -> None:
+        self.run_many([context])
+
+    def run_many(self, contexts: List[ExtractionContext]) -> None:
+        extractor = self.get_extractor()
+        contexts = [context for context in contexts
+                    if any(not value for value in context.values.values())]
+        if extractor is None or not contexts:
+            return
+
+        for context, extracted in zip(contexts, extractor.extract_many([c.text for c in contexts])):
+            for field, (value, confidence) in context.fields.items():
+                fallback = extracted.get(self.field_map.get(field, field))
+                if not value and fallback:
+                    context.fields[field] = (fallback, self.confidence)
+            context.rescore()
+
+
+class PipelineStats:
+    """Thread-safe per-stage totals of a pipeline's runs."""
+
+    COUNTERS = ('runs', 'skipped', 'seconds', 'bytes_in', 'bytes_out')
+
+    def __init__(self, stages: Iterable[str]):
+        self._lock = threading.Lock()
+        self._stages = list(stages)
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all totals."""
+        with self._lock:
+            self._totals = {stage: dict.fromkeys(self.COUNTERS, 0) for stage in self._stages}
+
+    def record(self, runs: Iterable[StageRun]) -> None:
+        """Add stage runs to the totals."""
+        with self._lock:
+            for run in runs:
+                totals = self._totals[run.stage]
+                if run.skipped:
+                    totals['skipped'] += 1
+                    continue
+                totals['runs'] += 1
+                totals['seconds'] += run.seconds
+                totals['bytes_in'] += run.bytes_in
+                totals['bytes_out'] += run.bytes_out
+
+    def as_dict(self) -> Dict[str, Dict]:
+        """Return the totals per stage, in pipeline order."""
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._totals.items()}
+
+
+class ExtractionPipeline:
+    """Run emails through a sequence of stages, measuring each.
+
+    Args:
+        stages: Stages in the order they run; names must be unique
+        confidence_threshold: Score at which ``skip_when_confident`` stages
+            are skipped
+    """
+
+    def __init__(self, stages: Sequence[Stage], confidence_threshold: float = 1.0):
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ImproperlyConfigured(f"Duplicate extraction stages: {names}")
+        self.stages = list(stages)
+        self.confidence_threshold = confidence_threshold
+        self._stats = PipelineStats(names)
+
+        # Short hash of the stage order and threshold, for cache keys of results depending on them
+        digest = hashlib.sha256(f'{"|".join(names)}:{confidence_threshold!r}'.encode('utf-8'))
+        self.fingerprint = digest.hexdigest()[:12]
+
+    @classmethod
+    def from_config(
+        cls,
+        names: Sequence[str],
+        options: Optional[Dict[str, Dict]] = None,
+        confidence_threshold: float = 1.0,
+    ) -> 'ExtractionPipeline':
+        """Build a pipeline from registered stage names.
+
+        Args:
+            names: Stage names in the order they run
+            options: Keyword arguments per stage name
+            confidence_threshold: Score at which skippable stages are skipped
+
+        Raises:
+            ImproperlyConfigured: If a stage name is not registered
+        """
+        options = options or {}
+        stages = []
+        for name in names:
+            try:
+                stage_class = _STAGES[name]
+            except KeyError:
+                raise ImproperlyConfigured(f"Unknown extraction stage: {name}") from None
+            stages.append(stage_class(**options.get(name, {})))
+        return cls(stages, confidence_threshold)
+
+    def has_stage(self, name: str) -> bool:
+        """Whether the pipeline includes stage ``name``."""
+        return any(stage.name == name for stage in self.stages)
+
+    def run(self, email: Dict, skip: Iterable[str] = ()) -> ExtractionContext:
+        """Run one email through the pipeline.
+
+        Args:
+            email: Email dictionary, as taken by ExtractionContext
+            skip: Names of stages to leave out
+
+        Returns:
+            The email's context, with its text, fields, confidence and runs
+        """
+        return self.run_many([email], skip)[0]
+
+    def run_many(self, emails: Iterable[Dict], skip: Iterable[str] = ()) -> List[ExtractionContext]:
+        """Run emails through the pipeline together, stage by stage."""
+        skip = set(skip)
+        contexts = [ExtractionContext(email) for email in emails]
+        self._run(contexts, [stage for stage in self.stages if stage.name not in skip])
+        return contexts
+
+    def resume(self, contexts: List[ExtractionContext], names: Iterable[str]) -> None:
+        """Run only the stages ``names`` on contexts the pipeline already ran.
+
+        For finishing stages left out of an earlier ``run`` without repeating
+        the others.
+        """
+        names = set(names)
+        self._run(contexts, [stage for stage in self.stages if stage.name in names])
+
+    def prepare(self, email: Dict) -> ExtractionContext:
+        """Run only the text stages, up to the first stage working on fields."""
+        stages = []
+        for stage in self.stages:
+            if not stage.text_stage:
+                break
+            stages.append(stage)
+        context = ExtractionContext(email)
+        self._run([context], stages)
+        return context
+
+    def stats(self) -> Dict[str, Dict]:
+        """Totals per stage: runs, skipped, seconds, bytes_in and bytes_out."""
+        return self._stats.as_dict()
+
+    def reset_stats(self) -> None:
+        """Zero the per-stage totals."""
+        self._stats.reset()
+
+    def _run(self, contexts: List[ExtractionContext], stages: List[Stage]) -> None:
+        if not stages:
+            return
+        for stage in stages:
+            active = []
+            for context in contexts:
+                if stage.skip_when_confident and context.confidence >= self.confidence_threshold:
+                    size = text_size(context.text)
+                    context.runs.append(StageRun(stage.name, 0.0, size, size, skipped=True))
+                else:
+                    active.append(context)
+
+            if active:
+                sizes = [stage.input_size(context) for context in active]
+                start = time.perf_counter()
+                stage.run_many(active)
+                # A batched run is shared evenly between its emails
+                seconds = (time.perf_counter() - start) / len(active)
+                for context, size in zip(active, sizes):
+                    context.runs.append(StageRun(stage.name, seconds, size, text_size(context.text)))
+
+        self._stats.record(run for context in contexts for run in context.runs[-len(stages):])
+
+
+_pipelines_lock = threading.Lock()
+# Parser classes holding a built pipeline, to reset when the setting changes
+_pipeline_classes = weakref.WeakSet()
+
+
+def configured_stages(pipeline: str, stages: Sequence[str], confidence_threshold: float) -> Tuple[List[str], float]:
+    """Apply the EMAIL_EXTRACTION_PIPELINES setting to a parser's defaults.
+
+    Args:
+        pipeline: Key of the parser's pipeline in the setting
+        stages: Default stage names
+        confidence_threshold: Default confidence threshold
+
+    Returns:
+        The stage names and confidence threshold to use
+    """
+    try:
+        config = getattr(settings, 'EMAIL_EXTRACTION_PIPELINES', {}).get(pipeline, {})
+    except ImproperlyConfigured:
+        config = {}
+    return list(config.get('STAGES', stages)), config.get('CONFIDENCE_THRESHOLD', confidence_threshold)
+
+
+def pipeline_for(parser_class: type) -> ExtractionPipeline:
+    """Return the pipeline of ``parser_class``, building it on first use.
+
+    The class provides ``PIPELINE_NAME``, ``STAGES``,
+    ``CONFIDENCE_THRESHOLD`` and ``stage_options()``; subclasses get their
+    own pipeline.
+    """
+    pipeline = parser_class.__dict__.get('_pipeline')
+    if pipeline is None:
+        with _pipelines_lock:
+            pipeline = parser_class.__dict__.get('_pipeline')
+            if pipeline is None:
+                names, threshold = configured_stages(
+                    parser_class.PIPELINE_NAME, parser_class.STAGES, parser_class.CONFIDENCE_THRESHOLD)
+                pipeline = ExtractionPipeline.from_config(names, parser_class.stage_options(), threshold)
+                parser_class._pipeline = pipeline
+                _pipeline_classes.add(parser_class)
+    return pipeline
+
+
+@receiver(setting_changed)
+def _reset_pipelines(setting, **kwargs):
+    if setting == 'EMAIL_EXTRACTION_PIPELINES':
+        with _pipelines_lock:
+            for parser_class in list(_pipeline_classes):
+                if '_pipeline' in parser_class.__dict__:
+                    del parser_class._pipeline
+            _pipeline_classes.clear()
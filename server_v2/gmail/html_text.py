@@ -0,0 +1,293 @@
+"""Streaming HTML-to-text extraction for email bodies.
+
+Email parsing only needs the visible text of an HTML body, so building a
+full document tree (as BeautifulSoup does) is wasted work and memory. The
+extractors here consume parser events as they arrive and keep nothing but
+the output text: ``<script>``, ``<style>`` and ``<template>`` content,
+comments and hidden elements (``hidden``, ``display: none``,
+``visibility: hidden``, ``mso-hide: all``) are dropped, and block-level
+elements are separated by newlines.
+
+Two backends are available: ``html.parser`` (stdlib, always present) and
+``lxml`` (used only if installed). The default is chosen with the
+``EMAIL_HTML_TEXT_BACKEND`` setting; more can be added with
+``register_backend``.
+"""
+
+import logging
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'html.parser'
+
+# Elements whose content is never displayed
+SKIPPED_TAGS = frozenset({'script', 'style', 'template'})
+# Elements that never have an end tag
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr',
+})
+# Elements that start on a new line
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'td', 'th', 'title', 'tr', 'ul',
+})
+
+# Start tags that implicitly close an open element, as in the HTML spec: a
+# <li> ends the previous <li>, a <td> the previous cell, a block a <p>, etc.
+_IMPLIED_CLOSES: Dict[str, frozenset] = {
+    tag: frozenset({'p'}) for tag in BLOCK_TAGS - {'br', 'td', 'th', 'title', 'tr'}
+}
+_IMPLIED_CLOSES.update({
+    'li': frozenset({'li', 'p'}),
+    'dt': frozenset({'dt', 'dd', 'p'}),
+    'dd': frozenset({'dt', 'dd', 'p'}),
+    'td': frozenset({'td', 'th'}),
+    'th': frozenset({'td', 'th'}),
+    'tr': frozenset({'tr', 'td', 'th'}),
+    'option': frozenset({'option'}),
+})
+# Elements an implied close does not reach past, e.g. a <li> in a nested list
+# leaves the outer list's <li> open
+_SCOPE_BOUNDARIES = frozenset({'dl', 'ol', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul'})
+
+_HIDDEN_STYLE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden|mso-hide\s*:\s*all', re.I)
+
+# Markup that only occurs in HTML: a doctype, a comment, or a start or end tag
+# of a known element. Plain text such as "John <john@example.com>" or "a < b"
+# does not match.
+_HTML_MARKUP = re.compile(
+    r'<!doctype\s+html|<!--|</?(?:%s)(?:\s[^<>]*)?/?>' % '|'.join(sorted(
+        SKIPPED_TAGS | VOID_TAGS | BLOCK_TAGS
+        | {'a', 'b', 'body', 'center', 'em', 'font', 'head', 'html', 'i', 'span',
+           'strong', 'tbody', 'thead', 'u'},
+        key=len, reverse=True,
+    )),
+    re.I,
+)
+
+
+def looks_like_html(text: str) -> bool:
+    """Whether ``text`` contains HTML markup rather than just angle brackets."""
+    return bool(text) and '<' in text and _HTML_MARKUP.search(text) is not None
+
+
+def _is_hidden(attrs: Dict[str, Optional[str]]) -> bool:
+    """Whether an element with ``attrs`` is hidden from the reader."""
+    if 'hidden' in attrs:
+        return True
+    style = attrs.get('style')
+    return bool(style) and _HIDDEN_STYLE.search(style) is not None
+
+
+class TextCollector:
+    """Accumulate the visible text of a stream of parser events.
+
+    Backends translate their parser's callbacks into ``start``, ``end`` and
+    ``data`` calls. Open elements are tracked on a stack of tag names, closed
+    the way HTML does it: an end tag closes everything opened inside its
+    element, stray end tags are ignored, and tags such as ``<p>``, ``<li>``
+    and ``<td>`` are implicitly closed by the next one. Text is dropped while
+    a skipped or hidden element is open, so unclosed elements inside it (common
+    in email HTML) cannot hide what follows it.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._open: List[str] = []
+        # Stack position of the outermost skipped or hidden element, if any is open
+        self._hidden_at: Optional[int] = None
+        self._at_line_start = True
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        """Handle a start tag."""
+        tag = tag.lower()
+        closes = _IMPLIED_CLOSES.get(tag)
+        if closes:
+            self._close_implied(closes)
+        if tag in VOID_TAGS:
+            if self._hidden_at is None and tag in BLOCK_TAGS:
+                self._newline()
+            return
+        if self._hidden_at is None:
+            if tag in SKIPPED_TAGS or _is_hidden(attrs):
+                self._hidden_at = len(self._open)
+            elif tag in BLOCK_TAGS:
+                self._newline()
+        self._open.append(tag)
+
+    def end(self, tag: str) -> None:
+        """Handle an end tag."""
+        tag = tag.lower()
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index] == tag:
+                break
+        else:
+            # Void element, or nothing to close
+            return
+        was_hidden = self._hidden_at is not None
+        self._pop_to(index)
+        if not was_hidden and tag in BLOCK_TAGS:
+            self._newline()
+
+    def data(self, data: str) -> None:
+        """Handle text content."""
+        if self._hidden_at is None and data:
+            self._parts.append(data)
+            self._at_line_start = data.endswith('\n')
+
+    def text(self) -> str:
+        """Return the text collected so far."""
+        return ''.join(self._parts)
+
+    def _close_implied(self, closes: frozenset) -> None:
+        """Close the innermost open elements in ``closes``, up to a scope boundary."""
+        index = len(self._open) - 1
+        while index >= 0:
+            tag = self._open[index]
+            if tag in closes:
+                self._pop_to(index)
+            elif tag in _SCOPE_BOUNDARIES:
+                return
+            index -= 1
+
+    def _pop_to(self, index: int) -> None:
+        """Close the element at ``index`` of the stack and everything inside it."""
+        del self._open[index:]
+        if self._hidden_at is not None and self._hidden_at >= index:
+            self._hidden_at = None
+
+    def _newline(self) -> None:
+        if not self._at_line_start:
+            self._parts.append('\n')
+            self._at_line_start = True
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Stdlib ``html.parser`` backend; feed it HTML in as many chunks as needed."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.collector = TextCollector()
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+        if tag in VOID_TAGS:
+            self.collector.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def text(self) -> str:
+        """Return the visible text of everything fed so far."""
+        return self.collector.text()
+
+
+class _LxmlTarget:
+    """lxml parser target forwarding events to a TextCollector, building no tree."""
+
+    def __init__(self):
+        self.collector = TextCollector()
+
+    def start(self, tag, attrib):
+        self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def close(self):
+        return self.collector.text()
+
+
+def _chunks(html: Union[str, Iterable[str]]) -> Iterable[str]:
+    return (html,) if isinstance(html, str) else html
+
+
+def _extract_stdlib(html: Union[str, Iterable[str]]) -> str:
+    extractor = HTMLTextExtractor()
+    for chunk in _chunks(html):
+        extractor.feed(chunk)
+    extractor.close()
+    return extractor.text()
+
+
+def _extract_lxml(html: Union[str, Iterable[str]]) -> str:
+    from lxml import etree
+
+    parser = etree.HTMLParser(target=_LxmlTarget(), remove_comments=True)
+    for chunk in _chunks(html):
+        parser.feed(chunk)
+    return parser.close()
+
+
+_BACKENDS: Dict[str, Callable[[Union[str, Iterable[str]]], str]] = {
+    'html.parser': _extract_stdlib,
+}
+
+try:
+    import lxml.etree  # noqa: F401
+except ImportError:
+    pass
+else:
+    _BACKENDS['lxml'] = _extract_lxml
+
+
+def register_backend(name: str, extract: Callable[[Union[str, Iterable[str]]], str]) -> None:
+    """Make ``extract`` available as backend ``name``."""
+    _BACKENDS[name] = extract
+
+
+def available_backends() -> List[str]:
+    """Names of the backends usable in this environment."""
+    return list(_BACKENDS)
+
+
+def _default_backend() -> str:
+    try:
+        name = getattr(settings, 'EMAIL_HTML_TEXT_BACKEND', DEFAULT_BACKEND)
+    except ImproperlyConfigured:
+        return DEFAULT_BACKEND
+    if name not in _BACKENDS:
+        logger.warning("HTML text backend %s is not available, using %s", name, DEFAULT_BACKEND)
+        return DEFAULT_BACKEND
+    return name
+
+
+def html_to_text(html: Union[str, Iterable[str]], backend: Optional[str] = None) -> str:
+    """Return the visible text of an HTML document.
+
+    Args:
+        html: HTML as a string, or an iterable of chunks to parse incrementally
+        backend: Backend name; defaults to the EMAIL_HTML_TEXT_BACKEND setting
+
+    Returns:
+        Visible text, with block-level elements on separate lines
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    name = backend or _default_backend()
+    try:
+        extract = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown HTML text backend: {name}") from None
+    return extract(html)
@@ -0,0 +1,204 @@
+"""Keyword vocabulary of job emails, matched with an Aho-Corasick automaton.
+
+Scoring a job title or company name, and spotting a job title in a subject
+line, come down to asking which known words (titles such as "engineer",
+seniority words such as "senior", company suffixes such as "Inc") occur in a
+short text. Testing each keyword in turn costs one scan of the text per
+keyword, so it slows down as the vocabulary grows. ``KeywordAutomaton``
+builds an Aho-Corasick automaton over the whole vocabulary once and finds
+every hit in a single pass over the text, whatever the vocabulary size.
+
+The default vocabulary below is extended per category with the
+EMAIL_KEYWORDS setting; ``get_automaton()`` returns the automaton built from
+both, rebuilt when the setting changes.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Set
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TITLE = 'title'
+SENIORITY = 'seniority'
+COMPANY_SUFFIX = 'company_suffix'
+
+DEFAULT_VOCABULARY: Dict[str, List[str]] = {
+    TITLE: ['developer', 'engineer', 'manager', 'analyst', 'designer'],
+    SENIORITY: ['intern', 'junior', 'mid-level', 'senior', 'sr', 'lead', 'staff', 'principal', 'head of'],
+    COMPANY_SUFFIX: ['inc', 'llc', 'ltd', 'corp', 'limited'],
+}
+
+# Categories whose keywords only match whole words ("Inc" but not "Incubator");
+# the others match anywhere, so "engineer" is found in "Engineering"
+WHOLE_WORD_CATEGORIES = frozenset({SENIORITY, COMPANY_SUFFIX})
+
+
+class KeywordHit(NamedTuple):
+    """One occurrence of a keyword; start and end index the searched text."""
+
+    start: int
+    end: int
+    keyword: str
+    category: str
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class KeywordAutomaton:
+    """Case-insensitive multi-keyword matcher.
+
+    Args:
+        vocabulary: Keywords per category; a keyword may be in several
+            categories
+        whole_word_categories: Categories whose keywords must not be part of
+            a longer word
+    """
+
+    def __init__(self, vocabulary: Mapping[str, Iterable[str]],
+                 whole_word_categories: Iterable[str] = WHOLE_WORD_CATEGORIES):
+        self.vocabulary = {category: sorted({keyword.lower() for keyword in keywords if keyword})
+                           for category, keywords in vocabulary.items()}
+        self.whole_word_categories = frozenset(whole_word_categories)
+
+        # Trie of the keywords: per state, its transitions, failure link and
+        # the (keyword, category) pairs ending there, outputs of the failure
+        # chain included
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[tuple]] = [[]]
+        for category, keywords in self.vocabulary.items():
+            for keyword in keywords:
+                self._add(keyword, category)
+        self._link()
+
+        # Short hash of the vocabulary, for cache keys of results depending on it
+        digest = hashlib.sha256()
+        for category in sorted(self.vocabulary):
+            whole_word = category in self.whole_word_categories
+            digest.update(f'{category}:{whole_word}:{"|".join(self.vocabulary[category])}\n'.encode('utf-8'))
+        self.fingerprint = digest.hexdigest()[:12]
+
+    def __len__(self) -> int:
+        return sum(map(len, self.vocabulary.values()))
+
+    def find(self, text: str, categories: Optional[Iterable[str]] = None) -> List[KeywordHit]:
+        """Find every keyword occurrence in ``text``, overlapping ones included.
+
+        Args:
+            text: Text to search
+            categories: Categories to report, or None for all
+
+        Returns:
+            List[KeywordHit]: Hits ordered by end, then longest first
+        """
+        wanted = None if categories is None else set(categories)
+        lowered = self._lower(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = []
+        state = 0
+        for index, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, category in out[state]:
+                if wanted is not None and category not in wanted:
+                    continue
+                start = index + 1 - len(keyword)
+                if category in self.whole_word_categories and not self._is_whole_word(text, start, index + 1):
+                    continue
+                hits.append(KeywordHit(start, index + 1, keyword, category))
+        return hits
+
+    def categories(self, text: str) -> Set[str]:
+        """Return the categories with at least one keyword in ``text``."""
+        return {hit.category for hit in self.find(text)}
+
+    def first(self, text: str, category: str) -> Optional[KeywordHit]:
+        """Return the earliest starting hit of ``category`` in ``text``, or None."""
+        hits = self.find(text, (category,))
+        return min(hits, key=lambda hit: (hit.start, -hit.end)) if hits else None
+
+    def _add(self, keyword: str, category: str) -> None:
+        state = 0
+        for char in keyword:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._out[state].append((keyword, category))
+
+    def _link(self) -> None:
+        """Set failure links breadth first, merging outputs along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    @staticmethod
+    def _lower(text: str) -> str:
+        """Lower-case ``text`` keeping every character at its index."""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters (e.g. 'İ') lower-case to two; leave those as they are
+            lowered = ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+        return lowered
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        return ((start == 0 or not _is_word_char(text[start - 1]))
+                and (end == len(text) or not _is_word_char(text[end])))
+
+
+def configured_vocabulary() -> Dict[str, List[str]]:
+    """Return the default vocabulary extended with the EMAIL_KEYWORDS setting."""
+    extra = getattr(settings, 'EMAIL_KEYWORDS', {}) or {}
+    if not isinstance(extra, Mapping):
+        raise ImproperlyConfigured("EMAIL_KEYWORDS must map categories to lists of keywords")
+    vocabulary = {category: list(keywords) for category, keywords in DEFAULT_VOCABULARY.items()}
+    for category, keywords in extra.items():
+        vocabulary.setdefault(category, []).extend(keywords)
+    return vocabulary
+
+
+_automaton: Optional[KeywordAutomaton] = None
+_automaton_lock = threading.Lock()
+
+
+def get_automaton() -> KeywordAutomaton:
+    """Return the automaton over the configured vocabulary, building it on first use."""
+    global _automaton
+    automaton = _automaton
+    if automaton is None:
+        with _automaton_lock:
+            if _automaton is None:
+                _automaton = KeywordAutomaton(configured_vocabulary())
+                logger.debug("Built keyword automaton over %d keywords", len(_automaton))
+            automaton = _automaton
+    return automaton
+
+
+@receiver(setting_changed)
+def _reset_automaton(setting, **kwargs):
+    global _automaton
+    if setting == 'EMAIL_KEYWORDS':
+        with _automaton_lock:
+            _automaton = None
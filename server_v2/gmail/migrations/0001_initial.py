@@ -0,0 +1,30 @@
+# Generated by Django 5.0.2 on 2026-10-16 22:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GmailSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('history_id', models.CharField(blank=True, max_length=32)),
+                ('last_full_sync', models.DateTimeField(blank=True, null=True)),
+                ('last_synced', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gmail_sync_state', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'gmail_sync_states',
+            },
+        ),
+    ]
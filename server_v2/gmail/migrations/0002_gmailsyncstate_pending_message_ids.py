@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gmail', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gmailsyncstate',
+            name='pending_message_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,146 @@
+"""MIME part walking for Gmail message payloads.
+
+Gmail returns a message as a tree of parts (``payload.parts``, nested for
+``multipart/*``), each with its body as base64url text. This module walks
+that tree depth-first without decoding anything, picks the best text part,
+and decodes only that part, once, straight to ``str`` with its declared
+charset. Attachment parts are skipped unless explicitly requested.
+"""
+
+import binascii
+import codecs
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Preferred body types, best first
+TEXT_PREFERENCE = ('text/html', 'text/plain')
+DEFAULT_CHARSET = 'utf-8'
+
+# base64url -> standard base64 alphabet, so binascii can decode it directly
+_URLSAFE_TO_STANDARD = bytes.maketrans(b'-_', b'+/')
+
+
+def _header(part: Dict, name: str) -> str:
+    """Return the value of header ``name`` of a part, or an empty string."""
+    name = name.lower()
+    for header in part.get('headers') or ():
+        if header['name'].lower() == name:
+            return header['value']
+    return ''
+
+
+def is_attachment(part: Dict) -> bool:
+    """Whether ``part`` is an attachment rather than displayable content."""
+    if part.get('filename') or part.get('body', {}).get('attachmentId'):
+        return True
+    return _header(part, 'Content-Disposition').lower().startswith('attachment')
+
+
+def iter_parts(payload: Dict, include_attachments: bool = False) -> Iterator[Dict]:
+    """Yield the leaf parts of a payload depth-first, in document order.
+
+    Args:
+        payload: Message payload (or any part) from a full-format message
+        include_attachments: Whether to yield attachment parts too
+
+    Yields:
+        Leaf part dictionaries; nothing is decoded
+    """
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        children = part.get('parts')
+        if children:
+            stack.extend(reversed(children))
+        elif include_attachments or not is_attachment(part):
+            yield part
+
+
+def find_text_part(payload: Dict, preference: Sequence[str] = TEXT_PREFERENCE) -> Optional[Dict]:
+    """Return the best text part of a payload.
+
+    The first part of the most preferred type wins; the walk stops as soon as
+    a part of the top-ranked type is found.
+
+    Args:
+        payload: Message payload from a full-format message
+        preference: MIME types in order of preference
+
+    Returns:
+        The chosen part, or None if the payload has no text part
+    """
+    best, best_rank = None, len(preference)
+    for part in iter_parts(payload):
+        mime_type = part.get('mimeType', '').lower()
+        if mime_type not in preference or not part.get('body', {}).get('data'):
+            continue
+        rank = preference.index(mime_type)
+        if rank < best_rank:
+            best, best_rank = part, rank
+            if rank == 0:
+                break
+    return best
+
+
+def part_charset(part: Dict) -> str:
+    """Return the charset declared in a part's Content-Type header."""
+    for param in _header(part, 'Content-Type').split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value:
+            return value.strip().strip('"\'') or DEFAULT_CHARSET
+    return DEFAULT_CHARSET
+
+
+def decode_part(part: Dict) -> str:
+    """Decode the base64url body of a part to text using its charset.
+
+    Undecodable bytes are replaced rather than dropping the whole body.
+    """
+    data = part.get('body', {}).get('data')
+    if not data:
+        return ''
+
+    raw = data.encode('ascii').translate(_URLSAFE_TO_STANDARD)
+    # Gmail omits base64 padding
+    raw += b'=' * (-len(raw) % 4)
+    content = binascii.a2b_base64(raw)
+
+    charset = part_charset(part)
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        logger.debug("Unknown charset %s, decoding as %s", charset, DEFAULT_CHARSET)
+        charset = DEFAULT_CHARSET
+    return content.decode(charset, errors='replace')
+
+
+def get_text_body(payload: Dict, preference: Sequence[str] = TEXT_PREFERENCE) -> str:
+    """Return the text of the best body part of a payload, or ''.
+
+    A single-part payload is its own body, whatever its type.
+    """
+    if not payload.get('parts'):
+        return decode_part(payload)
+    part = find_text_part(payload, preference)
+    return decode_part(part) if part else ''
+
+
+def list_attachments(payload: Dict) -> List[Dict]:
+    """Describe the attachments of a payload without downloading or decoding them.
+
+    Returns:
+        List of dictionaries with filename, mime_type, size and attachment_id
+    """
+    return [
+        {
+            'filename': part.get('filename', ''),
+            'mime_type': part.get('mimeType', ''),
+            'size': part.get('body', {}).get('size', 0),
+            'attachment_id': part.get('body', {}).get('attachmentId'),
+        }
+        for part in iter_parts(payload, include_attachments=True)
+        if is_attachment(part)
+    ]
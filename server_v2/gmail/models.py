@@ -1,3 +1,30 @@
+"""Models for Gmail integration.
+
+This module defines the database models for tracking Gmail synchronisation.
+"""
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class GmailSyncState(models.Model):
+    """Model for storing the last Gmail history checkpoint of a user."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='gmail_sync_state',
+    )
+    history_id = models.CharField(max_length=32, blank=True)
+    last_full_sync = models.DateTimeField(null=True, blank=True)
+    last_synced = models.DateTimeField(null=True, blank=True)
+    # Messages seen before the checkpoint whose fetch failed transiently
+    pending_message_ids = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        """Meta options for GmailSyncState model."""
+        db_table = 'gmail_sync_states'
+
+    def __str__(self):
+        """String representation of the GmailSyncState."""
+        return f"Gmail sync for {self.user} at history {self.history_id or '-'}"
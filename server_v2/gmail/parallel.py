@@ -0,0 +1,139 @@
+"""Multi-process batch parsing of emails.
+
+Parsing is pure CPU work (HTML stripping and regex scans), so a single
+process cannot parse faster than one core. ``parse_batch`` spreads a stream
+of emails over a process pool in chunks large enough to amortise the cost of
+pickling work to and from the workers. It reads its input lazily and keeps
+only a bounded number of chunks in flight, yields results while later chunks
+are still being parsed, and reports failures per email instead of failing
+the whole batch.
+
+Parser classes take part by implementing ``_parse_item(email)``; each worker
+process builds one parser per class and reuses it for every chunk.
+"""
+
+import itertools
+import logging
+import math
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 64
+MAX_CHUNK_SIZE = 256
+# Chunks queued per worker, so a worker never waits for its next chunk
+CHUNKS_PER_WORKER = 2
+
+# Parser instances of the current (worker) process, by class
+_parsers: Dict[type, Any] = {}
+
+
+class ParseResult(NamedTuple):
+    """Outcome of parsing one email of a batch."""
+
+    index: int
+    value: Optional[Dict]
+    error: Optional[str] = None
+
+
+def _get_parser(parser_class: type):
+    """Return this process's parser instance of ``parser_class``."""
+    parser = _parsers.get(parser_class)
+    if parser is None:
+        parser = _parsers[parser_class] = parser_class()
+    return parser
+
+
+def _parse_chunk(parser_class: type, start: int, emails: List) -> List[ParseResult]:
+    """Parse a chunk of emails, isolating failures to the email that caused them."""
+    parser = _get_parser(parser_class)
+    results = []
+    for index, email in enumerate(emails, start):
+        try:
+            results.append(ParseResult(index, parser._parse_item(email)))
+        except Exception as e:
+            logger.error("Error parsing email %d of batch: %s", index, e)
+            results.append(ParseResult(index, None, f'{type(e).__name__}: {e}'))
+    return results
+
+
+def _chunks(emails: Iterable, chunk_size: int) -> Iterator[Tuple[int, List]]:
+    """Split ``emails`` lazily into (index of first email, chunk) pairs."""
+    items = iter(emails)
+    for start in itertools.count(0, chunk_size):
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+
+
+def default_chunk_size(emails: Iterable, workers: int) -> int:
+    """Pick a chunk size giving every worker a few chunks of a sized input."""
+    try:
+        count = len(emails)  # type: ignore[arg-type]
+    except TypeError:
+        return DEFAULT_CHUNK_SIZE
+    return max(1, min(MAX_CHUNK_SIZE, math.ceil(count / (workers * 4))))
+
+
+def parse_batch(
+    parser_class: type,
+    emails: Iterable,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    ordered: bool = True,
+    executor: Optional[Executor] = None,
+) -> Iterator[ParseResult]:
+    """Parse emails on a process pool, yielding results as chunks complete.
+
+    Args:
+        parser_class: Parser class implementing ``_parse_item(email)``
+        emails: Emails in the form the parser's ``_parse_item`` takes; read lazily
+        workers: Worker processes; defaults to the number of CPUs. With 1 the
+            emails are parsed in the calling process
+        chunk_size: Emails sent to a worker at a time; by default sized from
+            the input length when known
+        ordered: Yield results in input order; otherwise as soon as each
+            chunk completes
+        executor: Existing pool to run on instead of starting one
+
+    Yields:
+        ParseResult per email, with the parsed value or the error message
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or default_chunk_size(emails, workers)
+    chunks = _chunks(emails, chunk_size)
+
+    if workers == 1 and executor is None:
+        for start, chunk in chunks:
+            yield from _parse_chunk(parser_class, start, chunk)
+        return
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    in_flight: deque = deque()
+    try:
+        for start, chunk in itertools.islice(chunks, workers * CHUNKS_PER_WORKER):
+            in_flight.append(pool.submit(_parse_chunk, parser_class, start, chunk))
+
+        while in_flight:
+            if ordered:
+                done = [in_flight.popleft()]
+            else:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.remove(future)
+
+            for future in done:
+                # Refill before yielding so workers stay busy while the caller consumes
+                for start, chunk in itertools.islice(chunks, 1):
+                    in_flight.append(pool.submit(_parse_chunk, parser_class, start, chunk))
+                yield from future.result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,183 @@
+"""Cache of email parse results keyed by content hash.
+
+The same email is parsed again on every re-sync, every parse request and
+every client retry. ``ParseCache`` remembers results under a SHA-256 of the
+parser's identity and version plus the email content the parser reads, in
+two tiers: a bounded in-process LRU, then the configured Django cache shared
+by all processes. A repeat parse costs a hash and a lookup.
+
+Parsers declare a ``PARSER_VERSION``; bumping it when the parser's output
+changes gives every email a new key, so stale results are never served and
+expire from the shared cache on their own.
+The keyword vocabulary and the configured extraction stages are part of
+the key in the same way.
+"""
+
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 4096
+DEFAULT_TIMEOUT = 7 * 24 * 3600  # seconds in the shared cache
+CACHE_KEY_PREFIX = 'email:parse:'
+# How long to stay on the in-process tier after a shared cache error (seconds)
+CACHE_RETRY_INTERVAL = 30
+
+
+def content_key(namespace: str, parts: Iterable[str]) -> str:
+    """Hash a parser namespace and the content parts it reads into a cache key."""
+    digest = hashlib.sha256(namespace.encode('utf-8'))
+    for part in parts:
+        data = part.encode('utf-8', 'surrogatepass')
+        # Length-prefix each part so ('ab', 'c') and ('a', 'bc') differ
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Two-tier parse result cache: in-process LRU in front of a Django cache.
+
+    Args:
+        max_size: Results kept in the in-process LRU
+        timeout: Seconds results live in the shared cache
+        cache_alias: Django cache shared between processes, or None for the
+            in-process tier only
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        timeout: int = DEFAULT_TIMEOUT,
+        cache_alias: Optional[str] = 'default',
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared_disabled_until = 0.0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """Zero the hit, miss and eviction counters."""
+        with self._lock:
+            self.hits = 0
+            self.shared_hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict:
+        """Return the counters and current size as a dictionary."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+    def get_or_parse(self, namespace: str, parts: Iterable[str], parse: Callable[[], Dict]) -> Dict:
+        """Return the cached result for this content, parsing it on a miss.
+
+        Args:
+            namespace: Parser identity and version
+            parts: Every piece of content the parse result depends on
+            parse: Zero-argument callable producing the result
+
+        Returns:
+            A copy of the parse result, safe for the caller to modify
+        """
+        key = content_key(namespace, parts)
+        result = self._lookup(key)
+        if result is None:
+            result = parse()
+            self._store(key, result)
+        return copy.deepcopy(result)
+
+    def get(self, namespace: str, parts: Iterable[str]) -> Optional[Dict]:
+        """Return a copy of the cached result for this content, or None."""
+        result = self._lookup(content_key(namespace, parts))
+        return copy.deepcopy(result) if result is not None else None
+
+    def set(self, namespace: str, parts: Iterable[str], result: Dict) -> None:
+        """Cache ``result`` for this content, for results produced outside get_or_parse."""
+        self._store(content_key(namespace, parts), copy.deepcopy(result))
+
+    def clear(self) -> None:
+        """Empty the in-process tier; the shared tier expires on its own."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        """Return the result stored under ``key`` in either tier, counting the outcome."""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._shared_get(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._remember(key, result)
+        return result
+
+    def _store(self, key: str, result: Dict) -> None:
+        self._shared_set(key, result)
+        self._remember(key, result)
+
+    def _remember(self, key: str, result: Dict) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    @property
+    def _shared(self):
+        """The shared Django cache, or None while it is unused or unavailable."""
+        if not self.cache_alias or time.monotonic() < self._shared_disabled_until:
+            return None
+        from django.core.cache import caches
+        return caches[self.cache_alias]
+
+    def _shared_failed(self, error: Exception) -> None:
+        logger.warning("Parse cache backend unavailable, using in-process cache only: %s", error)
+        self._shared_disabled_until = time.monotonic() + CACHE_RETRY_INTERVAL
+
+    def _shared_get(self, key: str) -> Optional[Dict]:
+        try:
+            cache = self._shared
+            return cache.get(CACHE_KEY_PREFIX + key) if cache is not None else None
+        except Exception as e:
+            self._shared_failed(e)
+            return None
+
+    def _shared_set(self, key: str, result: Dict) -> None:
+        try:
+            cache = self._shared
+            if cache is not None:
+                cache.set(CACHE_KEY_PREFIX + key, result, self.timeout)
+        except Exception as e:
+            self._shared_failed(e)
+
+
+# Cache shared by the email parsers of this process
+parse_cache = ParseCache()
@@ -5,13 +5,179 @@ relevant information such as applicant name, job title, and company name.
 """
 
 import re
-from typing import Dict, Optional, List, Tuple
-from bs4 import BeautifulSoup
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 import logging
 from datetime import datetime
 
+from . import parallel
+from .extraction import ExtractionPipeline, pipeline_for
+from .keywords import COMPANY_SUFFIX, TITLE, get_automaton
+from .parse_cache import ParseCache, parse_cache
+from .quoted_text import StrippedText
+
 logger = logging.getLogger(__name__)
 
+
+# Non-ASCII characters that match an ASCII letter case-insensitively, or whose
+# lower case does; only in their presence can str.lower() disagree with re.IGNORECASE
+_CASE_HAZARDS = re.compile('[\u0130\u0131\u017f\u212a]')
+
+# Proper name format: capitalised words, at least two
+_PROPER_NAME = re.compile(r'^[A-Z][a-z]+(\s+[A-Z][a-z]+)+$')
+
+# Quantifiers that make the character or group before them optional
+_OPTIONAL = ('?', '*', '{')
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Whether ``pattern`` contains a ``|`` outside any group or character class."""
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+    return False
+
+
+def literal_prefixes(pattern: str) -> Optional[List[str]]:
+    """Return the literal keywords one of which every match of ``pattern`` starts with.
+
+    Understands a leading run of letters and digits (``job\\s*...``) and a
+    leading non-capturing alternation of such runs (``(?:company|employer)...``).
+
+    Returns:
+        Lower-cased keywords, or None if the pattern has no such prefix
+    """
+    if _has_top_level_alternation(pattern):
+        return None
+
+    if pattern.startswith('(?:'):
+        end = pattern.find(')')
+        alternatives = pattern[3:end].split('|')
+        if end == -1 or pattern[end + 1:end + 2] in _OPTIONAL:
+            return None
+        if not all(alt.isascii() and alt.isalnum() for alt in alternatives):
+            return None
+        return [alt.lower() for alt in alternatives]
+
+    length = 0
+    while length < len(pattern) and pattern[length].isascii() and pattern[length].isalnum():
+        length += 1
+    if pattern[length:length + 1] in _OPTIONAL:
+        length -= 1
+    return [pattern[:length].lower()] if length > 0 else None
+
+
+class PatternSet:
+    """Field extraction patterns compiled once and matched from a keyword index.
+
+    Instead of searching the whole text once per pattern, the text is
+    lower-cased once and the positions of every pattern's leading keywords
+    are located with ``str.find``, each keyword once however many patterns
+    start with it. Each pattern is then tried, anchored, only at its keyword
+    positions, skipping those inside its own previous match. That reproduces
+    ``re.finditer``. Texts where lower-casing could disagree with
+    case-insensitive matching locate keywords with a regex instead, and
+    patterns without a literal prefix fall back to ``finditer``.
+
+    With a ``window``, each match must end within that many characters of its
+    keyword. A pattern that backtracks over the rest of the text (e.g. a
+    greedy run followed by a suffix that is not there) then costs at most
+    ``window`` steps per keyword, keeping extraction linear in the text
+    length. Only matches that would run past the window are affected: they
+    end at its edge instead.
+
+    Args:
+        patterns: Mapping of field name to regex patterns, each capturing the
+            field value in its first group
+        flags: Regex flags applied to every pattern
+        window: Maximum length of a match, or None for no limit
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]], flags: int = re.IGNORECASE,
+                 window: Optional[int] = None):
+        self.patterns = patterns
+        self.window = window
+        self.compiled = {
+            field: [(re.compile(pattern, flags), literal_prefixes(pattern)) for pattern in field_patterns]
+            for field, field_patterns in patterns.items()
+        }
+        # Keyword positions are only equivalent to case-insensitive matching
+        self.indexable = bool(flags & re.IGNORECASE)
+        self._keyword_regexes = {
+            keyword: re.compile(f'(?={re.escape(keyword)})', flags)
+            for compiled in self.compiled.values()
+            for _, keywords in compiled
+            for keyword in keywords or ()
+        }
+
+    def scan(self, text: str) -> Dict[str, List[List[Tuple[str, str]]]]:
+        """Find the matches of every pattern in ``text``.
+
+        Returns:
+            Mapping of field name to one list per pattern, in pattern order,
+            of (value, matched text) pairs in the order they occur
+        """
+        lowered = text.lower() if self.indexable and not _CASE_HAZARDS.search(text) else None
+        positions: Dict[str, List[int]] = {}
+        found = {}
+
+        for field, compiled in self.compiled.items():
+            field_matches = found[field] = []
+            for regex, keywords in compiled:
+                if keywords is None or not self.indexable:
+                    field_matches.append([(m.group(1), m.group(0)) for m in regex.finditer(text)])
+                    continue
+
+                starts = []
+                for keyword in keywords:
+                    if keyword not in positions:
+                        positions[keyword] = (
+                            self._find_all(lowered, keyword) if lowered is not None
+                            else [m.start() for m in self._keyword_regexes[keyword].finditer(text)]
+                        )
+                    starts.extend(positions[keyword])
+                if len(keywords) > 1:
+                    starts.sort()
+
+                matches = []
+                last_end = 0
+                for start in starts:
+                    if start < last_end:
+                        continue
+                    end = start + self.window if self.window else len(text)
+                    match = regex.match(text, start, end)
+                    if match:
+                        matches.append((match.group(1), match.group(0)))
+                        last_end = match.end()
+                field_matches.append(matches)
+
+        return found
+
+    @staticmethod
+    def _find_all(text: str, keyword: str) -> List[int]:
+        """Return every start position of ``keyword`` in ``text``, overlapping ones included."""
+        starts = []
+        start = text.find(keyword)
+        while start != -1:
+            starts.append(start)
+            start = text.find(keyword, start + 1)
+        return starts
+
+
 class EmailParser:
     """Parser for extracting job application information from emails."""
 
@@ -28,8 +194,10 @@ class EmailParser:
             r'submitted\s+by:\s*([a-zA-Z\s.]+)',
         ],
         'job_title': [
-            r'(?:position|job|role):\s*([a-zA-Z0-9\s]+(?:\s+developer|\s+engineer|\s+manager|\s+analyst|\s+designer|\s+consultant|\s+specialist|\s+coordinator|\s+director|\s+lead|\s+architect|\s+administrator|\s+technician|\s+supervisor)?)',
-            r'applying\s+for:\s*([a-zA-Z0-9\s]+(?:\s+developer|\s+engineer|\s+manager|\s+analyst|\s+designer|\s+consultant|\s+specialist|\s+coordinator|\s+director|\s+lead|\s+architect|\s+administrator|\s+technician|\s+supervisor)?)',
+            # The greedy run already takes any ' developer' etc. that follows,
+            # so no title suffix alternation is needed after it
+            r'(?:position|job|role):\s*([a-zA-Z0-9\s]+)',
+            r'applying\s+for:\s*([a-zA-Z0-9\s]+)',
         ],
         'company_name': [
             r'(?:company|organization|employer):\s*([a-zA-Z0-9\s&]+)',
@@ -37,6 +205,19 @@ class EmailParser:
         ],
     }
 
+    # Parse-time budget: longest match considered, and input caps (characters)
+    MATCH_WINDOW = 512
+    MAX_BODY_LENGTH = 1_000_000
+    MAX_TEXT_LENGTH = 100_000
+
+    # PATTERNS compiled once; subclasses overriding PATTERNS get their own
+    pattern_set = PatternSet(PATTERNS, window=MATCH_WINDOW)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if ('PATTERNS' in cls.__dict__ or 'MATCH_WINDOW' in cls.__dict__) and 'pattern_set' not in cls.__dict__:
+            cls.pattern_set = PatternSet(cls.PATTERNS, window=cls.MATCH_WINDOW)
+
     # Field weights for confidence score calculation
     FIELD_WEIGHTS = {
         'applicant_name': 0.3,
@@ -53,6 +234,18 @@ class EmailParser:
         'job_id': 0.7,
     }
 
+    # Bump whenever a change alters parse results, to invalidate cached ones
+    PARSER_VERSION = '4'
+
+    # Result cache consulted by parse_email; None disables caching
+    cache: Optional[ParseCache] = parse_cache
+
+    # Extraction pipeline stages, overridable in EMAIL_EXTRACTION_PIPELINES
+    PIPELINE_NAME = 'gmail'
+    STAGES = ['decode', 'html_to_text', 'strip_quotes', 'compose', 'normalize', 'extract', 'score']
+    # Overall confidence above which skippable stages (the fallback) are skipped
+    CONFIDENCE_THRESHOLD = 0.8
+
     def calculate_field_confidence(self, field: str, value: str, match_quality: float) -> float:
         """
         Calculate confidence score for a specific field based on various factors.
@@ -95,19 +288,17 @@ class EmailParser:
 
         # Format checks
         if field == 'applicant_name':
-            if re.match(r'^[A-Z][a-z]+(\s+[A-Z][a-z]+)+$', value):  # Proper name format
+            if _PROPER_NAME.match(value):  # Proper name format
                 base_score *= 1.3
             if any(c.isdigit() for c in value):  # Names shouldn't contain numbers
                 base_score *= 0.4
 
         elif field == 'job_title':
-            common_terms = ['developer', 'engineer', 'manager', 'analyst', 'designer']
-            if any(term in value.lower() for term in common_terms):
+            if get_automaton().find(value, (TITLE,)):  # Common job title term
                 base_score *= 1.2
 
         elif field == 'company_name':
-            common_suffixes = ['Inc', 'LLC', 'Ltd', 'Corp', 'Limited']
-            if any(suffix in value for suffix in common_suffixes):
+            if get_automaton().find(value, (COMPANY_SUFFIX,)):  # Company suffix such as Inc
                 base_score *= 1.1
 
         # Normalize score to 0-1 range
@@ -122,36 +313,76 @@ class EmailParser:
             patterns: List of regex patterns
             field_name: Name of the field being extracted
             
+        Returns:
+            Tuple[Optional[str], float]: Extracted value and confidence score
+        """
+        candidates = [
+            (match.group(1), match.group(0))
+            for pattern in patterns
+            for match in re.finditer(pattern, text, re.IGNORECASE)
+        ]
+        return self._best_match(field_name, candidates)
+
+    def extract_fields(self, text: str) -> Dict[str, Tuple[Optional[str], float]]:
+        """
+        Extract every field of PATTERNS from one scan of the text.
+
+        Gives the same results as calling extract_field for each field.
+
+        Args:
+            text: Text to search in
+
+        Returns:
+            Dict[str, Tuple[Optional[str], float]]: Value and confidence score per field
+        """
+        return {
+            field: self._best_match(field, [candidate for pattern_matches in matches
+                                            for candidate in pattern_matches])
+            for field, matches in self.pattern_set.scan(text).items()
+        }
+
+    def _best_match(self, field_name: str, candidates: List[Tuple[str, str]]) -> Tuple[Optional[str], float]:
+        """
+        Pick the most confident of a field's candidate matches.
+
+        Ties go to the earliest candidate.
+
+        Args:
+            field_name: Name of the field being extracted
+            candidates: (captured value, matched text) pairs in pattern order
+
         Returns:
             Tuple[Optional[str], float]: Extracted value and confidence score
         """
         best_match = None
         best_confidence = 0.0
+        prefix = field_name.split('_')[0]
+
+        for value, matched in candidates:
+            value = value.strip()
+
+            # Calculate match quality based on regex match
+            match_quality = 0.7  # Base quality for a regex match
 
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                value = match.group(1).strip()
-                
-                # Calculate match quality based on regex match
-                match_quality = 0.7  # Base quality for a regex match
-                
-                # Adjust match quality based on pattern specificity
-                if match.group(0).lower().startswith(field_name.split('_')[0]):
-                    match_quality += 0.2  # Boost if pattern starts with field name
-                
-                # Calculate field-specific confidence
-                confidence = self.calculate_field_confidence(field_name, value, match_quality)
-                
-                if confidence > best_confidence:
-                    best_match = value
-                    best_confidence = confidence
+            # Adjust match quality based on pattern specificity
+            if matched.lower().startswith(prefix):
+                match_quality += 0.2  # Boost if pattern starts with field name
+
+            # Calculate field-specific confidence
+            confidence = self.calculate_field_confidence(field_name, value, match_quality)
+
+            if confidence > best_confidence:
+                best_match = value
+                best_confidence = confidence
 
         return best_match, best_confidence
 
     def parse_email(self, email_data: Dict) -> Dict:
         """
         Parse email data to extract job application information.
+
+        Results are cached by content, so parsing the same email again is a
+        hash lookup.
         
         Args:
             email_data: Dictionary containing email data
@@ -159,27 +390,48 @@ class EmailParser:
         Returns:
             Dict: Extracted information with confidence scores
         """
+        if self.cache is None:
+            return self._parse_email(email_data)
+        return self.cache.get_or_parse(
+            f'{type(self).__module__}.{type(self).__qualname__}:{self.PARSER_VERSION}:{get_automaton().fingerprint}'
+            f':{self.pipeline().fingerprint}',
+            self._cache_key_parts(email_data),
+            lambda: self._parse_email(email_data),
+        )
+
+    @staticmethod
+    def _cache_key_parts(email_data: Dict) -> Tuple[str, ...]:
+        """
+        Return the content a parse result depends on, for the cache key.
+
+        Only the subject, sender and body (or, without a body, the Gmail
+        payload) are read. Whether subject and sender are present changes
+        the text, so presence is part of the key.
+        """
+        headers = tuple(
+            repr(email_data[key]) if key in email_data else ''
+            for key in ('subject', 'sender')
+        )
+        body = email_data.get('body')
+        if body is None and email_data.get('payload'):
+            body = repr(email_data['payload'])
+        return headers + (str(body or ''),)
+
+    def _parse_email(self, email_data: Dict) -> Dict:
+        """Parse email data without consulting the cache."""
         try:
-            # Extract text content
-            text = self._extract_text_content(email_data)
-            
-            # Initialize results
-            results = {}
-            confidence_scores = {}
-            
-            # Extract each field
-            for field, patterns in self.PATTERNS.items():
-                value, confidence = self.extract_field(text, patterns, field)
-                results[field] = value
-                confidence_scores[field] = confidence
-
-            # Calculate overall confidence score
-            overall_confidence = self._calculate_overall_confidence(confidence_scores)
+            context = self.pipeline().run(email_data)
+            results = context.values
+            confidence_scores = context.scores
+            overall_confidence = context.confidence
+            stripped_bytes = context.bytes_removed('strip_quotes')
+            if stripped_bytes:
+                logger.debug("Stripped %d bytes of quoted text", stripped_bytes)
             
             # Log extraction results
-            logger.info(f"Extracted fields: {results}")
-            logger.info(f"Confidence scores: {confidence_scores}")
-            logger.info(f"Overall confidence: {overall_confidence}")
+            logger.info("Extracted fields: %s", results)
+            logger.info("Confidence scores: %s", confidence_scores)
+            logger.info("Overall confidence: %s", overall_confidence)
 
             return {
                 'applicant_name': results.get('applicant_name'),
@@ -188,12 +440,80 @@ class EmailParser:
                 'job_id': results.get('job_id'),
                 'confidence_score': overall_confidence,
                 'field_scores': confidence_scores,
+                'stripped_bytes': stripped_bytes,
             }
 
         except Exception as e:
             logger.error(f"Error parsing email: {str(e)}")
             raise
 
+    @classmethod
+    def parse_batch(
+        cls,
+        emails: Iterable[Dict],
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        ordered: bool = True,
+    ) -> Iterator[parallel.ParseResult]:
+        """
+        Parse many emails on a process pool, streaming the results.
+
+        Args:
+            emails: Email data dictionaries, as taken by parse_email
+            workers: Worker processes; defaults to the number of CPUs
+            chunk_size: Emails sent to a worker at a time
+            ordered: Yield results in input order rather than as completed
+
+        Returns:
+            Iterator[ParseResult]: Index, parsed data or error message per email
+        """
+        return parallel.parse_batch(cls, emails, workers, chunk_size, ordered)
+
+    def _parse_item(self, email_data: Dict) -> Dict:
+        """Parse one email of a batch."""
+        return self.parse_email(email_data)
+
+    @classmethod
+    def pipeline(cls) -> ExtractionPipeline:
+        """Return the extraction pipeline of this parser class."""
+        return pipeline_for(cls)
+
+    @classmethod
+    def stage_options(cls) -> Dict[str, Dict]:
+        """
+        Return the options of each pipeline stage for this parser.
+
+        Returns:
+            Dict[str, Dict]: Keyword arguments per stage name
+        """
+        parser = cls()
+        return {
+            'decode': {'max_length': cls.MAX_BODY_LENGTH},
+            'compose': {'headers': (('subject', 'Subject: '), ('sender', 'From: '))},
+            'normalize': {'collapse_whitespace': False, 'max_length': cls.MAX_TEXT_LENGTH},
+            'extract': {'extract': lambda context: parser.extract_fields(context.text)},
+            'score': {'score': parser._calculate_overall_confidence},
+            'fallback': {'field_map': {'job_title': 'position'}},
+        }
+
+    @classmethod
+    def clean_body(cls, body: Optional[str]) -> StrippedText:
+        """
+        Reduce an email body to the text written in it.
+
+        Runs the text stages of the pipeline on the body alone: HTML is
+        converted to text, then quoted replies, signatures and disclaimers
+        are removed.
+
+        Args:
+            body: Plain text or HTML email body
+
+        Returns:
+            StrippedText: Remaining text and the bytes removed from it
+        """
+        context = cls.pipeline().prepare({'body': body})
+        return StrippedText(context.text, context.bytes_removed('strip_quotes'))
+
     def _extract_text_content(self, email_data: Dict) -> str:
         """
         Extract text content from email data, handling both HTML and plain text.
@@ -204,27 +524,7 @@ class EmailParser:
         Returns:
             str: Extracted text content
         """
-        text = ""
-        
-        # Add subject
-        if 'subject' in email_data:
-            text += f"Subject: {email_data['subject']}\n"
-
-        # Add sender
-        if 'sender' in email_data:
-            text += f"From: {email_data['sender']}\n"
-
-        # Process body
-        body = email_data.get('body', '')
-        if body:
-            # Check if body is HTML
-            if '<html' in body.lower() or '<body' in body.lower():
-                soup = BeautifulSoup(body, 'html.parser')
-                text += soup.get_text(separator='\n')
-            else:
-                text += body
-
-        return text
+        return self.pipeline().prepare(email_data).text
 
     def _calculate_overall_confidence(self, confidence_scores: Dict[str, float]) -> float:
         """
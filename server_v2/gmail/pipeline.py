@@ -0,0 +1,362 @@
+"""Asynchronous Gmail ingestion pipeline.
+
+This module overlaps the network-bound and CPU-bound parts of Gmail ingestion.
+Messages flow through four stages connected by bounded queues:
+
+    list -> fetch (N concurrent workers) -> decode -> parse (executor pool)
+
+googleapiclient is blocking and its HTTP transport is not thread-safe, so API
+calls run in a thread pool and every worker thread uses its own service
+object. The pool is shared by all runs and outlives them, so services cached
+per thread (see service_cache) are reused from one run to the next. Bounded
+queues give each stage backpressure, which keeps the number of
+messages held in memory independent of ``max_results``.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .email import BATCH_SIZE, GmailEmailService
+from .parser import EmailParser
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_PARSE_WORKERS = 2
+# Threads of the fetch pool shared by all runs; they are started on demand
+FETCH_POOL_SIZE = 32
+
+# Marks the end of a stage's input
+_DONE = object()
+
+_fetch_pool: Optional[ThreadPoolExecutor] = None
+_fetch_pool_lock = threading.Lock()
+
+
+def fetch_pool() -> ThreadPoolExecutor:
+    """Return the process-wide thread pool running Gmail API calls.
+
+    Its threads live across pipeline runs, so a service built for a thread by
+    the ``service_factory`` (e.g. through GmailServiceCache) keeps being used.
+    """
+    global _fetch_pool
+    if _fetch_pool is None:
+        with _fetch_pool_lock:
+            if _fetch_pool is None:
+                _fetch_pool = ThreadPoolExecutor(max_workers=FETCH_POOL_SIZE, thread_name_prefix='gmail-fetch')
+    return _fetch_pool
+
+
+def _reset_fetch_pool() -> None:
+    """Forget the fetch pool in a forked child, whose copy has no threads."""
+    global _fetch_pool, _fetch_pool_lock
+    _fetch_pool = None
+    _fetch_pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_fetch_pool)
+
+
+class _StageFailure:
+    """Wraps an exception raised by a stage so the consumer can re-raise it."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def parse_email_data(email_data: Dict) -> Dict:
+    """Parse a decoded email; module-level so process pools can pickle it."""
+    return EmailParser().parse_email(email_data)
+
+
+class GmailIngestionPipeline:
+    """Concurrent list/fetch/decode/parse pipeline for Gmail messages.
+
+    Args:
+        service_factory: Callable returning a Gmail API service; called once
+            per pipeline and fetch thread
+        concurrency: Number of concurrent fetch workers; the calls of all
+            runs share the FETCH_POOL_SIZE threads of the fetch pool
+        queue_size: Capacity of each inter-stage queue
+        parse_workers: Number of parser workers
+        parse_executor: 'thread' or 'process' pool for parsing
+        batch: Whether fetch workers use Gmail HTTP batch requests
+        format: Gmail message format to fetch; 'metadata' skips bodies
+        user_key: Identifier of the mailbox owner, for rate limiting
+    """
+
+    def __init__(
+        self,
+        service_factory: Callable,
+        concurrency: Optional[int] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        parse_workers: int = DEFAULT_PARSE_WORKERS,
+        parse_executor: str = 'thread',
+        batch: bool = False,
+        format: str = 'full',
+        user_key: str = 'me',
+    ):
+        if parse_executor not in ('thread', 'process'):
+            raise ValueError("parse_executor must be 'thread' or 'process'")
+        self.service_factory = service_factory
+        self.concurrency = concurrency or DEFAULT_CONCURRENCY
+        self.queue_size = queue_size
+        self.parse_workers = parse_workers
+        self.parse_executor = parse_executor
+        self.batch = batch
+        self.format = format
+        self.user_key = user_key
+        self._local = threading.local()
+
+    def run_sync(self, service, query: str, max_results: int, parse_content: bool = False) -> List[Dict]:
+        """Run the pipeline to completion from synchronous code.
+
+        Returns:
+            List of email dictionaries, in the order Gmail listed them
+        """
+        coro = self.run(service, query, max_results, parse_content)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+
+        # Called from inside an event loop: run on a private loop in a thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Carry the caller's context (e.g. its retry deadline) to that thread
+            return executor.submit(contextvars.copy_context().run, asyncio.run, coro).result()
+
+    def iter_sync(
+        self,
+        service,
+        query: str,
+        max_results: int,
+        parse_content: bool = False,
+    ) -> Iterator[Tuple[int, Dict]]:
+        """Yield ``(list_position, email_data)`` pairs from synchronous code.
+
+        The pipeline runs on a private event loop that only advances while the
+        caller asks for the next item, so a slow consumer holds back the
+        stages through their bounded queues instead of buffering results.
+        Closing the generator stops the pipeline.
+        """
+        loop = asyncio.new_event_loop()
+        stream = self.stream(service, query, max_results, parse_content)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(stream.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(stream.aclose())
+            loop.close()
+
+    async def run(self, service, query: str, max_results: int, parse_content: bool = False) -> List[Dict]:
+        """Run the pipeline and collect every email.
+
+        Returns:
+            List of email dictionaries, in the order Gmail listed them
+        """
+        results = [item async for item in self.stream(service, query, max_results, parse_content)]
+        results.sort(key=lambda item: item[0])
+        return [email_data for _, email_data in results]
+
+    async def stream(
+        self,
+        service,
+        query: str,
+        max_results: int,
+        parse_content: bool = False,
+    ) -> AsyncIterator[Tuple[int, Dict]]:
+        """Yield ``(list_position, email_data)`` pairs as messages complete.
+
+        Args:
+            service: Gmail API service used by the listing stage
+            query: Gmail search query
+            max_results: Maximum number of emails to fetch
+            parse_content: Whether to parse email content for job details
+
+        Raises:
+            GmailAPIError: If listing fails
+        """
+        io_pool = fetch_pool()
+        parse_pool: Optional[Executor] = None
+        if parse_content:
+            pool_class = ProcessPoolExecutor if self.parse_executor == 'process' else ThreadPoolExecutor
+            parse_pool = pool_class(max_workers=self.parse_workers)
+
+        listed = asyncio.Queue(self.queue_size)
+        fetched = asyncio.Queue(self.queue_size)
+        decoded = asyncio.Queue(self.queue_size)
+        output = asyncio.Queue(self.queue_size)
+
+        parse_count = self.parse_workers if parse_content else 1
+        tasks = (
+            self._start_group(1, lambda: self._list_stage(io_pool, service, query, max_results, listed),
+                              listed, self.concurrency, output)
+            + self._start_group(self.concurrency, lambda: self._fetch_stage(io_pool, listed, fetched),
+                                fetched, 1, output)
+            + self._start_group(1, lambda: self._decode_stage(fetched, decoded),
+                                decoded, parse_count, output)
+        )
+        if parse_content:
+            tasks += self._start_group(parse_count, lambda: self._parse_stage(parse_pool, decoded, output),
+                                       output, 1, output)
+        else:
+            tasks += self._start_group(1, lambda: self._forward_stage(decoded, output),
+                                       output, 1, output)
+
+        try:
+            while True:
+                item = await output.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _StageFailure):
+                    raise item.error
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Cancelling the tasks also cancels their calls still queued on the shared fetch pool
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if parse_pool:
+                parse_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _start_group(self, workers: int, make_worker, outbox: asyncio.Queue,
+                     downstream_workers: int, failures: asyncio.Queue) -> List[asyncio.Task]:
+        """Start ``workers`` copies of a stage.
+
+        When the last one finishes, one end marker is sent to each downstream
+        worker. An exception in any worker is forwarded to the consumer.
+        """
+        remaining = [workers]
+
+        async def run_worker():
+            try:
+                await make_worker()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await failures.put(_StageFailure(e))
+                return
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                for _ in range(downstream_workers):
+                    await outbox.put(_DONE)
+
+        return [asyncio.create_task(run_worker()) for _ in range(workers)]
+
+    def _thread_service(self):
+        """Return the Gmail service owned by the current worker thread."""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = self.service_factory()
+        return service
+
+    async def _list_stage(self, pool: Executor, service, query: str, max_results: int,
+                          outbox: asyncio.Queue) -> None:
+        """List message IDs page by page and queue them with their position."""
+        loop = asyncio.get_running_loop()
+        pages = GmailEmailService._iter_message_pages(service, query, max_results, self.user_key)
+        position = 0
+        while True:
+            page = await loop.run_in_executor(pool, contextvars.copy_context().run, next, pages, None)
+            if page is None:
+                return
+            for message in page:
+                await outbox.put((position, message['id']))
+                position += 1
+
+    async def _fetch_stage(self, pool: Executor, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        """Fetch queued messages, singly or in batches, until the end marker."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+
+            if not self.batch:
+                position, message_id = item
+                try:
+                    msg = await loop.run_in_executor(
+                        pool, contextvars.copy_context().run, self._fetch_one, message_id)
+                except Exception as e:
+                    logger.error("Error processing message %s: %s", message_id, e)
+                    continue
+                await outbox.put((position, msg))
+                continue
+
+            # Batch mode: take whatever is already queued, up to BATCH_SIZE
+            group = [item]
+            finished = False
+            while len(group) < BATCH_SIZE and not inbox.empty():
+                queued = inbox.get_nowait()
+                if queued is _DONE:
+                    finished = True
+                    break
+                group.append(queued)
+
+            message_ids = [message_id for _, message_id in group]
+            messages, errors = await loop.run_in_executor(
+                pool, contextvars.copy_context().run, self._fetch_batch, message_ids)
+            for message_id, error in errors.items():
+                logger.error("Error processing message %s: %s", message_id, error)
+            for position, message_id in group:
+                if message_id in messages:
+                    await outbox.put((position, messages[message_id]))
+            if finished:
+                return
+
+    def _fetch_one(self, message_id: str) -> Dict:
+        return GmailEmailService._fetch_message(
+            self._thread_service(), message_id, self.format, self.user_key)
+
+    def _fetch_batch(self, message_ids: List[str]):
+        return GmailEmailService._fetch_messages_batch(
+            self._thread_service(), message_ids, self.format, self.user_key)
+
+    async def _decode_stage(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        """Turn message resources into email dictionaries (headers and body)."""
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            position, msg = item
+            try:
+                email_data = GmailEmailService._build_email_data(
+                    msg, include_body=self.format != 'metadata')
+            except Exception as e:
+                logger.error("Error processing message %s: %s", msg.get('id'), e)
+                continue
+            logger.debug("Successfully processed email %s", email_data['id'])
+            await outbox.put((position, email_data))
+
+    async def _parse_stage(self, pool: Executor, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        """Parse decoded emails for job details in the parse pool."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            position, email_data = item
+            try:
+                email_data.update(await loop.run_in_executor(pool, parse_email_data, email_data))
+            except Exception as e:
+                logger.error("Error parsing message %s: %s", email_data['id'], e)
+            await outbox.put((position, email_data))
+
+    async def _forward_stage(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        """Pass decoded emails straight through when no parsing is requested."""
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            await outbox.put(item)
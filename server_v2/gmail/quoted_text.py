@@ -0,0 +1,108 @@
+"""Removal of quoted replies, signatures and disclaimers from email text.
+
+Replies carry the conversation they answer, and most business email ends in
+a signature and a legal footer. None of that describes the email itself:
+scanning it costs parse time, and stale details in a quoted message can be
+extracted in place of the current ones. ``strip_quoted_text`` cuts it from
+the plain text of a body (HTML must be converted first):
+
+- lines quoted with ``>``, and the "On ... wrote:" line introducing them;
+- the quoted history below an "On ... wrote:" line, an Outlook
+  ``-----Original Message-----`` separator or a From:/Sent: header block;
+- a signature below a ``--`` delimiter or a "Sent from my ..." line;
+- a disclaimer or confidentiality notice and everything below it.
+
+A history, signature or footer is only cut when the author wrote something
+above it, so a forwarded or fully quoted email is left as it is.
+"""
+
+import re
+from typing import NamedTuple, Optional, Pattern
+
+# Lines after a signature delimiter that can still be a signature
+SIGNATURE_MAX_LINES = 15
+
+_QUOTED_LINE = re.compile(r'^[ \t]*>[^\n]*(?:\n|$)', re.M)
+
+_ATTRIBUTION = (
+    r'^[ \t]*(?:On\b[^\n]{0,300}?(?:\n[^\n]{0,300}?)?\bwrote'
+    r'|Le\b[^\n]{0,300}?(?:\n[^\n]{0,300}?)?\ba écrit'
+    r'|Am\b[^\n]{0,300}?(?:\n[^\n]{0,300}?)?\bschrieb)[ \t]*:[ \t]*$'
+)
+# An attribution whose quote is marked with '>' lines, removed on its own so
+# a reply written below the quote survives
+_QUOTE_ATTRIBUTION = re.compile(_ATTRIBUTION + r'\n?(?=(?:[ \t]*\n)*[ \t]*>)', re.M)
+
+_HISTORY = re.compile(
+    _ATTRIBUTION
+    + r'|^[ \t]*-{3,}[ \t]*(?i:original message)[ \t]*-{3,}[ \t]*$'
+    r'|^[ \t]*_{20,}[ \t]*\n(?=[ \t]*From:)'
+    r'|^[ \t]*From:[^\n]*\n[ \t]*(?:Sent|Date):[^\n]*\n(?:[^\n]*\n){0,2}?[ \t]*(?:To|Subject):',
+    re.M,
+)
+
+_SIGNATURE = re.compile(
+    r'^[ \t]*--[ \t]*$|^[ \t]*(?:Sent from my|Get Outlook for)\b[^\n]*$',
+    re.M,
+)
+
+_DISCLAIMER = re.compile(
+    r'^[ \t]*(?:confidentiality notice|disclaimer|legal notice'
+    r'|this (?:e-?mail|message|communication)\b[^\n]{0,200}?'
+    r'\b(?:confidential|privileged|intended (?:solely |only )?for))',
+    re.M | re.I,
+)
+
+
+class StrippedText(NamedTuple):
+    """Email text with quoted content removed, and how much was removed."""
+
+    text: str
+    removed: int  # bytes of UTF-8
+
+
+def _has_content(text: str, end: int) -> bool:
+    """Whether anything but whitespace precedes ``end``."""
+    return bool(text[:end].strip())
+
+
+def _cut_at_first(text: str, pattern: Pattern, max_lines: Optional[int] = None) -> str:
+    """Cut ``text`` at the first match of ``pattern`` with content above it.
+
+    With ``max_lines``, only a match followed by at most that many lines cuts.
+    """
+    for match in pattern.finditer(text):
+        if not _has_content(text, match.start()):
+            continue
+        if max_lines is not None and text.count('\n', match.end()) > max_lines:
+            continue
+        return text[:match.start()].rstrip()
+    return text
+
+
+def strip_quoted_text(text: str) -> StrippedText:
+    """Remove quoted replies, signatures and disclaimers from email text.
+
+    Line endings are normalised to ``\\n`` first; that does not count as
+    removed.
+
+    Args:
+        text: Plain text of an email body
+
+    Returns:
+        StrippedText with the remaining text and the number of bytes removed
+    """
+    if not text:
+        return StrippedText(text or '', 0)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    kept = _QUOTE_ATTRIBUTION.sub('', text)
+    kept = _QUOTED_LINE.sub('', kept)
+    kept = _cut_at_first(kept, _HISTORY)
+    kept = _cut_at_first(kept, _SIGNATURE, SIGNATURE_MAX_LINES)
+    kept = _cut_at_first(kept, _DISCLAIMER)
+
+    if len(kept) == len(text):
+        return StrippedText(text, 0)
+    removed = len(text.encode('utf-8', 'surrogatepass')) - len(kept.encode('utf-8', 'surrogatepass'))
+    return StrippedText(kept, removed)
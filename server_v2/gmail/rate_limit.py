@@ -0,0 +1,385 @@
+"""Quota-aware rate limiting for Gmail API calls.
+
+This module provides a token-bucket rate limiter that counts Gmail quota units
+per API method. It keeps one bucket per user and one per Google Cloud project.
+Bucket state lives in the configured Django cache, so every worker process
+shares it; on Redis each update is one atomic Lua script. When the cache is
+unavailable the limiter falls back to in-process buckets, logging an error
+and counting the fallback. The per-user rate adapts: it is cut on 429
+responses and grows back on successful calls.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Gmail API quota units charged per method
+# https://developers.google.com/gmail/api/reference/quota
+QUOTA_UNITS = {
+    'getProfile': 1,
+    'history.list': 2,
+    'labels.list': 1,
+    'messages.get': 5,
+    'messages.list': 5,
+    'messages.send': 100,
+    'threads.get': 10,
+    'threads.list': 10,
+}
+DEFAULT_QUOTA_UNITS = 5
+
+# Gmail limits: 250 units per user per second, 1,200,000 units per project per minute
+USER_UNITS_PER_SECOND = 250
+PROJECT_UNITS_PER_SECOND = 20000
+
+# Adaptive rate bounds, as a fraction of the configured per-user rate
+MIN_RATE_FACTOR = 0.05
+THROTTLE_DECREASE = 0.5
+SUCCESS_INCREASE = 0.05
+
+# How long to stay on in-process buckets after a cache error (seconds)
+CACHE_RETRY_INTERVAL = 30
+CACHE_KEY_PREFIX = 'gmail:ratelimit:'
+CACHE_LOCK_TIMEOUT = 1
+# Longest pause between attempts to take a contended cache lock (seconds)
+CACHE_LOCK_MAX_POLL = 0.05
+
+# Redis scripts doing the bucket updates of BucketStore.take and
+# BucketStore.adjust server-side. Numbers are returned as strings, as Redis
+# truncates Lua numbers to integers.
+TAKE_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'factor')
+local units, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[4])
+local factor = tonumber(state[3]) or 1.0
+local effective = rate
+if ARGV[3] == '1' then effective = rate * factor end
+local capacity = math.max(effective, units)
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * effective)
+local wait = 0
+if tokens >= units then
+    tokens = tokens - units
+else
+    wait = (units - tokens) / effective
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now), 'factor', tostring(factor))
+return {tostring(wait), tostring(factor)}
+"""
+ADJUST_SCRIPT = """
+local factor = tonumber(redis.call('HGET', KEYS[1], 'factor')) or 1.0
+factor = math.min(1.0, math.max(tonumber(ARGV[3]), factor * tonumber(ARGV[1]) + tonumber(ARGV[2])))
+redis.call('HSET', KEYS[1], 'factor', tostring(factor))
+return tostring(factor)
+"""
+
+
+def _get_setting(name: str, default):
+    """Read a Django setting, tolerating unconfigured settings."""
+    try:
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
+
+
+def _take(state: Optional[Dict], units: int, rate: float, adaptive: bool, now: float) -> Tuple[Dict, Tuple[float, float]]:
+    """Refill a bucket and take ``units`` tokens from it if they are there.
+
+    Returns:
+        The new state, and the seconds to wait before retrying (0 if the
+        tokens were taken) with the bucket's adaptive rate factor
+    """
+    state = dict(state or {'tokens': None, 'updated': now, 'factor': 1.0})
+    effective_rate = rate * (state['factor'] if adaptive else 1.0)
+    capacity = max(effective_rate, units)
+    tokens = capacity if state['tokens'] is None else state['tokens']
+    tokens = min(capacity, tokens + (now - state['updated']) * effective_rate)
+    state['updated'] = now
+    if tokens >= units:
+        state['tokens'] = tokens - units
+        return state, (0.0, state['factor'])
+    state['tokens'] = tokens
+    return state, ((units - tokens) / effective_rate, state['factor'])
+
+
+def _adjust(state: Optional[Dict], scale: float, step: float) -> Tuple[Dict, float]:
+    """Set the adaptive rate factor to ``factor * scale + step``, within bounds."""
+    state = dict(state or {'tokens': None, 'updated': time.time(), 'factor': 1.0})
+    state['factor'] = min(1.0, max(MIN_RATE_FACTOR, state['factor'] * scale + step))
+    return state, state['factor']
+
+
+class BucketStore:
+    """Storage for bucket state, updated atomically through ``update``."""
+
+    def update(self, key: str, func):
+        """Atomically replace the state under ``key`` with ``func(state)``.
+
+        Returns:
+            The result part of ``func``'s ``(new_state, result)`` return value
+        """
+        raise NotImplementedError
+
+    def take(self, key: str, units: int, rate: float, adaptive: bool) -> Tuple[float, float]:
+        """Take ``units`` tokens from the bucket under ``key``, refilled at ``rate``.
+
+        Args:
+            key: Bucket key
+            units: Tokens to take
+            rate: Refill rate in tokens per second
+            adaptive: Whether the rate is scaled by the bucket's adaptive factor
+
+        Returns:
+            Seconds to wait before retrying (0 if the tokens were taken), and
+            the bucket's adaptive rate factor
+        """
+        return self.update(key, lambda state: _take(state, units, rate, adaptive, time.time()))
+
+    def adjust(self, key: str, scale: float, step: float) -> float:
+        """Set the bucket's adaptive rate factor to ``factor * scale + step``.
+
+        The factor stays between MIN_RATE_FACTOR and 1.
+
+        Returns:
+            The new factor
+        """
+        return self.update(key, lambda state: _adjust(state, scale, step))
+
+
+class LocalBucketStore(BucketStore):
+    """In-process, thread-safe storage for bucket state."""
+
+    def __init__(self):
+        self._states: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def update(self, key: str, func):
+        """Atomically replace the state under ``key`` with ``func(state)``.
+
+        Returns:
+            The result part of ``func``'s ``(new_state, result)`` return value
+        """
+        with self._lock:
+            state, result = func(self._states.get(key))
+            self._states[key] = state
+            return result
+
+
+class CacheBucketStore(BucketStore):
+    """Bucket state stored in the Django cache, shared by all processes.
+
+    On django-redis caches, ``take`` and ``adjust`` run as Lua scripts on the
+    Redis server: one atomic round trip, with no lock. Other backends
+    serialise updates with a short-lived lock key taken with ``cache.add``,
+    which is atomic on memcached. An update that cannot take the lock within
+    CACHE_LOCK_TIMEOUT fails rather than risk overwriting a concurrent one.
+    Cache backend errors propagate, so the caller can fall back.
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+        # Registered Lua scripts, by source
+        self._scripts: Dict[str, object] = {}
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def take(self, key: str, units: int, rate: float, adaptive: bool) -> Tuple[float, float]:
+        """Take tokens from the shared bucket; see ``BucketStore.take``."""
+        cache = self.cache
+        client = self._redis_client(cache)
+        if client is None:
+            return super().take(key, units, rate, adaptive)
+        wait, factor = self._script(TAKE_SCRIPT, client)(
+            keys=[cache.make_key(CACHE_KEY_PREFIX + key)],
+            args=[units, repr(float(rate)), int(adaptive), repr(time.time())],
+            client=client,
+        )
+        return float(wait), float(factor)
+
+    def adjust(self, key: str, scale: float, step: float) -> float:
+        """Change the shared bucket's adaptive rate factor; see ``BucketStore.adjust``."""
+        cache = self.cache
+        client = self._redis_client(cache)
+        if client is None:
+            return super().adjust(key, scale, step)
+        factor = self._script(ADJUST_SCRIPT, client)(
+            keys=[cache.make_key(CACHE_KEY_PREFIX + key)],
+            args=[repr(float(scale)), repr(float(step)), repr(MIN_RATE_FACTOR)],
+            client=client,
+        )
+        return float(factor)
+
+    def update(self, key: str, func):
+        """Atomically replace the state under ``key`` with ``func(state)``, under the lock key.
+
+        Raises:
+            TimeoutError: If the lock could not be taken in CACHE_LOCK_TIMEOUT
+            Exception: Any cache backend error, so the caller can fall back
+        """
+        cache = self.cache
+        cache_key = CACHE_KEY_PREFIX + key
+        lock_key = cache_key + ':lock'
+        token = uuid.uuid4().hex
+
+        deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+        poll = 0.001
+        locked = cache.add(lock_key, token, CACHE_LOCK_TIMEOUT)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(poll)
+            poll = min(poll * 2, CACHE_LOCK_MAX_POLL)
+            locked = cache.add(lock_key, token, CACHE_LOCK_TIMEOUT)
+        if not locked:
+            raise TimeoutError(f"Timed out waiting for rate limit lock {lock_key}")
+        try:
+            state, result = func(cache.get(cache_key))
+            cache.set(cache_key, state, None)
+            return result
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    @staticmethod
+    def _redis_client(cache):
+        """Return the Redis client behind a django-redis ``cache``, or None for other backends."""
+        try:
+            from django_redis.cache import RedisCache
+        except ImportError:
+            return None
+        if not isinstance(cache, RedisCache):
+            return None
+        return cache.client.get_client(write=True)
+
+    def _script(self, source: str, client):
+        """Return the registered Lua script ``source``, registering it with ``client`` on first use."""
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = client.register_script(source)
+        return script
+
+
+class TokenBucketRateLimiter:
+    """Token-bucket limiter for Gmail quota units, per user and per project.
+
+    Args:
+        user_rate: Quota units per second allowed for each user
+        project_rate: Quota units per second allowed for the whole project
+        project: Identifier of the Google Cloud project sharing the quota
+        cache_alias: Django cache used to share buckets between processes,
+            or None to keep buckets in-process only
+    """
+
+    def __init__(
+        self,
+        user_rate: Optional[float] = None,
+        project_rate: Optional[float] = None,
+        project: Optional[str] = None,
+        cache_alias: Optional[str] = 'default',
+    ):
+        self.user_rate = user_rate or _get_setting(
+            'GMAIL_USER_QUOTA_UNITS_PER_SECOND', USER_UNITS_PER_SECOND)
+        self.project_rate = project_rate or _get_setting(
+            'GMAIL_PROJECT_QUOTA_UNITS_PER_SECOND', PROJECT_UNITS_PER_SECOND)
+        self.project = project or _get_setting('GOOGLE_CLIENT_ID', None) or 'default'
+        self.local_store = LocalBucketStore()
+        self.cache_store = CacheBucketStore(cache_alias) if cache_alias else None
+        self._cache_disabled_until = 0.0
+        # Times the shared buckets were given up for in-process ones
+        self.cache_fallbacks = 0
+        # Calls that failed other than by a 429, per user
+        self.failures: Dict[str, int] = {}
+        self._failures_lock = threading.Lock()
+        # Last adaptive rate factor seen per user, to skip no-op recoveries
+        self._factors: Dict[str, float] = {}
+
+    @staticmethod
+    def units_for(method: str, count: int = 1) -> int:
+        """Return the quota units charged for ``count`` calls of ``method``."""
+        return QUOTA_UNITS.get(method, DEFAULT_QUOTA_UNITS) * count
+
+    def acquire(self, method: str, user_key: str = 'me', count: int = 1) -> float:
+        """Block until ``count`` calls of ``method`` fit in the user and project budgets.
+
+        Args:
+            method: Gmail API method name, e.g. 'messages.get'
+            user_key: Identifier of the mailbox owner
+            count: Number of calls being made, e.g. the size of a batch
+
+        Returns:
+            Total seconds spent waiting
+        """
+        units = self.units_for(method, count)
+        waited = self._consume(f'user:{user_key}', units, self.user_rate, user_key=user_key)
+        waited += self._consume(f'project:{self.project}', units, self.project_rate)
+        return waited
+
+    def throttled(self, user_key: str = 'me') -> None:
+        """Record a 429 response and cut the user's rate."""
+        factor = self._adjust_factor(user_key, THROTTLE_DECREASE, 0.0)
+        logger.warning("Gmail rate limit hit for %s, rate factor now %.2f", user_key, factor)
+
+    def succeeded(self, user_key: str = 'me') -> None:
+        """Record a successful call and let the user's rate recover."""
+        if self._factors.get(user_key, 0.0) >= 1.0:
+            # Already at the full rate; save the shared store a write
+            return
+        self._adjust_factor(user_key, 1.0, SUCCESS_INCREASE)
+
+    def failed(self, user_key: str = 'me', count: int = 1) -> None:
+        """Record calls that failed other than by a 429, e.g. 5xx or network errors.
+
+        They are counted in ``failures`` and leave the rate as it is.
+        """
+        with self._failures_lock:
+            self.failures[user_key] = self.failures.get(user_key, 0) + count
+
+    def _store_call(self, operation: str, *args):
+        """Call ``operation`` on the shared bucket store, or in-process on failure.
+
+        A contended cache lock is retried; any other cache error switches to
+        in-process buckets for CACHE_RETRY_INTERVAL, during which the project
+        quota is only enforced per process.
+        """
+        while self.cache_store and time.monotonic() >= self._cache_disabled_until:
+            try:
+                return getattr(self.cache_store, operation)(*args)
+            except TimeoutError as e:
+                logger.warning("Rate limit cache lock contended, retrying: %s", e)
+            except Exception as e:
+                self.cache_fallbacks += 1
+                self._cache_disabled_until = time.monotonic() + CACHE_RETRY_INTERVAL
+                logger.error(
+                    "Rate limit cache unavailable, enforcing Gmail quotas per process for %ds "
+                    "(fallback #%d): %s", CACHE_RETRY_INTERVAL, self.cache_fallbacks, e)
+        return getattr(self.local_store, operation)(*args)
+
+    def _consume(self, key: str, units: int, rate: float, user_key: Optional[str] = None) -> float:
+        """Take ``units`` tokens from the bucket under ``key``, sleeping as needed.
+
+        The rate is scaled by the adaptive factor of ``user_key``, if given.
+        """
+        adaptive = user_key is not None
+        waited = 0.0
+        while True:
+            wait, factor = self._store_call('take', key, units, rate, adaptive)
+            if adaptive:
+                self._factors[user_key] = factor
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def _adjust_factor(self, user_key: str, scale: float, step: float) -> float:
+        """Set the adaptive rate factor of ``user_key`` to ``factor * scale + step``."""
+        factor = self._store_call('adjust', f'user:{user_key}', scale, step)
+        self._factors[user_key] = factor
+        return factor
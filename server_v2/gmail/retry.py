@@ -0,0 +1,254 @@
+"""Retry policy for Gmail API calls.
+
+Transient Gmail failures (429, 5xx, rate-limit 403s and dropped connections)
+are retried with decorrelated-jitter exponential backoff, honouring any
+``Retry-After`` the server sends. Every call has a deadline covering all of
+its attempts, and a whole operation can be given a shared budget with
+``deadline()``, so the worst-case latency of a call is bounded. Attempt
+counts and time spent backing off are collected in ``RetryStats``.
+"""
+
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1.0  # seconds
+DEFAULT_MAX_DELAY = 32.0  # seconds
+DEFAULT_CALL_DEADLINE = 60.0  # seconds, across all attempts of one call
+
+# Responses that mean the request was not (fully) processed and may be resent
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Gmail reports per-user and per-project rate limits as 403 with these reasons
+RETRYABLE_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError'}
+# Statuses that show the request was rejected before it had any effect, so
+# even non-idempotent calls (e.g. messages.send) can be resent
+REJECTED_STATUSES = {429}
+
+# Monotonic time by which the current operation must finish, if any
+_operation_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    'gmail_operation_deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Give every Gmail call made inside the block a shared time budget.
+
+    Nested budgets can only shorten the enclosing one. The budget is held in
+    a context variable, so code running calls on other threads must carry
+    the context over (see ``contextvars.copy_context``).
+    """
+    at = time.monotonic() + seconds
+    current = _operation_deadline.get()
+    if current is not None:
+        at = min(at, current)
+    token = _operation_deadline.set(at)
+    try:
+        yield
+    finally:
+        _operation_deadline.reset(token)
+
+
+def _error_reason(error: HttpError) -> str:
+    """Return the first error reason of a Gmail error response, or ''."""
+    try:
+        content = json.loads(error.content.decode('utf-8'))
+        return content['error']['errors'][0].get('reason', '')
+    except Exception:
+        return ''
+
+
+class RetryStats:
+    """Thread-safe counters describing retry behaviour."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all counters."""
+        with self._lock:
+            self.calls = 0
+            self.attempts = 0
+            self.retried_calls = 0
+            self.gave_up = 0
+            self.backoff_seconds = 0.0
+            self.max_attempts = 0
+
+    def record(self, attempts: int, backoff: float, gave_up: bool = False) -> None:
+        """Record the outcome of one call."""
+        with self._lock:
+            self.calls += 1
+            self.attempts += attempts
+            self.retried_calls += attempts > 1
+            self.gave_up += gave_up
+            self.backoff_seconds += backoff
+            self.max_attempts = max(self.max_attempts, attempts)
+
+    def snapshot(self) -> Dict:
+        """Return the counters as a dictionary."""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'retried_calls': self.retried_calls,
+                'gave_up': self.gave_up,
+                'backoff_seconds': self.backoff_seconds,
+                'max_attempts': self.max_attempts,
+            }
+
+
+class RetryState:
+    """Backoff state of a single logical call (or batch of calls)."""
+
+    def __init__(self, policy: 'RetryPolicy', idempotent: bool = True):
+        self.policy = policy
+        self.idempotent = idempotent
+        self.attempts = 0
+        self.backoff = 0.0
+        self.deadline = time.monotonic() + policy.call_deadline
+        operation_deadline = _operation_deadline.get()
+        if operation_deadline is not None:
+            self.deadline = min(self.deadline, operation_deadline)
+        self._delay = policy.base_delay
+
+    def remaining(self) -> float:
+        """Seconds left before this call's deadline."""
+        return self.deadline - time.monotonic()
+
+    def next_delay(self, error: Exception) -> Optional[float]:
+        """Return how long to wait before retrying after ``error``, or None to give up."""
+        policy = self.policy
+        if not policy.is_retryable(error, self.idempotent) or self.attempts >= policy.max_attempts:
+            return None
+
+        # Decorrelated jitter: sleep = min(cap, random(base, previous * 3))
+        self._delay = min(policy.max_delay, random.uniform(policy.base_delay, self._delay * 3))
+        delay = self._delay
+        retry_after = policy.retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        if delay > self.remaining():
+            return None
+        return delay
+
+    def sleep(self, delay: float) -> None:
+        """Wait ``delay`` seconds and account for it."""
+        time.sleep(delay)
+        self.backoff += delay
+
+    def finish(self, gave_up: bool = False) -> None:
+        """Record this call in the policy's stats."""
+        self.policy.stats.record(self.attempts, self.backoff, gave_up)
+        if self.attempts > 1:
+            logger.info("Gmail call %s after %d attempts (%.2fs backing off)",
+                        'gave up' if gave_up else 'succeeded', self.attempts, self.backoff)
+
+
+class RetryPolicy:
+    """Retry policy for Gmail API calls.
+
+    Args:
+        max_attempts: Maximum attempts per call, including the first
+        base_delay: Minimum backoff between attempts, in seconds
+        max_delay: Maximum backoff between attempts, in seconds
+        call_deadline: Time budget for all attempts of one call, in seconds
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        call_deadline: float = DEFAULT_CALL_DEADLINE,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.call_deadline = call_deadline
+        self.stats = RetryStats()
+
+    def call(self, func: Callable, idempotent: bool = True):
+        """Call ``func`` until it succeeds or retrying is no longer allowed.
+
+        Args:
+            func: Zero-argument callable making one attempt, e.g. ``request.execute``
+            idempotent: Whether the call may be repeated after an ambiguous
+                failure; non-idempotent calls only retry rejected requests
+
+        Returns:
+            The result of ``func``
+
+        Raises:
+            Exception: The last error, once attempts or time run out or the
+                error is not retryable
+        """
+        state = self.start(idempotent)
+        while True:
+            state.attempts += 1
+            try:
+                result = func()
+            except Exception as error:
+                delay = state.next_delay(error)
+                if delay is None:
+                    state.finish(gave_up=self.is_retryable(error, idempotent))
+                    raise
+                logger.warning("Gmail call failed (attempt %d): %s; retrying in %.2fs",
+                               state.attempts, error, delay)
+                state.sleep(delay)
+                continue
+            state.finish()
+            return result
+
+    def start(self, idempotent: bool = True) -> RetryState:
+        """Begin tracking a call whose attempts the caller makes itself."""
+        return RetryState(self, idempotent)
+
+    @staticmethod
+    def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+        """Whether ``error`` is transient and the request safe to resend."""
+        if isinstance(error, HttpError):
+            status = error.resp.status
+            if status in REJECTED_STATUSES:
+                return True
+            if status == 403:
+                return _error_reason(error) in RETRYABLE_REASONS
+            return idempotent and status in RETRYABLE_STATUSES
+        # The connection failed; only safe if resending cannot duplicate an effect
+        return idempotent and isinstance(error, (ConnectionError, TimeoutError))
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """Return the Retry-After delay of an error response, in seconds."""
+        if not isinstance(error, HttpError):
+            return None
+        try:
+            value = error.resp.get('retry-after')
+        except Exception:
+            return None
+        if not isinstance(value, (str, bytes, int, float)):
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP-date form
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+
+# Policy shared by every Gmail caller
+default_policy = RetryPolicy()
@@ -0,0 +1,157 @@
+"""Reusable Gmail API service objects.
+
+``googleapiclient.discovery.build`` reads and parses the ~190 KB Gmail
+discovery document and sets up a new HTTP transport on every call. This
+module parses the discovery document bundled with googleapiclient once per
+process, and keeps an LRU of built services per credential, each on its own
+keep-alive httplib2 transport. Entries expire after a TTL.
+
+httplib2 transports are not thread-safe, so an entry holds its services in a
+``threading.local``: a service is only ever handed back to the thread that
+built it, and is released when that thread exits. Ingestion pipelines fetch
+on a long-lived thread pool, so their threads keep reusing their services.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import google_auth_httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import build_http
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 256
+DEFAULT_TTL = 30 * 60  # seconds
+
+
+@functools.lru_cache(maxsize=None)
+def get_discovery_document(api: str = 'gmail', version: str = 'v1') -> Dict:
+    """Return the parsed discovery document bundled with googleapiclient.
+
+    The document is parsed once per process. build_from_document normalises
+    method descriptions in place on first use, so the same dict can be reused
+    for every build.
+    """
+    document = get_static_doc(api, version)
+    if document is None:
+        raise ValueError(f"No bundled discovery document for {api} {version}")
+    return json.loads(document)
+
+
+def credentials_key(credentials) -> str:
+    """Return a stable key identifying the account and client of ``credentials``.
+
+    Credentials with a refresh token are keyed by it, so a refreshed access
+    token keeps hitting the same entry; bare access tokens are keyed by the
+    token itself.
+    """
+    secret = getattr(credentials, 'refresh_token', None) or credentials.token or ''
+    client_id = getattr(credentials, 'client_id', None) or ''
+    return hashlib.sha256(f'{client_id}\0{secret}'.encode()).hexdigest()
+
+
+class GmailServiceCache:
+    """LRU cache of Gmail API services with TTL eviction.
+
+    Args:
+        max_size: Maximum number of cached services
+        ttl: Seconds a service is reused before it is rebuilt
+        document: Discovery document to build from; defaults to the bundled
+            Gmail v1 document
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: float = DEFAULT_TTL,
+        document: Optional[Dict] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.document = document
+        self.hits = 0
+        self.misses = 0
+        # Per credential key: (per-thread service and transport, expiry)
+        self._entries: 'OrderedDict[str, Tuple[threading.local, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, credentials):
+        """Return a Gmail service for ``credentials`` owned by the calling thread.
+
+        Args:
+            credentials: google.auth credentials for the mailbox
+
+        Returns:
+            Gmail API service instance
+        """
+        key = credentials_key(credentials)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                entry = (threading.local(), now + self.ttl)
+                self._entries[key] = entry
+                self._evict(now)
+            self._entries.move_to_end(key)
+            owned = entry[0]
+            built = getattr(owned, 'service', None) is not None
+            if built:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if built:
+            # Callers may hold a newer token for the same account
+            owned.http.credentials = credentials
+            return owned.service
+
+        owned.service, owned.http = self._build(credentials)
+        logger.debug("Built Gmail API service (%d accounts cached)", len(self._entries))
+        return owned.service
+
+    def clear(self) -> None:
+        """Drop every cached service."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _build(self, credentials):
+        """Build a service on a new keep-alive transport."""
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=build_http())
+        document = self.document or get_discovery_document()
+        return build_from_document(document, http=http), http
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then the least recently used beyond max_size."""
+        for key in [key for key, entry in self._entries.items() if entry[1] <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+# Process-wide cache shared by every Gmail caller
+service_cache = GmailServiceCache()
+
+
+def get_gmail_service(credentials):
+    """Return a cached Gmail API service for ``credentials``.
+
+    Args:
+        credentials: google.auth credentials for the mailbox
+
+    Returns:
+        Gmail API service instance, reused across calls from the same thread
+    """
+    return service_cache.get(credentials)
@@ -0,0 +1,215 @@
+"""Incremental Gmail synchronisation.
+
+This module keeps a per-user Gmail history checkpoint and uses the Gmail
+history API to fetch only messages added since the previous sync. When there
+is no checkpoint yet, or Gmail no longer holds history that far back, it
+falls back to a bounded full resync.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+
+from . import retry
+from .auth import GmailAuthService
+from .email import GmailEmailService
+from .exceptions import GmailAPIError
+from .models import GmailSyncState
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class GmailSyncService:
+    """Service for incremental, checkpointed Gmail synchronisation."""
+
+    # Upper bound on messages fetched when a full resync is needed
+    FULL_RESYNC_MAX_RESULTS = 500
+
+    @classmethod
+    def sync_emails(
+        cls,
+        user,
+        query: str = '',
+        parse_content: bool = False,
+        label_id: Optional[str] = None,
+        full_resync_max_results: Optional[int] = None,
+    ) -> List[Dict]:
+        """Fetch the emails added to the mailbox since the last sync of ``user``.
+
+        The first sync, and any sync whose checkpoint has expired on the
+        Gmail side, lists at most ``full_resync_max_results`` messages
+        matching ``query``. Later syncs read the history API from the stored
+        checkpoint; the history API has no search support, so ``query`` does
+        not apply to them and ``label_id`` can be used to narrow them instead.
+        Messages whose fetch fails transiently are kept on the sync state and
+        fetched again, first, by the next sync.
+
+        Args:
+            user: User whose sync state is read and advanced
+            query: Gmail search query used for full resyncs
+            parse_content: Whether to parse email content for job details
+            label_id: Only return added messages carrying this label
+            full_resync_max_results: Override for FULL_RESYNC_MAX_RESULTS
+
+        Returns:
+            List of email dictionaries for the newly seen messages
+        """
+        service = GmailAuthService.get_service()
+        if not service:
+            logger.error("Failed to get Gmail service")
+            return []
+
+        state, _ = GmailSyncState.objects.get_or_create(user=user)
+        user_key = str(user.pk)
+        message_ids = None
+
+        with retry.deadline(GmailEmailService.OPERATION_DEADLINE):
+            if state.history_id:
+                try:
+                    message_ids, history_id = cls._list_history(
+                        service, state.history_id, label_id, user_key)
+                    logger.debug("Found %d new messages since history %s",
+                                 len(message_ids), state.history_id)
+                except HttpError as e:
+                    if e.resp.status != 404:
+                        raise GmailAPIError(f"Gmail API error: {str(e)}", e.resp.status)
+                    logger.info("History %s expired for %s, running full resync",
+                                state.history_id, user)
+
+            if message_ids is None:
+                message_ids, history_id = cls._list_full_resync(
+                    service,
+                    query,
+                    full_resync_max_results or cls.FULL_RESYNC_MAX_RESULTS,
+                    user_key,
+                )
+                state.last_full_sync = timezone.now()
+
+            # Messages whose fetch failed last time lie behind the checkpoint; retry them first
+            message_ids = list(dict.fromkeys(state.pending_message_ids + message_ids))
+            emails = []
+            pending = []
+            if message_ids:
+                fetched, errors = GmailEmailService._fetch_messages_batch(
+                    service, message_ids, user_key=user_key)
+                for message_id, error in errors.items():
+                    logger.error("Error processing message %s: %s", message_id, error)
+                    if not cls._is_permanent_error(error):
+                        pending.append(message_id)
+                for message_id in message_ids:
+                    if message_id in fetched:
+                        emails.append(GmailEmailService._build_email_data(fetched[message_id], parse_content))
+
+        state.pending_message_ids = pending
+        state.history_id = history_id
+        state.last_synced = timezone.now()
+        state.save()
+        return emails
+
+    @staticmethod
+    def _is_permanent_error(error: Exception) -> bool:
+        """Whether a message fetch failed for good, e.g. because it was deleted."""
+        return isinstance(error, HttpError) and not GmailEmailService.retry_policy.is_retryable(error)
+
+    @classmethod
+    def _list_history(
+        cls,
+        service,
+        start_history_id: str,
+        label_id: Optional[str] = None,
+        user_key: str = 'me',
+    ) -> Tuple[List[str], str]:
+        """List IDs of messages added since ``start_history_id``.
+
+        Args:
+            service: Gmail API service instance
+            start_history_id: Checkpoint to read history from
+            label_id: Only return messages carrying this label
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            Tuple of (added message IDs in history order, new checkpoint)
+
+        Raises:
+            HttpError: 404 if the checkpoint is older than Gmail's history window
+        """
+        message_ids: List[str] = []
+        seen = set()
+        history_id = start_history_id
+        page_token = None
+
+        while True:
+            params = {
+                'userId': 'me',
+                'startHistoryId': start_history_id,
+                'historyTypes': ['messageAdded'],
+                'pageToken': page_token,
+            }
+            if label_id:
+                params['labelId'] = label_id
+
+            results = GmailEmailService._execute(
+                service.users().history().list(**params), 'history.list', user_key)
+
+            for record in results.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    message_id = added['message']['id']
+                    if message_id not in seen:
+                        seen.add(message_id)
+                        message_ids.append(message_id)
+
+            history_id = results.get('historyId', history_id)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        return message_ids, history_id
+
+    @classmethod
+    def _list_full_resync(
+        cls,
+        service,
+        query: str,
+        max_results: int,
+        user_key: str = 'me',
+    ) -> Tuple[List[str], str]:
+        """List IDs of up to ``max_results`` messages matching ``query``.
+
+        The checkpoint is read before listing so that mail arriving during the
+        resync is picked up by the next incremental sync.
+
+        Args:
+            service: Gmail API service instance
+            query: Gmail search query
+            max_results: Maximum number of messages to list
+            user_key: Identifier of the mailbox owner, for rate limiting
+
+        Returns:
+            Tuple of (message IDs, new checkpoint)
+        """
+        try:
+            history_id = GmailEmailService._execute(
+                service.users().getProfile(userId='me'), 'getProfile', user_key)['historyId']
+
+            message_ids: List[str] = []
+            page_token = None
+            while len(message_ids) < max_results:
+                request = service.users().messages().list(
+                    userId='me',
+                    q=query,
+                    maxResults=min(max_results - len(message_ids), 100),  # Gmail API max is 100
+                    pageToken=page_token
+                )
+                results = GmailEmailService._execute(request, 'messages.list', user_key)
+
+                message_ids.extend(message['id'] for message in results.get('messages', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+        except HttpError as e:
+            raise GmailAPIError(f"Gmail API error: {str(e)}", e.resp.status)
+
+        return message_ids, str(history_id)
@@ -1,21 +1,93 @@
 """Tests for Gmail integration."""
 
+import asyncio
 import base64
+import datetime
+import gc
 import json
+import re
+import threading
+import time
 import unittest
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 from bs4 import BeautifulSoup
+from google.oauth2.credentials import Credentials
 from googleapiclient.errors import HttpError
 
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.testing import LOCMEM_CACHES
+from job_applications.tests.data import sample_emails
+
 from .auth import GmailAuthService
+from .credential_cache import CredentialCache, _utcnow
 from .email import GmailEmailService
-from .parser import EmailParser
+from .exceptions import GmailAPIError
+from .extraction import ExtractionPipeline, available_stages, pipeline_for
+from .html_text import available_backends, html_to_text, looks_like_html
+from .keywords import KeywordAutomaton, get_automaton
+from .mime import get_text_body, iter_parts, list_attachments
+from .models import GmailSyncState
+from .parser import EmailParser, literal_prefixes
+from .parallel import ParseResult
+from .parse_cache import ParseCache
+from .pipeline import GmailIngestionPipeline
+from .quoted_text import strip_quoted_text
+from .rate_limit import TokenBucketRateLimiter
+from .retry import RetryPolicy, deadline
+from .service_cache import GmailServiceCache
+from .sync import GmailSyncService
+from .views import GmailEmailStreamAPI
+
+
+def make_message(message_id):
+    """Build a minimal full-format Gmail message resource."""
+    return {
+        'id': message_id,
+        'threadId': f't{message_id}',
+        'labelIds': ['INBOX'],
+        'payload': {
+            'headers': [{'name': 'Subject', 'value': f'Subject {message_id}'}],
+            'body': {'data': base64.urlsafe_b64encode(b'Test body').decode()}
+        }
+    }
+
+
+class FakeBatch:
+    """Stand-in for googleapiclient's BatchHttpRequest."""
+
+    def __init__(self, callback, respond=None):
+        self.callback = callback
+        self.respond = respond or (lambda message_id: (make_message(message_id), None))
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append(request_id)
+
+    def execute(self):
+        for message_id in reversed(self.requests):
+            response, exception = self.respond(message_id)
+            self.callback(message_id, response, exception)
 
 
 class TestGmailAuth(unittest.TestCase):
     """Test Gmail authentication functionality."""
 
+    def setUp(self):
+        """Set up test fixtures."""
+        GmailAuthService.credential_cache.clear()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        GmailAuthService.credential_cache.clear()
+
     @patch('gmail.auth.Credentials')
     def test_get_credentials_from_file(self, mock_credentials):
         """Test loading credentials from file."""
@@ -41,6 +113,100 @@ class TestGmailAuth(unittest.TestCase):
             self.assertTrue(mock_flow.from_client_secrets_file.called)
 
 
+class FakeCredentials:
+    """Credentials stand-in whose refresh can be observed and held up."""
+
+    def __init__(self, expires_in, refresh_token='refresh'):
+        self.token = 'token-0'
+        self.refresh_token = refresh_token
+        self.expiry = _utcnow() + datetime.timedelta(seconds=expires_in)
+        self.refreshes = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    @property
+    def valid(self):
+        return _utcnow() < self.expiry
+
+    def refresh(self, request):
+        self.release.wait(5)
+        self.refreshes += 1
+        self.token = f'token-{self.refreshes}'
+        self.expiry = _utcnow() + datetime.timedelta(hours=1)
+
+
+class TestCredentialCache(unittest.TestCase):
+    """Test the in-memory credential cache and its background refresh."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.cache = CredentialCache(refresh_margin=datetime.timedelta(minutes=5))
+
+    def test_loads_credentials_once(self):
+        """Test storage is only read on the first get."""
+        creds = FakeCredentials(expires_in=3600)
+        load = MagicMock(return_value=creds)
+        self.assertIs(self.cache.get('u1', load), creds)
+        self.assertIs(self.cache.get('u1', load), creds)
+        self.assertEqual(load.call_count, 1)
+
+    def test_refresh_before_expiry_does_not_block(self):
+        """Test a token close to expiry is refreshed in the background."""
+        creds = FakeCredentials(expires_in=120)
+        creds.release.clear()
+        save = MagicMock()
+
+        start = time.monotonic()
+        self.assertEqual(self.cache.get('u1', lambda: creds, save).token, 'token-0')
+        self.assertLess(time.monotonic() - start, 1)
+
+        creds.release.set()
+        self.cache.refresh('u1').result(5)
+        self.cache._executor.submit(lambda: None).result(5)
+        self.assertEqual(creds.token, 'token-1')
+        save.assert_called_with(creds)
+
+    def test_concurrent_refreshes_are_coalesced(self):
+        """Test many callers holding an expired token share one refresh."""
+        creds = FakeCredentials(expires_in=-10)
+        creds.release.clear()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get('u1', lambda: creds)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        creds.release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(creds.refreshes, 1)
+        self.assertEqual([c.token for c in results], ['token-1'] * 5)
+
+    def test_refresh_is_scheduled_ahead_of_expiry(self):
+        """Test a timer refreshes the token without any caller asking."""
+        cache = CredentialCache(refresh_margin=datetime.timedelta(seconds=299.9))
+        creds = FakeCredentials(expires_in=300)
+        cache.get('u1', lambda: creds)
+
+        deadline = time.monotonic() + 5
+        while creds.refreshes == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(creds.refreshes, 1)
+        cache.clear()
+
+    def test_failed_refresh_of_expired_token(self):
+        """Test an expired token that cannot be refreshed is dropped."""
+        creds = FakeCredentials(expires_in=-10)
+        creds.refresh = MagicMock(side_effect=Exception('invalid_grant'))
+        load = MagicMock(return_value=creds)
+        self.assertIsNone(self.cache.get('u1', load))
+        self.cache.get('u1', load)
+        self.assertEqual(load.call_count, 2)
+
+
 class TestGmailEmail(unittest.TestCase):
     """Test email fetching and processing."""
 
@@ -119,8 +285,10 @@ class TestGmailEmail(unittest.TestCase):
             {'messages': []}  # Second call succeeds but returns no messages
         ]
 
-        emails = GmailEmailService.fetch_emails('test query')
+        with patch('gmail.retry.time.sleep') as sleep:
+            emails = GmailEmailService.fetch_emails('test query')
         self.assertEqual(len(emails), 0)  # Should handle error gracefully
+        sleep.assert_called_once()
 
     def test_fetch_emails_pagination(self):
         """Test email fetching with pagination."""
@@ -161,6 +329,885 @@ class TestGmailEmail(unittest.TestCase):
         self.assertEqual(emails[0]['id'], '123')
         self.assertEqual(emails[1]['id'], '456')
 
+    def test_fetch_emails_batched(self):
+        """Test batched fetching keeps list order and drops failed items."""
+        self.service_mock.users().messages().list().execute.return_value = {
+            'messages': [{'id': '123'}, {'id': '456'}, {'id': '789'}]
+        }
+        self.service_mock.users().messages().get = MagicMock(
+            side_effect=lambda userId, id, format: id
+        )
+
+        def respond(message_id):
+            # The batch answers out of order to check results are re-ordered
+            if message_id == '456':
+                return None, Exception('not found')
+            return make_message(message_id), None
+
+        batches = []
+
+        def new_batch(callback):
+            batches.append(FakeBatch(callback, respond))
+            return batches[-1]
+
+        self.service_mock.new_batch_http_request = MagicMock(side_effect=new_batch)
+
+        emails = GmailEmailService.fetch_emails('test query', max_results=3, batch=True)
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0].requests, ['123', '456', '789'])
+        self.assertEqual([email['id'] for email in emails], ['123', '789'])
+        self.assertEqual(emails[0]['subject'], 'Subject 123')
+        self.assertEqual(emails[1]['body'], 'Test body')
+
+    def test_fetch_messages_batch_splits_chunks(self):
+        """Test message gets are grouped into batches of BATCH_SIZE."""
+        batches = []
+
+        def new_batch(callback):
+            batch = MagicMock()
+            batch.execute.side_effect = lambda: [
+                callback(call.kwargs['request_id'], {'id': call.kwargs['request_id']}, None)
+                for call in batch.add.call_args_list
+            ]
+            batches.append(batch)
+            return batch
+
+        self.service_mock.new_batch_http_request = MagicMock(side_effect=new_batch)
+        message_ids = [str(i) for i in range(250)]
+
+        with patch.object(GmailEmailService, '_rate_limit'):
+            fetched, errors = GmailEmailService._fetch_messages_batch(self.service_mock, message_ids)
+
+        self.assertEqual([batch.add.call_count for batch in batches], [100, 100, 50])
+        self.assertEqual(set(fetched), set(message_ids))
+        self.assertEqual(errors, {})
+
+    def test_list_email_headers_fetches_metadata_only(self):
+        """Test header listing requests trimmed metadata and leaves bodies unloaded."""
+        self.service_mock.users().messages().list().execute.return_value = {
+            'messages': [{'id': '123'}, {'id': '456'}]
+        }
+        self.service_mock.users().messages().get = MagicMock(return_value='request')
+        self.service_mock.new_batch_http_request = MagicMock(
+            side_effect=lambda callback: FakeBatch(callback))
+
+        with patch.object(GmailEmailService, '_rate_limit'):
+            emails = GmailEmailService.list_email_headers('test query', max_results=2)
+
+        self.assertEqual([email['id'] for email in emails], ['123', '456'])
+        self.assertIsNone(emails[0]['body'])
+        self.assertEqual(emails[0]['subject'], 'Subject 123')
+        get_kwargs = self.service_mock.users().messages().get.call_args.kwargs
+        self.assertEqual(get_kwargs['format'], 'metadata')
+        self.assertIn('Subject', get_kwargs['metadataHeaders'])
+        self.assertNotIn('parts', get_kwargs['fields'])
+        self.assertIn('fields', self.service_mock.users().messages().list.call_args.kwargs)
+
+    def test_fetch_threads_groups_conversation(self):
+        """Test threads are fetched whole and grouped into one record each."""
+        self.service_mock.users().threads().list().execute.return_value = {
+            'threads': [{'id': 't1'}, {'id': 't2'}]
+        }
+        self.service_mock.users().threads().get = MagicMock(return_value='request')
+        conversations = {
+            't1': [make_message('1'), make_message('2'), make_message('3')],
+            't2': [make_message('4')],
+        }
+        conversations['t1'][1]['payload']['headers'].append({'name': 'From', 'value': 'Recruiter'})
+        self.service_mock.new_batch_http_request = MagicMock(side_effect=lambda callback: FakeBatch(
+            callback, lambda thread_id: ({'id': thread_id, 'messages': conversations[thread_id]}, None)))
+        self.service_mock.users().messages().get.reset_mock()
+
+        with patch.object(GmailEmailService, '_rate_limit') as rate_limit, \
+                patch.object(EmailParser, 'parse_email', return_value={'company_name': 'Acme'}) as parse_email:
+            threads = GmailEmailService.fetch_threads('test query', max_results=2, parse_content=True)
+
+        self.assertEqual([thread['thread_id'] for thread in threads], ['t1', 't2'])
+        self.assertEqual(threads[0]['message_ids'], ['1', '2', '3'])
+        self.assertEqual(threads[0]['subject'], 'Subject 1')
+        self.assertEqual(threads[0]['participants'], ['Recruiter'])
+        self.assertEqual(threads[0]['company_name'], 'Acme')
+        # One parse per conversation, over all of its bodies
+        self.assertEqual(parse_email.call_count, 2)
+        self.assertEqual(parse_email.call_args_list[0].args[0]['body'].count('Test body'), 3)
+        self.service_mock.users().messages().get.assert_not_called()
+        rate_limit.assert_any_call('threads.get', 'me', count=2)
+
+    def test_fetch_email_body_on_demand(self):
+        """Test a body is fetched in full format when asked for."""
+        self.service_mock.users().messages().get = MagicMock(
+            side_effect=lambda userId, id, format: MagicMock(execute=lambda: make_message(id)))
+
+        with patch.object(GmailEmailService, '_rate_limit'):
+            body = GmailEmailService.fetch_email_body('123')
+
+        self.assertEqual(body, 'Test body')
+        self.assertEqual(self.service_mock.users().messages().get.call_args.kwargs['format'], 'full')
+
+
+class TestGmailIngestionPipeline(unittest.TestCase):
+    """Test the asynchronous list/fetch/decode/parse pipeline."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.service_mock = MagicMock()
+        self.service_mock.users().messages().list().execute.side_effect = [
+            {'messages': [{'id': str(i)} for i in range(20)], 'nextPageToken': 'next'},
+            {'messages': [{'id': str(i)} for i in range(20, 30)]},
+        ]
+        self.rate_patcher = patch.object(GmailEmailService, '_rate_limit')
+        self.rate_patcher.start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.rate_patcher.stop()
+
+    def slow_service(self, active, peak, lock):
+        """Build a service whose gets take longer for lower message IDs."""
+        service = MagicMock()
+
+        def execute(message_id):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.001 * (30 - int(message_id)))
+            with lock:
+                active[0] -= 1
+            return make_message(message_id)
+
+        service.users().messages().get = MagicMock(
+            side_effect=lambda userId, id, format: MagicMock(execute=lambda: execute(id)))
+        return service
+
+    def test_fetches_concurrently_and_keeps_list_order(self):
+        """Test concurrent fetch workers still return emails in list order."""
+        active, peak, lock = [0], [0], threading.Lock()
+        pipeline = GmailIngestionPipeline(
+            service_factory=lambda: self.slow_service(active, peak, lock), concurrency=4)
+
+        emails = pipeline.run_sync(self.service_mock, 'test query', 30)
+
+        self.assertEqual([email['id'] for email in emails], [str(i) for i in range(30)])
+        self.assertGreater(peak[0], 1)
+        self.assertLessEqual(peak[0], 4)
+
+    def test_stream_yields_positions(self):
+        """Test the stream yields each email once with its list position."""
+        pipeline = GmailIngestionPipeline(
+            service_factory=lambda: self.slow_service([0], [0], threading.Lock()), concurrency=4)
+
+        async def collect():
+            return [item async for item in pipeline.stream(self.service_mock, '', 30)]
+
+        items = asyncio.run(collect())
+        self.assertEqual(sorted(position for position, _ in items), list(range(30)))
+        self.assertTrue(all(email['id'] == str(position) for position, email in items))
+
+    def test_failed_messages_are_skipped(self):
+        """Test a failing message get does not stop the pipeline."""
+        def get(userId, id, format):
+            if id == '5':
+                return MagicMock(execute=MagicMock(side_effect=Exception('boom')))
+            return MagicMock(execute=lambda: make_message(id))
+
+        service = MagicMock()
+        service.users().messages().get = MagicMock(side_effect=get)
+        pipeline = GmailIngestionPipeline(service_factory=lambda: service, concurrency=3)
+
+        emails = pipeline.run_sync(self.service_mock, '', 30)
+        self.assertEqual(len(emails), 29)
+        self.assertNotIn('5', [email['id'] for email in emails])
+
+    def test_listing_error_is_raised(self):
+        """Test an error from the listing stage reaches the caller."""
+        error_response = MagicMock()
+        error_response.status = 500
+        self.service_mock.users().messages().list().execute.side_effect = HttpError(
+            error_response, b'Backend error')
+        pipeline = GmailIngestionPipeline(service_factory=MagicMock)
+
+        with patch('gmail.retry.time.sleep') as sleep, self.assertRaises(GmailAPIError):
+            pipeline.run_sync(self.service_mock, '', 30)
+        self.assertTrue(sleep.called)  # Retried before giving up
+
+    def test_parse_runs_in_executor(self):
+        """Test parsed fields are merged in by the parse stage."""
+        pipeline = GmailIngestionPipeline(
+            service_factory=lambda: self.slow_service([0], [0], threading.Lock()),
+            concurrency=2, parse_workers=2)
+
+        with patch('gmail.pipeline.parse_email_data', return_value={'job_title': 'Engineer'}) as parse:
+            emails = pipeline.run_sync(self.service_mock, '', 30, parse_content=True)
+
+        self.assertEqual(parse.call_count, 30)
+        self.assertEqual([email['id'] for email in emails], [str(i) for i in range(30)])
+        self.assertTrue(all(email['job_title'] == 'Engineer' for email in emails))
+
+    def test_runs_reuse_cached_thread_services(self):
+        """Test later runs fetch on the same threads, so cached services are not rebuilt."""
+        builds = []
+
+        def build(document, http):
+            builds.append(threading.get_ident())
+            return self.slow_service([0], [0], threading.Lock())
+
+        service_cache = GmailServiceCache()
+        credentials = Credentials('a')
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        with patch('gmail.service_cache.build_from_document', side_effect=build), \
+                patch('gmail.pipeline._fetch_pool', pool):
+            for _ in range(3):
+                self.service_mock.users().messages().list().execute.side_effect = [
+                    {'messages': [{'id': str(i)} for i in range(30)]}]
+                pipeline = GmailIngestionPipeline(
+                    service_factory=lambda: service_cache.get(credentials), concurrency=4)
+                self.assertEqual(len(pipeline.run_sync(self.service_mock, '', 30)), 30)
+
+        # At most one build per pool thread over all three runs
+        self.assertLessEqual(len(builds), 2)
+        self.assertEqual(len(set(builds)), len(builds))
+
+
+class TestEmailStreaming(TestCase):
+    """Test the generator API and the NDJSON streaming endpoint."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.service_mock = MagicMock()
+        self.service_mock.users().messages().list().execute.return_value = {
+            'messages': [{'id': str(i)} for i in range(30)]
+        }
+        self.get_calls = []
+
+        def get(userId, id, format):
+            self.get_calls.append(id)
+            return MagicMock(execute=lambda: make_message(id))
+
+        self.service_mock.users().messages().get = MagicMock(side_effect=get)
+        self.rate_patcher = patch.object(GmailEmailService, '_rate_limit')
+        self.rate_patcher.start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.rate_patcher.stop()
+
+    def test_iter_emails_yields_every_email(self):
+        """Test the generator yields each fetched email once."""
+        emails = GmailEmailService.iter_emails(
+            '', max_results=30, concurrency=4, service_factory=lambda: self.service_mock)
+        self.assertEqual(sorted(int(email['id']) for email in emails), list(range(30)))
+
+    def test_closing_generator_stops_fetching(self):
+        """Test an abandoned stream does not fetch the rest of the mailbox."""
+        pipeline = GmailIngestionPipeline(
+            service_factory=lambda: self.service_mock, concurrency=1, queue_size=2)
+        stream = pipeline.iter_sync(self.service_mock, '', 30)
+        next(stream)
+        stream.close()
+        self.assertLess(len(self.get_calls), 30)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_stream_endpoint_writes_ndjson(self):
+        """Test the endpoint streams one JSON document per line."""
+        user = get_user_model().objects.create_user(email='stream@example.com', password='testpass123')
+        self.service_mock.users().messages().list().execute.return_value = {
+            'messages': [{'id': str(i)} for i in range(5)]
+        }
+        request = APIRequestFactory().get(
+            '/api/gmail/emails/stream/', {'max_results': '5'}, HTTP_AUTHORIZATION='Bearer token')
+        force_authenticate(request, user=user)
+
+        with patch('gmail.views.get_gmail_service', return_value=self.service_mock):
+            response = GmailEmailStreamAPI.as_view()(request)
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(self.service_mock.users().messages().list.call_args.kwargs['maxResults'], 5)
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['body'], 'Test body')
+
+    def stream_request(self, user):
+        """Return a bearer-authenticated request of ``user`` for the stream endpoint."""
+        request = APIRequestFactory().get('/api/gmail/emails/stream/', HTTP_AUTHORIZATION='Bearer token')
+        force_authenticate(request, user=user)
+        return request
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_stream_endpoint_reports_early_errors_with_status(self):
+        """Test auth and first listing failures are error responses, not stream lines."""
+        user = get_user_model().objects.create_user(email='stream@example.com', password='testpass123')
+        error_response = MagicMock()
+        error_response.status = 500
+        self.service_mock.users().messages().list().execute.side_effect = HttpError(
+            error_response, b'Backend error')
+
+        with patch('gmail.views.get_gmail_service', return_value=self.service_mock), \
+                patch('gmail.retry.time.sleep'):
+            response = GmailEmailStreamAPI.as_view()(self.stream_request(user))
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(response.streaming)
+        self.assertIn('error', response.data)
+
+        with patch('gmail.views.get_gmail_service', return_value=None):
+            response = GmailEmailStreamAPI.as_view()(self.stream_request(user))
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_stream_endpoint_reports_later_errors_inline(self):
+        """Test a failure after the response has started becomes an error line."""
+        user = get_user_model().objects.create_user(email='stream@example.com', password='testpass123')
+
+        def emails(*args, **kwargs):
+            yield make_message('1')
+            raise GmailAPIError('Gmail API error: backend error', 500)
+
+        with patch.object(GmailEmailService, 'iter_emails', side_effect=emails):
+            response = GmailEmailStreamAPI.as_view()(self.stream_request(user))
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(lines[0])['id'], '1')
+        self.assertIn('error', json.loads(lines[-1]))
+
+
+class TestGmailSync(TestCase):
+    """Test checkpointed incremental synchronisation."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.user = get_user_model().objects.create_user(
+            email='sync@example.com', password='testpass123')
+        self.service_mock = MagicMock()
+        self.service_mock.new_batch_http_request = MagicMock(
+            side_effect=lambda callback: FakeBatch(callback))
+        self.patchers = [
+            patch('gmail.sync.GmailAuthService.get_service', return_value=self.service_mock),
+            patch.object(GmailEmailService, '_rate_limit'),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def test_first_sync_runs_bounded_full_resync(self):
+        """Test the first sync lists messages and stores the profile checkpoint."""
+        self.service_mock.users().getProfile().execute.return_value = {'historyId': '500'}
+        self.service_mock.users().messages().list().execute.return_value = {
+            'messages': [{'id': '1'}, {'id': '2'}],
+            'nextPageToken': 'more',
+        }
+
+        emails = GmailSyncService.sync_emails(self.user, 'label:inbox', full_resync_max_results=2)
+
+        self.assertEqual([email['id'] for email in emails], ['1', '2'])
+        self.service_mock.users().history().list.assert_not_called()
+        state = GmailSyncState.objects.get(user=self.user)
+        self.assertEqual(state.history_id, '500')
+        self.assertIsNotNone(state.last_full_sync)
+
+    def test_incremental_sync_reads_history(self):
+        """Test later syncs only fetch messages added since the checkpoint."""
+        GmailSyncState.objects.create(user=self.user, history_id='500')
+        self.service_mock.users().history().list().execute.side_effect = [
+            {
+                'history': [
+                    {'messagesAdded': [{'message': {'id': '7'}}]},
+                    {'messagesAdded': [{'message': {'id': '8'}}, {'message': {'id': '7'}}]},
+                ],
+                'nextPageToken': 'page2',
+                'historyId': '520',
+            },
+            {
+                'history': [{'messagesAdded': [{'message': {'id': '9'}}]}],
+                'historyId': '530',
+            },
+        ]
+
+        emails = GmailSyncService.sync_emails(self.user)
+
+        self.assertEqual([email['id'] for email in emails], ['7', '8', '9'])
+        self.service_mock.users().messages().list.assert_not_called()
+        self.assertEqual(GmailSyncState.objects.get(user=self.user).history_id, '530')
+
+    def test_expired_history_falls_back_to_full_resync(self):
+        """Test a 404 from the history API triggers a full resync."""
+        GmailSyncState.objects.create(user=self.user, history_id='1')
+        error_response = MagicMock()
+        error_response.status = 404
+        self.service_mock.users().history().list().execute.side_effect = HttpError(
+            error_response, b'History expired')
+        self.service_mock.users().getProfile().execute.return_value = {'historyId': '900'}
+        self.service_mock.users().messages().list().execute.return_value = {
+            'messages': [{'id': '3'}],
+        }
+
+        emails = GmailSyncService.sync_emails(self.user)
+
+        self.assertEqual([email['id'] for email in emails], ['3'])
+        self.assertEqual(GmailSyncState.objects.get(user=self.user).history_id, '900')
+
+    def test_failed_fetch_is_retried_on_next_sync(self):
+        """Test a message whose fetch keeps failing is fetched by the following sync."""
+        GmailSyncState.objects.create(user=self.user, history_id='500')
+        self.service_mock.users().history().list().execute.side_effect = [
+            {'history': [{'messagesAdded': [{'message': {'id': '7'}}, {'message': {'id': '8'}}]}],
+             'historyId': '520'},
+            {'history': [{'messagesAdded': [{'message': {'id': '9'}}, {'message': {'id': '10'}}]}],
+             'historyId': '530'},
+        ]
+
+        def respond(message_id):
+            if message_id == '8':
+                return None, http_error(503)
+            if message_id == '10':
+                return None, http_error(404)
+            return make_message(message_id), None
+
+        self.service_mock.new_batch_http_request.side_effect = lambda callback: FakeBatch(callback, respond)
+        with patch('gmail.retry.time.sleep'):
+            emails = GmailSyncService.sync_emails(self.user)
+        self.assertEqual([email['id'] for email in emails], ['7'])
+        state = GmailSyncState.objects.get(user=self.user)
+        self.assertEqual((state.history_id, state.pending_message_ids), ('520', ['8']))
+
+        self.service_mock.new_batch_http_request.side_effect = lambda callback: FakeBatch(
+            callback, lambda message_id: respond(message_id) if message_id == '10' else (make_message(message_id), None))
+        emails = GmailSyncService.sync_emails(self.user)
+        self.assertEqual([email['id'] for email in emails], ['8', '9'])
+        # A deleted message is not retried
+        state = GmailSyncState.objects.get(user=self.user)
+        self.assertEqual((state.history_id, state.pending_message_ids), ('530', []))
+
+
+def http_error(status, retry_after=None, reason=None):
+    """Build an HttpError with an optional Retry-After header and error reason."""
+    resp = MagicMock()
+    resp.status = status
+    resp.get.side_effect = lambda key, default=None: (
+        retry_after if key == 'retry-after' and retry_after is not None else default)
+    content = json.dumps({'error': {'errors': [{'reason': reason}]}}).encode() if reason else b'error'
+    return HttpError(resp, content)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test backoff, deadlines and retry safety of Gmail calls."""
+
+    def setUp(self):
+        """Run on a fake clock: sleeping advances it instantly."""
+        self.now = 1000.0
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+        patchers = [
+            patch('gmail.retry.time.monotonic', side_effect=lambda: self.now),
+            patch('gmail.retry.time.sleep', side_effect=sleep),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.policy = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=10.0, call_deadline=60.0)
+
+    def test_retries_transient_errors_until_success(self):
+        """Test that 5xx responses are retried and stats are recorded."""
+        func = MagicMock(side_effect=[http_error(503), http_error(500), 'ok'])
+        self.assertEqual(self.policy.call(func), 'ok')
+        self.assertEqual(func.call_count, 3)
+        stats = self.policy.stats.snapshot()
+        self.assertEqual(stats['calls'], 1)
+        self.assertEqual(stats['attempts'], 3)
+        self.assertEqual(stats['retried_calls'], 1)
+        self.assertEqual(stats['gave_up'], 0)
+        self.assertAlmostEqual(stats['backoff_seconds'], sum(self.sleeps))
+
+    def test_decorrelated_jitter_bounds(self):
+        """Test that each delay lies between the base and three times the previous delay."""
+        func = MagicMock(side_effect=[http_error(503)] * 3 + ['ok'])
+        with patch('gmail.retry.random.uniform', side_effect=lambda low, high: high) as uniform:
+            self.policy.call(func)
+        self.assertEqual([call.args for call in uniform.call_args_list], [(1.0, 3.0), (1.0, 9.0), (1.0, 27.0)])
+        self.assertEqual(self.sleeps, [3.0, 9.0, 10.0])
+
+    def test_honours_retry_after(self):
+        """Test that a Retry-After longer than the backoff is waited out."""
+        func = MagicMock(side_effect=[http_error(429, retry_after='7'), 'ok'])
+        self.policy.call(func)
+        self.assertEqual(self.sleeps, [7.0])
+
+    def test_gives_up_after_max_attempts(self):
+        """Test that the last error is raised once attempts run out."""
+        func = MagicMock(side_effect=http_error(503))
+        with self.assertRaises(HttpError):
+            self.policy.call(func)
+        self.assertEqual(func.call_count, 4)
+        self.assertEqual(self.policy.stats.snapshot()['gave_up'], 1)
+
+    def test_gives_up_at_deadline(self):
+        """Test that a backoff running past the operation deadline is not attempted."""
+        func = MagicMock(side_effect=[http_error(429, retry_after='30'), 'ok'])
+        with deadline(10), self.assertRaises(HttpError):
+            self.policy.call(func)
+        self.assertEqual(func.call_count, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_does_not_retry_client_errors(self):
+        """Test that 404s and non rate-limit 403s fail immediately."""
+        for error in (http_error(404), http_error(403, reason='insufficientPermissions')):
+            func = MagicMock(side_effect=error)
+            with self.assertRaises(HttpError):
+                self.policy.call(func)
+            self.assertEqual(func.call_count, 1)
+        func = MagicMock(side_effect=[http_error(403, reason='userRateLimitExceeded'), 'ok'])
+        self.assertEqual(self.policy.call(func), 'ok')
+
+    def test_non_idempotent_calls_only_retry_rejections(self):
+        """Test that a send is not repeated after an ambiguous 500 but is after a 429."""
+        func = MagicMock(side_effect=http_error(500))
+        with self.assertRaises(HttpError):
+            self.policy.call(func, idempotent=False)
+        self.assertEqual(func.call_count, 1)
+
+        func = MagicMock(side_effect=[http_error(429), 'sent'])
+        self.assertEqual(self.policy.call(func, idempotent=False), 'sent')
+
+    def test_list_rate_limit_is_bounded(self):
+        """Test that a persistently throttled list raises instead of looping forever."""
+        service = MagicMock()
+        service.users().messages().list().execute.side_effect = http_error(429)
+        with patch.object(GmailEmailService, 'retry_policy', self.policy), \
+                patch.object(GmailEmailService, '_rate_limit'), \
+                self.assertRaises(GmailAPIError):
+            list(GmailEmailService._iter_message_pages(service, '', 10))
+        self.assertEqual(len(self.sleeps), 3)
+
+    def test_batch_retries_only_failed_items(self):
+        """Test that transiently failed batch items are resent and permanent failures are not."""
+        attempts = {}
+
+        def respond(message_id):
+            attempts[message_id] = attempts.get(message_id, 0) + 1
+            if message_id == 'gone':
+                return None, http_error(404)
+            if message_id == 'busy' and attempts[message_id] == 1:
+                return None, http_error(429, retry_after='2')
+            return make_message(message_id), None
+
+        service = MagicMock()
+        service.new_batch_http_request.side_effect = lambda callback: FakeBatch(callback, respond)
+        with patch.object(GmailEmailService, 'retry_policy', self.policy), \
+                patch.object(GmailEmailService, '_rate_limit'):
+            fetched, errors = GmailEmailService._fetch_messages_batch(service, ['ok', 'busy', 'gone'])
+
+        self.assertEqual(set(fetched), {'ok', 'busy'})
+        self.assertEqual(set(errors), {'gone'})
+        self.assertEqual(attempts, {'ok': 1, 'busy': 2, 'gone': 1})
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertGreaterEqual(self.sleeps[0], 2.0)
+
+    def test_failed_batches_are_not_successes(self):
+        """Test a batch whose items all fail feeds failures, not a success, to the limiter."""
+        attempts = {}
+
+        def respond(message_id):
+            attempts[message_id] = attempts.get(message_id, 0) + 1
+            if attempts[message_id] == 1:
+                return None, http_error(503)
+            return make_message(message_id), None
+
+        service = MagicMock()
+        service.new_batch_http_request.side_effect = lambda callback: FakeBatch(callback, respond)
+        limiter = MagicMock()
+        with patch.object(GmailEmailService, 'retry_policy', self.policy), \
+                patch.object(GmailEmailService, 'rate_limiter', limiter):
+            fetched, errors = GmailEmailService._fetch_messages_batch(service, ['a', 'b'], user_key='u1')
+
+        self.assertEqual(set(fetched), {'a', 'b'})
+        self.assertEqual(errors, {})
+        limiter.failed.assert_called_once_with('u1', 2)
+        limiter.succeeded.assert_called_once_with('u1')
+        limiter.throttled.assert_not_called()
+
+
+class TestTokenBucketRateLimiter(unittest.TestCase):
+    """Test the quota-aware Gmail rate limiter."""
+
+    def test_units_follow_method_cost(self):
+        """Test quota units are charged per method and per call."""
+        self.assertEqual(TokenBucketRateLimiter.units_for('messages.get'), 5)
+        self.assertEqual(TokenBucketRateLimiter.units_for('history.list'), 2)
+        self.assertEqual(TokenBucketRateLimiter.units_for('messages.get', count=100), 500)
+
+    def test_waits_when_bucket_is_empty(self):
+        """Test acquire sleeps once the per-user budget is spent."""
+        clock = [1000.0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        limiter = TokenBucketRateLimiter(user_rate=10, project_rate=1000, cache_alias=None)
+        with patch('gmail.rate_limit.time.time', side_effect=lambda: clock[0]), \
+                patch('gmail.rate_limit.time.sleep', side_effect=sleep):
+            self.assertEqual(limiter.acquire('messages.get', 'u1', count=2), 0.0)
+            self.assertAlmostEqual(limiter.acquire('messages.get', 'u1'), 0.5)
+            # Other users have their own bucket
+            self.assertEqual(limiter.acquire('messages.get', 'u2'), 0.0)
+
+    def test_rate_adapts_to_throttling(self):
+        """Test 429s cut the user's rate and successes restore it."""
+        limiter = TokenBucketRateLimiter(user_rate=100, cache_alias=None)
+        limiter.throttled('u1')
+        limiter.throttled('u1')
+        factor = lambda: limiter.local_store.update('user:u1', lambda state: (state, state['factor']))
+        self.assertAlmostEqual(factor(), 0.25)
+        for _ in range(100):
+            limiter.succeeded('u1')
+        self.assertEqual(factor(), 1.0)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_buckets_are_shared_through_cache(self):
+        """Test two limiters (e.g. two workers) draw from the same cached bucket."""
+        first = TokenBucketRateLimiter(user_rate=10, project_rate=1000, project='p')
+        second = TokenBucketRateLimiter(user_rate=10, project_rate=1000, project='p')
+        with patch('gmail.rate_limit.time.time', return_value=2000.0), \
+                patch('gmail.rate_limit.time.sleep') as mock_sleep:
+            first.acquire('messages.get', 'shared', count=2)
+            mock_sleep.side_effect = RuntimeError('would block')
+            with self.assertRaises(RuntimeError):
+                second.acquire('messages.get', 'shared')
+
+    def test_falls_back_when_cache_fails(self):
+        """Test cache errors fall back to in-process buckets, loudly."""
+        limiter = TokenBucketRateLimiter(user_rate=100)
+        limiter.cache_store = MagicMock()
+        limiter.cache_store.take.side_effect = ConnectionError('redis down')
+        with self.assertLogs('gmail.rate_limit', 'ERROR'):
+            self.assertEqual(limiter.acquire('messages.get', 'u1'), 0.0)
+        self.assertEqual(limiter.acquire('messages.get', 'u1'), 0.0)
+        self.assertEqual(limiter.cache_store.take.call_count, 1)
+        self.assertEqual(limiter.cache_fallbacks, 1)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_lock_timeout_retries_the_cache(self):
+        """Test a contended cache lock is waited out rather than left for in-process buckets."""
+        cache.clear()
+        limiter = TokenBucketRateLimiter(user_rate=100, project='p')
+        cache.set('gmail:ratelimit:user:u1:lock', 'held by another worker', 60)
+        update = limiter.cache_store.update
+
+        def contended(key, func):
+            # The other worker releases the lock after our first attempt times out
+            try:
+                return update(key, func)
+            finally:
+                cache.delete('gmail:ratelimit:user:u1:lock')
+
+        with patch('gmail.rate_limit.CACHE_LOCK_TIMEOUT', 0), \
+                patch.object(limiter.cache_store, 'update', side_effect=contended), \
+                self.assertLogs('gmail.rate_limit', 'WARNING'):
+            self.assertEqual(limiter.acquire('messages.get', 'u1'), 0.0)
+        self.assertIsNotNone(cache.get('gmail:ratelimit:user:u1'))
+        self.assertEqual(limiter.local_store._states, {})
+        self.assertEqual(limiter.cache_fallbacks, 0)
+
+    def test_failures_are_counted_apart(self):
+        """Test non-429 failures are counted without touching the rate."""
+        limiter = TokenBucketRateLimiter(user_rate=100, cache_alias=None)
+        limiter.failed('u1', 3)
+        limiter.failed('u1')
+        self.assertEqual(limiter.failures, {'u1': 4})
+        self.assertEqual(limiter.local_store._states, {})
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_redis_updates_are_one_script_call(self):
+        """Test on Redis each bucket update is a single script run, without a lock."""
+        cache.clear()
+        client = MagicMock()
+        script = client.register_script.return_value
+        script.return_value = [b'0', b'1']
+        limiter = TokenBucketRateLimiter(user_rate=100, project='p')
+        with patch('gmail.rate_limit.CacheBucketStore._redis_client', return_value=client):
+            self.assertEqual(limiter.acquire('messages.get', 'u1'), 0.0)
+            script.return_value = b'0.5'
+            limiter.throttled('u1')
+        self.assertEqual(script.call_count, 3)
+        self.assertEqual(client.register_script.call_count, 2)
+        self.assertEqual(script.call_args_list[0].kwargs['keys'], [cache.make_key('gmail:ratelimit:user:u1')])
+        self.assertIsNone(cache.get('gmail:ratelimit:user:u1:lock'))
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_success_at_full_rate_skips_cache_write(self):
+        """Test successes only write the shared bucket while the rate is recovering."""
+        cache.clear()
+        limiter = TokenBucketRateLimiter(user_rate=100, project='p')
+        limiter.acquire('messages.get', 'u1')
+        with patch.object(limiter.cache_store, 'update', wraps=limiter.cache_store.update) as update:
+            limiter.succeeded('u1')
+            update.assert_not_called()
+            limiter.throttled('u1')
+            limiter.succeeded('u1')
+            self.assertEqual(update.call_count, 2)
+
+
+def b64url(data):
+    """Encode bytes the way Gmail does: base64url without padding."""
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+class TestMimeWalker(unittest.TestCase):
+    """Test the recursive MIME part walker."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.payload = {
+            'mimeType': 'multipart/mixed',
+            'parts': [
+                {
+                    'mimeType': 'text/plain',
+                    'filename': 'notes.txt',
+                    'headers': [{'name': 'Content-Disposition', 'value': 'attachment; filename="notes.txt"'}],
+                    'body': {'data': b64url(b'attachment text'), 'size': 15},
+                },
+                {
+                    'mimeType': 'multipart/alternative',
+                    'parts': [
+                        {
+                            'mimeType': 'text/plain',
+                            'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset="utf-8"'}],
+                            'body': {'data': b64url('Plain café'.encode('utf-8'))},
+                        },
+                        {
+                            'mimeType': 'text/html',
+                            'headers': [{'name': 'Content-Type', 'value': 'text/html; charset=ISO-8859-1'}],
+                            'body': {'data': b64url('<p>Café</p>'.encode('iso-8859-1'))},
+                        },
+                    ],
+                },
+                {
+                    'mimeType': 'application/pdf',
+                    'filename': 'resume.pdf',
+                    'body': {'attachmentId': 'att-1', 'size': 2048},
+                },
+            ],
+        }
+
+    def test_finds_nested_html_with_charset(self):
+        """Test HTML nested inside multipart/mixed is found and decoded with its charset."""
+        self.assertEqual(get_text_body(self.payload), '<p>Café</p>')
+
+    def test_prefers_plain_when_asked(self):
+        """Test the preference order can be changed."""
+        self.assertEqual(get_text_body(self.payload, ('text/plain',)), 'Plain café')
+
+    def test_attachments_are_skipped_unless_requested(self):
+        """Test attachment parts are not walked by default but can be listed."""
+        walked = [part.get('filename') for part in iter_parts(self.payload)]
+        self.assertNotIn('notes.txt', walked)
+        self.assertEqual(
+            [attachment['filename'] for attachment in list_attachments(self.payload)],
+            ['notes.txt', 'resume.pdf'])
+
+    def test_single_part_and_bad_charset(self):
+        """Test a bare payload is its own body and unknown charsets fall back to UTF-8."""
+        payload = {
+            'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset=x-unknown'}],
+            'body': {'data': b64url('naïve'.encode('utf-8'))},
+        }
+        self.assertEqual(get_text_body(payload), 'naïve')
+        self.assertEqual(GmailEmailService._get_body({'payload': self.payload}), '<p>Café</p>')
+
+
+class TestGmailServiceCache(unittest.TestCase):
+    """Test the per-credential Gmail service cache."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.build_patcher = patch(
+            'gmail.service_cache.build_from_document', side_effect=lambda document, http: MagicMock())
+        self.mock_build = self.build_patcher.start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.build_patcher.stop()
+
+    def test_reuses_service_for_same_account(self):
+        """Test services are built once per account, even across token refreshes."""
+        cache = GmailServiceCache()
+        first = cache.get(Credentials('token-1', refresh_token='refresh-a', client_id='c'))
+        second = cache.get(Credentials('token-2', refresh_token='refresh-a', client_id='c'))
+        other = cache.get(Credentials('token-3', refresh_token='refresh-b', client_id='c'))
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(self.mock_build.call_count, 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_discovery_document_parsed_once(self):
+        """Test every build shares one parsed discovery document."""
+        cache = GmailServiceCache()
+        cache.get(Credentials('token-1'))
+        cache.get(Credentials('token-2'))
+        documents = [call.args[0] for call in self.mock_build.call_args_list]
+        self.assertIs(documents[0], documents[1])
+        self.assertIn('users', documents[0]['resources'])
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays within max_size, dropping the oldest entry."""
+        cache = GmailServiceCache(max_size=2)
+        first = cache.get(Credentials('a'))
+        cache.get(Credentials('b'))
+        cache.get(Credentials('a'))
+        cache.get(Credentials('c'))
+
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get(Credentials('a')), first)
+        cache.get(Credentials('b'))
+        self.assertEqual(self.mock_build.call_count, 4)
+
+    def test_entries_expire_after_ttl(self):
+        """Test a service is rebuilt once its TTL has passed."""
+        cache = GmailServiceCache(ttl=60)
+        with patch('gmail.service_cache.time.monotonic', return_value=100.0):
+            first = cache.get(Credentials('a'))
+        with patch('gmail.service_cache.time.monotonic', return_value=159.0):
+            self.assertIs(cache.get(Credentials('a')), first)
+        with patch('gmail.service_cache.time.monotonic', return_value=161.0):
+            self.assertIsNot(cache.get(Credentials('a')), first)
+
+    def test_services_are_not_shared_between_threads(self):
+        """Test each thread gets its own service, since transports are not thread-safe."""
+        cache = GmailServiceCache()
+        credentials = Credentials('a')
+        main_service = cache.get(credentials)
+        services = []
+        thread = threading.Thread(target=lambda: services.append(cache.get(credentials)))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(services[0], main_service)
+        self.assertIs(cache.get(credentials), main_service)
+
+    def test_services_of_finished_threads_are_released(self):
+        """Test a pool's services are dropped when its threads exit, not left to the TTL."""
+        cache = GmailServiceCache()
+        credentials = Credentials('a')
+        cache.get(credentials)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            services = {id(service): service for service in pool.map(lambda _: cache.get(credentials), range(8))}
+        released = []
+        for service_id, service in services.items():
+            weakref.finalize(service, released.append, service_id)
+        del services, service
+        gc.collect()
+
+        self.assertEqual(len(released), self.mock_build.call_count - 1)
+        self.assertEqual(len(cache), 1)
+
 
 class TestEmailParser(unittest.TestCase):
     """Test email parsing functionality."""
@@ -232,3 +1279,485 @@ class TestEmailParser(unittest.TestCase):
 
 if __name__ == '__main__':
     unittest.main()
+
+
+class TestPatternSet(unittest.TestCase):
+    """Test the single-scan field extraction engine."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.parser = EmailParser()
+
+    def per_pattern(self, text):
+        """Extract every field by searching once per pattern."""
+        return {field: self.parser.extract_field(text, patterns, field)
+                for field, patterns in EmailParser.PATTERNS.items()}
+
+    def test_matches_per_pattern_extraction(self):
+        """Test results are identical to searching once per pattern."""
+        texts = [
+            value for name, value in vars(sample_emails).items() if name.startswith('SAMPLE_')
+        ] + [
+            'Applicant: Name: John Smith\nPosition: Lead Developer\nPosition ID: P-1234',
+            'APPLYING FOR: DATA ENGINEER at Acme Widgets Inc. Job#: ab-12',
+            'Candidate: Jane Doe with Globex Corp and Initech Ltd. req#: 99',
+            # Text where lower-casing and case-insensitive matching disagree
+            '\u017fubmitted by: Anna Bell\nCompany: \u212aite \u0130nc',
+            '',
+        ]
+        for text in texts:
+            with self.subTest(text=text[:30]):
+                self.assertEqual(self.parser.extract_fields(text), self.per_pattern(text))
+
+    def test_literal_prefixes(self):
+        """Test leading keywords are derived only where every match starts with one."""
+        self.assertEqual(literal_prefixes(r'job\s*(?:id|#):'), ['job'])
+        self.assertEqual(literal_prefixes(r'(?:Company|Employer):\s*(\w+)'), ['company', 'employer'])
+        self.assertEqual(literal_prefixes(r'jobs?:'), ['job'])
+        self.assertIsNone(literal_prefixes(r'(?:at|with)?\s+x'))
+        self.assertIsNone(literal_prefixes(r'job|position'))
+        self.assertIsNone(literal_prefixes(r'\s*name'))
+
+    def test_subclass_patterns_are_compiled(self):
+        """Test a subclass overriding PATTERNS gets its own pattern set."""
+        class TitleOnlyParser(EmailParser):
+            PATTERNS = {'job_title': [r'title:\s*([a-z ]+)']}
+
+        self.assertIsNot(TitleOnlyParser.pattern_set, EmailParser.pattern_set)
+        value, _ = TitleOnlyParser().extract_fields('Title: Data Engineer')['job_title']
+        self.assertEqual(value, 'Data Engineer')
+
+    def test_window_bounds_backtracking(self):
+        """Test keyword-dense text without a match is scanned in linear time."""
+        # Every 'at' starts a company match that backtracks over the rest of the line
+        text = 'position job at data ' * 4000
+        started = time.perf_counter()
+        self.parser.extract_fields(text)
+        self.assertLess(time.perf_counter() - started, 2)
+
+    def test_window_cuts_long_matches(self):
+        """Test a match is cut at the window edge instead of running on."""
+        value, _ = self.parser.extract_fields('Position: ' + 'a' * 2000)['job_title']
+        self.assertEqual(len(value), EmailParser.MATCH_WINDOW - len('Position: '))
+
+    def test_long_bodies_are_capped(self):
+        """Test text past MAX_TEXT_LENGTH is not parsed."""
+        parser = EmailParser()
+        parser.cache = None
+        padding = '.' * EmailParser.MAX_TEXT_LENGTH
+        self.assertEqual(parser.parse_email({'body': 'Company: Acme Inc\n' + padding})['company_name'], 'Acme Inc')
+        self.assertIsNone(parser.parse_email({'body': padding + '\nCompany: Acme Inc'})['company_name'])
+
+
+class TestParseBatch(unittest.TestCase):
+    """Test multi-process batch parsing."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.emails = [
+            {'subject': f'Application {i}', 'body': f'Name: Person {i}\nJob ID: REQ-{i:04d}'}
+            for i in range(25)
+        ]
+
+    def test_results_keep_input_order(self):
+        """Test results stream back in input order from several workers."""
+        results = list(EmailParser.parse_batch(self.emails, workers=2, chunk_size=4))
+        self.assertEqual([result.index for result in results], list(range(25)))
+        self.assertEqual(results[7].value, EmailParser().parse_email(self.emails[7]))
+
+    def test_failures_are_isolated(self):
+        """Test a failing email is reported without losing the rest of its chunk."""
+        self.emails[5] = None
+        results = list(EmailParser.parse_batch(self.emails, workers=2, chunk_size=4))
+        self.assertEqual(len(results), 25)
+        self.assertIsNone(results[5].value)
+        self.assertIn('TypeError', results[5].error)
+        self.assertTrue(all(result.error is None for i, result in enumerate(results) if i != 5))
+
+    def test_unordered_results_cover_every_email(self):
+        """Test completion-order results still cover every email once."""
+        results = EmailParser.parse_batch(iter(self.emails), workers=2, chunk_size=3, ordered=False)
+        self.assertEqual(sorted(result.index for result in results), list(range(25)))
+
+    def test_single_worker_parses_in_process(self):
+        """Test one worker parses lazily without starting a pool."""
+        with patch('gmail.parallel.ProcessPoolExecutor') as pool:
+            results = EmailParser.parse_batch(iter(self.emails), workers=1, chunk_size=10)
+            first = next(results)
+        pool.assert_not_called()
+        self.assertIsInstance(first, ParseResult)
+        self.assertEqual(first.index, 0)
+
+
+NEWSLETTER_HTML = """<!DOCTYPE html>
+<html><head><title>Weekly jobs</title><style>p { color: red; }</style></head>
+<body>
+<div style="display:none; max-height:0">Preheader <span>teaser</span></div>
+<table><tr><td>Position: Backend Engineer</td><td>Company: Acme &amp; Co</td></tr></table>
+<p>Apply <a href="https://example.com">here</a>.<br>Thanks</p>
+<p hidden>Tracking note</p><img hidden src="pixel.gif">
+<script>document.write("</p>hidden");</script>
+<!-- comment -->
+<p>Bye</p>
+</body></html>"""
+
+
+class TestHtmlText(unittest.TestCase):
+    """Test streaming HTML-to-text extraction."""
+
+    def test_visible_text_only(self):
+        """Test style, script, comments and hidden content are dropped."""
+        for backend in available_backends():
+            with self.subTest(backend=backend):
+                text = html_to_text(NEWSLETTER_HTML, backend=backend)
+                self.assertIn('Position: Backend Engineer', text)
+                self.assertIn('Company: Acme & Co', text)
+                self.assertIn('Apply here.', text)
+                self.assertIn('Bye', text)
+                for hidden in ('color: red', 'Preheader', 'teaser', 'Tracking', 'document.write', 'comment'):
+                    self.assertNotIn(hidden, text)
+
+    def test_unclosed_siblings_after_hidden_element(self):
+        """Test an implicitly closed hidden element does not hide the text after it."""
+        documents = {
+            'p': '<p style="display:none">Hidden<p>Visible one<p>Visible two</body>',
+            'li': '<ul><li style="display:none">Hidden<li>Visible one<li>Visible two</ul>',
+            'td': '<table><tr><td style="display:none">Hidden<td>Visible one<tr><td>Visible two</table>',
+            'nested': '<div hidden><p>Hidden<p>Also hidden</div><p>Visible one<p>Visible two',
+        }
+        for backend in available_backends():
+            for name, html in documents.items():
+                with self.subTest(backend=backend, document=name):
+                    text = html_to_text(html, backend=backend)
+                    self.assertEqual(text.split(), ['Visible', 'one', 'Visible', 'two'])
+
+    def test_block_elements_start_new_lines(self):
+        """Test cells, paragraphs and line breaks are separated by newlines."""
+        lines = html_to_text(NEWSLETTER_HTML, backend='html.parser').splitlines()
+        self.assertIn('Position: Backend Engineer', lines)
+        self.assertIn('Company: Acme & Co', lines)
+        self.assertIn('Thanks', lines)
+
+    def test_incremental_chunks(self):
+        """Test feeding the document in chunks gives the same text."""
+        chunks = [NEWSLETTER_HTML[i:i + 7] for i in range(0, len(NEWSLETTER_HTML), 7)]
+        self.assertEqual(html_to_text(chunks, backend='html.parser'),
+                         html_to_text(NEWSLETTER_HTML, backend='html.parser'))
+
+    def test_html_detection(self):
+        """Test markup is detected while angle brackets in plain text are not."""
+        self.assertTrue(looks_like_html('<p>Hello</p>'))
+        self.assertTrue(looks_like_html('Hi<br/>there'))
+        self.assertTrue(looks_like_html('<DIV class="x">Hi</DIV>'))
+        self.assertFalse(looks_like_html('From: John <john@example.com>'))
+        self.assertFalse(looks_like_html('if a < b and c > d'))
+        self.assertFalse(looks_like_html(''))
+
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected."""
+        with self.assertRaises(ValueError):
+            html_to_text('<p>x</p>', backend='missing')
+
+    @override_settings(EMAIL_HTML_TEXT_BACKEND='missing')
+    def test_unavailable_default_falls_back(self):
+        """Test an unavailable configured backend falls back to the stdlib one."""
+        self.assertEqual(html_to_text('<p>x</p>'), 'x\n')
+
+    def test_parser_uses_extractor_for_html_fragments(self):
+        """Test HTML bodies without an <html> element are still converted."""
+        text = EmailParser()._extract_text_content({'body': '<p>Name: Jane Doe</p><style>x{}</style>'})
+        self.assertEqual(text, 'Name: Jane Doe\n')
+
+
+class TestParseCache(unittest.TestCase):
+    """Test the content-hash parse result cache."""
+
+    def setUp(self):
+        """Give the parser a private cache backed by a fresh local-memory cache."""
+        settings_override = override_settings(CACHES=LOCMEM_CACHES)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        from django.core.cache import cache
+        cache.clear()
+        self.cache = ParseCache(max_size=2)
+        patcher = patch.object(EmailParser, 'cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.email = {'subject': 'Application', 'body': 'Name: Jane Doe\nCompany: Acme'}
+
+    def test_repeat_parse_is_a_cache_hit(self):
+        """Test the second parse of the same content skips parsing."""
+        parser = EmailParser()
+        with patch.object(EmailParser, '_parse_email', wraps=parser._parse_email) as parse:
+            first = parser.parse_email(self.email)
+            second = parser.parse_email(dict(self.email, id='other-message'))
+        self.assertEqual(first, second)
+        parse.assert_called_once()
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_results_are_copies(self):
+        """Test callers cannot alter cached results."""
+        parser = EmailParser()
+        parser.parse_email(self.email)['field_scores']['job_id'] = 99
+        self.assertNotEqual(parser.parse_email(self.email)['field_scores']['job_id'], 99)
+
+    def test_lru_eviction_falls_back_to_shared_tier(self):
+        """Test evicted results are found in the shared cache."""
+        parser = EmailParser()
+        for index in range(3):
+            parser.parse_email({'body': f'Name: Person {index}'})
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(len(self.cache), 2)
+
+        parser.parse_email({'body': 'Name: Person 0'})
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 3)
+
+    def test_parser_version_invalidates(self):
+        """Test bumping PARSER_VERSION forces a fresh parse."""
+        parser = EmailParser()
+        parser.parse_email(self.email)
+        with patch.object(EmailParser, 'PARSER_VERSION', 'next'):
+            parser.parse_email(self.email)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_pipeline_config_invalidates(self):
+        """Test changing the configured stages or threshold forces a fresh parse."""
+        parser = EmailParser()
+        parser.parse_email(self.email)
+        stages = ['decode', 'compose', 'normalize', 'extract', 'score']
+        with override_settings(EMAIL_EXTRACTION_PIPELINES={'gmail': {'STAGES': stages}}):
+            parser.parse_email(self.email)
+        with override_settings(EMAIL_EXTRACTION_PIPELINES={'gmail': {'CONFIDENCE_THRESHOLD': 0.5}}):
+            parser.parse_email(self.email)
+        parser.parse_email(self.email)
+        self.assertEqual(self.cache.stats()['misses'], 3)
+
+    def test_subject_presence_is_part_of_the_key(self):
+        """Test content the parser reads differently gets a different key."""
+        parser = EmailParser()
+        parser.parse_email({'body': 'Name: Jane Doe'})
+        parser.parse_email({'subject': '', 'body': 'Name: Jane Doe'})
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_shared_cache_errors_are_tolerated(self):
+        """Test a failing shared cache degrades to the in-process tier."""
+        with patch('django.core.cache.backends.locmem.LocMemCache.get', side_effect=ConnectionError):
+            first = EmailParser().parse_email(self.email)
+            second = EmailParser().parse_email(self.email)
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+
+class TestQuotedText(unittest.TestCase):
+    """Test removal of quoted replies, signatures and disclaimers."""
+
+    def test_reply_history_is_cut(self):
+        """Test an attribution line and the history below it are removed."""
+        text = ('Thanks, Tuesday works.\r\n\r\nOn Mon, Jan 1, 2024 at 10:00 AM Jane <\r\n'
+                'jane@acme.com> wrote:\r\nCompany: Old Corp\r\n')
+        result = strip_quoted_text(text)
+        self.assertEqual(result.text, 'Thanks, Tuesday works.')
+        self.assertEqual(result.removed, len(text.replace('\r\n', '\n')) - len(result.text))
+
+    def test_quoted_lines_are_removed(self):
+        """Test '>' lines go, keeping a reply written below them."""
+        text = 'On Mon, Jan 1 Jane wrote:\n> Position: Old Role\n\nCompany: New Co'
+        self.assertEqual(strip_quoted_text(text).text.strip(), 'Company: New Co')
+
+    def test_outlook_history_is_cut(self):
+        """Test Outlook separators and header blocks start the history."""
+        for separator in ('-----Original Message-----\n', 'From: Jane <j@acme.com>\nSent: Monday\n'):
+            with self.subTest(separator=separator):
+                text = f'Sure.\n\n{separator}To: me\nSubject: Re: Interview\nCompany: Old Corp'
+                self.assertEqual(strip_quoted_text(text).text, 'Sure.')
+
+    def test_signatures_and_disclaimers_are_cut(self):
+        """Test signatures and legal footers below the text are removed."""
+        texts = [
+            'Position: Data Engineer\n-- \nJane Smith\nSenior Recruiter',
+            'Position: Data Engineer\n\nSent from my iPhone',
+            'Position: Data Engineer\n\nCONFIDENTIALITY NOTICE: for the addressee only.\nMore legal text',
+            'Position: Data Engineer\nThis email and any attachments are confidential and intended solely for you.',
+        ]
+        for text in texts:
+            with self.subTest(text=text[25:45]):
+                self.assertEqual(strip_quoted_text(text).text, 'Position: Data Engineer')
+
+    def test_unquoted_text_is_kept(self):
+        """Test forwards, long text after '--' and plain emails are left alone."""
+        texts = [
+            'From: Jane <j@acme.com>\nSent: Monday\nTo: me\nSubject: Offer\nCompany: Acme',
+            'Intro\n--\n' + 'Details line\n' * 20,
+            'Position: Data Engineer\nCompany: Acme',
+            '',
+        ]
+        for text in texts:
+            with self.subTest(text=text[:20]):
+                self.assertEqual(strip_quoted_text(text), (text, 0))
+
+    def test_parser_ignores_quoted_details(self):
+        """Test the parser reports removed bytes and extracts from the reply only."""
+        parser = EmailParser()
+        parser.cache = None
+        result = parser.parse_email({'body': (
+            'Company: Globex Inc\n\n'
+            'On Mon, Jan 1, 2024 Jane wrote:\n> Company: Initech Ltd\n> Position: Old Role'
+        )})
+        self.assertEqual(result['company_name'], 'Globex Inc')
+        self.assertIsNone(result['job_title'])
+        self.assertGreater(result['stripped_bytes'], 0)
+
+
+class FakeExtractor:
+    """Fallback extractor recording the texts it is given."""
+
+    def __init__(self):
+        self.calls = []
+
+    def extract_many(self, texts):
+        self.calls.append(list(texts))
+        return [{'position': 'Fallback Role', 'company_name': 'Fallback Co'} for _ in texts]
+
+
+class TestExtractionPipeline(unittest.TestCase):
+    """Test the stage-based extraction pipeline."""
+
+    def setUp(self):
+        self.extractor = FakeExtractor()
+
+    def make_pipeline(self, names=('decode', 'strip_quotes', 'normalize', 'extract', 'score', 'fallback'), **options):
+        def extract(context):
+            match = re.search(r'Position: (.+)', context.text)
+            return {'job_title': (match.group(1), 0.9) if match else (None, 0.0)}
+        defaults = {
+            'extract': {'extract': extract},
+            'fallback': {'get_extractor': lambda: self.extractor, 'field_map': {'job_title': 'position'}},
+        }
+        return ExtractionPipeline.from_config(names, {**defaults, **options}, confidence_threshold=0.8)
+
+    def test_unknown_and_duplicate_stages_are_rejected(self):
+        """Test misconfigured pipelines fail when built."""
+        self.assertIn('strip_quotes', available_stages())
+        with self.assertRaises(ImproperlyConfigured):
+            ExtractionPipeline.from_config(['decode', 'ocr'])
+        with self.assertRaises(ImproperlyConfigured):
+            ExtractionPipeline.from_config(['decode', 'decode'])
+        with self.assertRaises(ImproperlyConfigured):
+            ExtractionPipeline.from_config(['extract'])
+
+    def test_stages_are_measured(self):
+        """Test each stage records its time and text size per email and in the totals."""
+        pipeline = self.make_pipeline()
+        body = 'Position: Data Engineer\r\n\r\nOn Mon, Jan 1, 2024 Jane wrote:\r\n> Position: Old Role\r\n'
+        context = pipeline.run({'body': body.encode('utf-8')})
+
+        self.assertEqual(context.values, {'job_title': 'Data Engineer'})
+        self.assertEqual([run.stage for run in context.runs],
+                         ['decode', 'strip_quotes', 'normalize', 'extract', 'score', 'fallback'])
+        decode, strip = context.runs[:2]
+        self.assertEqual(decode.bytes_in, len(body))
+        self.assertEqual(decode.bytes_out, len(body.replace('\r\n', '\n')))
+        self.assertEqual(context.text, 'Position: Data Engineer')
+        self.assertEqual(context.bytes_removed('strip_quotes'), strip.bytes_in - strip.bytes_out)
+        self.assertGreater(strip.bytes_in - strip.bytes_out, len('> Position: Old Role'))
+
+        stats = pipeline.stats()
+        self.assertEqual(list(stats), [run.stage for run in context.runs])
+        self.assertEqual(stats['decode']['runs'], 1)
+        self.assertGreaterEqual(stats['strip_quotes']['seconds'], 0.0)
+        pipeline.reset_stats()
+        self.assertEqual(pipeline.stats()['decode']['runs'], 0)
+
+    def test_fallback_is_skipped_when_confident(self):
+        """Test only emails below the threshold reach the fallback, in one batch."""
+        pipeline = self.make_pipeline()
+        contexts = pipeline.run_many([{'body': 'Position: Data Engineer'}, {'body': 'Hello'}, {'body': 'Hi there'}])
+
+        self.assertEqual([context.values['job_title'] for context in contexts],
+                         ['Data Engineer', 'Fallback Role', 'Fallback Role'])
+        self.assertEqual(self.extractor.calls, [['Hello', 'Hi there']])
+        self.assertEqual(contexts[1].confidence, 0.6)
+        self.assertTrue(contexts[0].runs[-1].skipped)
+        fallback = pipeline.stats()['fallback']
+        self.assertEqual((fallback['runs'], fallback['skipped'], fallback['bytes_in']), (2, 1, 13))
+
+    def test_prepare_runs_text_stages_only(self):
+        """Test prepare stops at the first stage working on fields."""
+        pipeline = self.make_pipeline()
+        payload = {'mimeType': 'text/plain', 'body': {'data': base64.urlsafe_b64encode(b'  Hello   world ').decode()}}
+        context = pipeline.prepare({'payload': payload})
+        self.assertEqual(context.text, 'Hello world')
+        self.assertEqual(context.fields, {})
+        self.assertEqual([run.stage for run in context.runs], ['decode', 'strip_quotes', 'normalize'])
+
+    def test_stage_order_comes_from_settings(self):
+        """Test EMAIL_EXTRACTION_PIPELINES reorders a parser's stages."""
+        parser_class = type('ConfiguredParser', (EmailParser,), {'cache': None})
+        stages = ['decode', 'compose', 'normalize', 'extract', 'score']
+        with override_settings(EMAIL_EXTRACTION_PIPELINES={'gmail': {'STAGES': stages, 'CONFIDENCE_THRESHOLD': 0.5}}):
+            pipeline = pipeline_for(parser_class)
+            self.assertEqual([stage.name for stage in pipeline.stages], stages)
+            self.assertEqual(pipeline.confidence_threshold, 0.5)
+            self.assertIs(pipeline_for(parser_class), pipeline)
+            self.assertIsNot(EmailParser.pipeline(), pipeline)
+
+            # Without the quote stripping stage the quoted company is read
+            result = parser_class().parse_email({'body': 'Thanks\n\nOn Mon, Jan 1 Jane wrote:\n> Company: Initech Ltd'})
+            self.assertEqual(result['company_name'], 'Initech Ltd')
+            self.assertEqual(result['stripped_bytes'], 0)
+
+        # Changing the setting rebuilds the pipeline
+        self.assertNotEqual([stage.name for stage in pipeline_for(parser_class).stages], stages)
+
+
+class TestKeywordAutomaton(unittest.TestCase):
+    """Test the Aho-Corasick keyword matcher."""
+
+    def setUp(self):
+        self.automaton = KeywordAutomaton({
+            'title': ['engineer', 'data engineer', 'manager'],
+            'seniority': ['senior', 'sr'],
+            'company_suffix': ['Inc', 'Ltd'],
+        })
+
+    def test_every_hit_in_one_pass(self):
+        """Test overlapping keywords of every category are found, case-insensitively."""
+        hits = self.automaton.find('SENIOR Data Engineer at Acme Inc')
+        self.assertEqual([(hit.keyword, hit.category) for hit in hits], [
+            ('senior', 'seniority'), ('data engineer', 'title'), ('engineer', 'title'), ('inc', 'company_suffix'),
+        ])
+        self.assertEqual(hits[1][:2], (7, 20))
+        self.assertEqual(self.automaton.categories('Engineering Manager'), {'title'})
+        self.assertEqual(self.automaton.first('Manager of Engineering', 'title').keyword, 'manager')
+
+    def test_whole_word_categories(self):
+        """Test suffixes and seniority words do not match inside longer words."""
+        self.assertEqual(self.automaton.find('Incubator Labs, Srinagar'), [])
+        self.assertEqual([hit.keyword for hit in self.automaton.find('Acme Ltd. (Sr.)')], ['ltd', 'sr'])
+
+    def test_positions_survive_lower_casing(self):
+        """Test characters lower-casing to two keep later hits at their index."""
+        text = 'İstanbul Ltd'
+        hit = self.automaton.find(text)[0]
+        self.assertEqual(text[hit.start:hit.end], 'Ltd')
+
+    def test_vocabulary_comes_from_settings(self):
+        """Test EMAIL_KEYWORDS extends the vocabulary and changes the fingerprint."""
+        fingerprint = get_automaton().fingerprint
+        with override_settings(EMAIL_KEYWORDS={'title': ['Scientist'], 'company_suffix': ['GmbH']}):
+            automaton = get_automaton()
+            self.assertEqual(automaton.categories('Research Scientist at Zeiss GmbH'), {'title', 'company_suffix'})
+            self.assertIn('engineer', automaton.vocabulary['title'])
+            self.assertNotEqual(automaton.fingerprint, fingerprint)
+        self.assertEqual(get_automaton().fingerprint, fingerprint)
+
+    def test_parser_scores_with_keywords(self):
+        """Test title terms and company suffixes raise field confidence."""
+        parser = EmailParser()
+        self.assertGreater(parser.calculate_field_confidence('job_title', 'Data Engineer', 0.7),
+                           parser.calculate_field_confidence('job_title', 'Data Wrangler', 0.7))
+        self.assertGreater(parser.calculate_field_confidence('company_name', 'ACME INC', 0.7),
+                           parser.calculate_field_confidence('company_name', 'Incubator Labs', 0.7))
+
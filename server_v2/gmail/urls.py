@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import GmailAPI
+from .views import GmailAPI, GmailEmailBodyAPI, GmailEmailStreamAPI
 
 urlpatterns = [
     path('emails/', GmailAPI.as_view(), name='gmail-emails'),
+    path('emails/stream/', GmailEmailStreamAPI.as_view(), name='gmail-emails-stream'),
+    path('emails/<str:message_id>/body/', GmailEmailBodyAPI.as_view(), name='gmail-email-body'),
 ]
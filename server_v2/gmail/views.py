@@ -1,56 +1,65 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 import google.oauth2.credentials
-import googleapiclient.discovery
 import json
 
+from .email import GmailEmailService
+from .exceptions import GmailAPIError
+from .service_cache import get_gmail_service
+
 # Create your views here.
 
+
+JOB_EMAIL_QUERY = 'subject:"job application" OR subject:"application status"'
+STREAM_MAX_RESULTS = 500
+
+
+def _credentials_from_request(request):
+    """Build credentials from the request's bearer token, or None."""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+
+    token = auth_header.split(' ')[1]
+    return google.oauth2.credentials.Credentials(token)
+
+
+def _service_from_request(request):
+    """Build a Gmail API service from the request's bearer token, or None."""
+    credentials = _credentials_from_request(request)
+    if credentials is None:
+        return None
+    return get_gmail_service(credentials)
+
+
 class GmailAPI(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         try:
-            # Get access token from request header
-            auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
+            # Create Gmail API service from the access token in the request header
+            service = _service_from_request(request)
+            if service is None:
                 return Response({'error': 'No token provided'}, status=status.HTTP_401_UNAUTHORIZED)
-            
-            token = auth_header.split(' ')[1]
-
-            # Create Gmail API service
-            credentials = google.oauth2.credentials.Credentials(token)
-            service = googleapiclient.discovery.build('gmail', 'v1', credentials=credentials)
-
-            # Search for job-related emails
-            query = 'subject:"job application" OR subject:"application status"'
-            results = service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=10
-            ).execute()
-
-            messages = results.get('messages', [])
-            emails = []
-
-            for message in messages:
-                msg = service.users().messages().get(
-                    userId='me',
-                    id=message['id'],
-                    format='full'
-                ).execute()
-
-                headers = msg['payload']['headers']
-                email = {
+
+            # Search for job-related emails; only headers are needed here, bodies
+            # are served on demand by GmailEmailBodyAPI
+            messages = GmailEmailService.list_email_headers(
+                JOB_EMAIL_QUERY, max_results=10, service=service, user_key=str(request.user.pk))
+
+            emails = [
+                {
                     'id': msg['id'],
-                    'subject': next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject'),
-                    'from': next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown Sender'),
-                    'date': next((h['value'] for h in headers if h['name'] == 'Date'), 'No Date'),
+                    'subject': msg['subject'] or 'No Subject',
+                    'from': msg['from'] or 'Unknown Sender',
+                    'date': msg['date'] or 'No Date',
                 }
-                emails.append(email)
+                for msg in messages
+            ]
 
             return Response(emails)
 
@@ -59,3 +68,79 @@ class GmailAPI(APIView):
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class GmailEmailBodyAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, message_id):
+        try:
+            service = _service_from_request(request)
+            if service is None:
+                return Response({'error': 'No token provided'}, status=status.HTTP_401_UNAUTHORIZED)
+
+            body = GmailEmailService.fetch_email_body(
+                message_id, service=service, user_key=str(request.user.pk))
+            return Response({'id': message_id, 'body': body})
+
+        except GmailAPIError as e:
+            return Response({'error': e.message}, status=e.status_code or status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class GmailEmailStreamAPI(APIView):
+    """Stream fetched emails as newline-delimited JSON, one email per line.
+
+    Query parameters:
+        q: Gmail search query (defaults to job-related emails)
+        max_results: Maximum number of emails, capped at STREAM_MAX_RESULTS
+        headers_only: 'true' to leave bodies out
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        credentials = _credentials_from_request(request)
+        if credentials is None:
+            return Response({'error': 'No token provided'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            max_results = min(int(request.query_params.get('max_results', 50)), STREAM_MAX_RESULTS)
+        except ValueError:
+            return Response({'error': 'max_results must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        emails = GmailEmailService.iter_emails(
+            request.query_params.get('q', JOB_EMAIL_QUERY),
+            max_results=max_results,
+            headers_only=request.query_params.get('headers_only', '').lower() == 'true',
+            service_factory=lambda: get_gmail_service(credentials),
+            user_key=str(request.user.pk),
+        )
+        # Build the service and list the first page before the response starts,
+        # so those failures get a status code; later ones can only be in-band
+        try:
+            first = next(emails, None)
+        except GmailAPIError as e:
+            return Response({'error': e.message}, status=e.status_code or status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return StreamingHttpResponse(self._ndjson(first, emails), content_type='application/x-ndjson')
+
+    @staticmethod
+    def _ndjson(first, emails):
+        """Encode each email as it arrives; report a failure as a final error line."""
+        try:
+            if first is not None:
+                yield json.dumps(first) + '\n'
+            for email_data in emails:
+                yield json.dumps(email_data) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+        finally:
+            emails.close()
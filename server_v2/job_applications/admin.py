@@ -69,17 +69,17 @@ class JobApplicationAdmin(admin.ModelAdmin):
 
     def mark_as_interviewed(self, request, queryset):
         """Mark selected applications as interviewed."""
-        queryset.update(status='interviewing')
+        queryset.update_status('interviewing')
         self.message_user(request, f'Successfully marked {queryset.count()} application(s) as interviewing')
 
     def mark_as_rejected(self, request, queryset):
         """Mark selected applications as rejected."""
-        queryset.update(status='rejected')
+        queryset.update_status('rejected')
         self.message_user(request, f'Successfully marked {queryset.count()} application(s) as rejected')
 
     def mark_as_accepted(self, request, queryset):
         """Mark selected applications as accepted."""
-        queryset.update(status='accepted')
+        queryset.update_status('accepted')
         self.message_user(request, f'Successfully marked {queryset.count()} application(s) as accepted')
 
     # Action descriptions
@@ -0,0 +1,26 @@
+"""Rebuild the per-user application statistics rollup from the applications."""
+
+from django.core.management.base import BaseCommand
+
+from job_applications.services.stats_rollup import StatsRollupService
+
+
+class Command(BaseCommand):
+    """Recompute ApplicationStats rows, e.g. after a bulk import or a suspected drift."""
+
+    help = 'Rebuild the application statistics rollup of every user, or of the given users'
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='ID of a user to rebuild; may be repeated (default: all users)'
+        )
+
+    def handle(self, *args, **options):
+        """Rebuild the rollups."""
+        rebuilt = StatsRollupService.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt application statistics of {rebuilt} user(s)'))
@@ -0,0 +1,85 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:45
+
+from collections import defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+# ApplicationStats.DAILY_DAYS when this migration was written
+DAILY_DAYS = 31
+
+
+def build_application_stats(apps, schema_editor):
+    """Build every user's rollup from their existing applications."""
+    JobApplication = apps.get_model('job_applications', 'JobApplication')
+    ApplicationStats = apps.get_model('job_applications', 'ApplicationStats')
+    first_day = django.utils.timezone.localdate() - timedelta(days=DAILY_DAYS - 1)
+    status_counts = defaultdict(dict)
+    daily_counts = defaultdict(dict)
+    rows = (
+        JobApplication.objects.using(schema_editor.connection.alias)
+        .values('user_id', 'status', day=TruncDate('application_date'))
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        counts = status_counts[row['user_id']]
+        counts[row['status']] = counts.get(row['status'], 0) + row['count']
+        if row['day'] >= first_day:
+            day_counts = daily_counts[row['user_id']].setdefault(row['day'].isoformat(), {})
+            day_counts[row['status']] = day_counts.get(row['status'], 0) + row['count']
+    ApplicationStats.objects.using(schema_editor.connection.alias).bulk_create([
+        ApplicationStats(user_id=user_id, status_counts=counts, daily_counts=daily_counts[user_id])
+        for user_id, counts in status_counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('job_applications', '0005_remove_applicationmetrics_user_jobapplication_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='application_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('status_counts', models.JSONField(default=dict, help_text='Number of applications per status')),
+                ('daily_counts', models.JSONField(default=dict, help_text='Number of applications per status per application day (ISO date) of recent days')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'application stats',
+                'db_table': 'application_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ApplicationMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_applications', models.IntegerField(default=0, help_text='Total number of applications sent')),
+                ('response_rate', models.FloatField(default=0.0, help_text='Percentage of applications that received a response')),
+                ('interview_rate', models.FloatField(default=0.0, help_text='Percentage of applications that led to interviews')),
+                ('ghosted_rate', models.FloatField(default=0.0, help_text='Percentage of applications with no response')),
+                ('avg_response_time', models.FloatField(default=0.0, help_text='Average number of days to receive a response')),
+                ('best_companies', models.JSONField(default=dict, help_text='Companies with highest response rates')),
+                ('worst_companies', models.JSONField(default=dict, help_text='Companies with lowest response rates')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Timestamp when these metrics were calculated')),
+                ('user', models.ForeignKey(help_text='User who owns these metrics', on_delete=django.db.models.deletion.CASCADE, related_name='application_metrics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'application_metrics',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='application_user_id_b3f0a8_idx')],
+            },
+        ),
+        migrations.RunPython(build_application_stats, migrations.RunPython.noop),
+    ]
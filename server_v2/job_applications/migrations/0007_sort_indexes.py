@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_applications', '0006_applicationstats_applicationmetrics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobapplication',
+            name='job_applica_user_id_376ee7_idx',
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['user', '-application_date', '-id'], name='job_applica_user_id_6295a2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['user', 'last_updated', 'id'], name='job_applica_user_id_e6d59c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['user', 'company_name', 'id'], name='job_applica_user_id_3dbfe9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['user', 'position', 'id'], name='job_applica_user_id_1754b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['user', 'status', 'id'], name='job_applica_user_id_62a8c1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['user', 'status', '-application_date', '-id'], name='job_applica_user_id_54e578_idx'),
+        ),
+    ]
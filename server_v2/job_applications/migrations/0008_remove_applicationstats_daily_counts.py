@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-17 00:24
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_applications', '0007_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='applicationstats',
+            name='daily_counts',
+        ),
+    ]
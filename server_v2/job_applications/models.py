@@ -3,12 +3,31 @@
 This module defines the database models for storing job application data.
 """
 
-from django.db import models
+from django.db import models, router, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
 
+class JobApplicationQuerySet(models.QuerySet):
+    """QuerySet of job applications."""
+
+    def update_status(self, status: str) -> int:
+        """Set the status of every application in the queryset.
+
+        Unlike ``update(status=...)``, keeps the owners' statistics rollups
+        in step, in the same transaction as the update.
+
+        Args:
+            status: New status
+
+        Returns:
+            int: Number of applications updated
+        """
+        from .services.stats_rollup import StatsRollupService
+        return StatsRollupService.update_status(self, status)
+
+
 class JobApplication(models.Model):
     """Model for tracking job applications."""
 
@@ -24,6 +43,15 @@ class JobApplication(models.Model):
 
     STATUS_DICT = dict(STATUS_CHOICES)
 
+    # Statuses counted as an interview
+    INTERVIEW_STATUSES = ('interview_scheduled', 'interviewing')
+    # Days without a response after which an application counts as ghosted
+    GHOSTED_AFTER_DAYS = 30
+
+    # Fields the applications list can be sorted by ('-' for descending); each
+    # has a (user, field, id) index, so a page is read in index order
+    SORT_FIELDS = ('application_date', 'last_updated', 'company_name', 'position', 'status')
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     company_name = models.CharField(max_length=200)
     position = models.CharField(max_length=200)
@@ -38,13 +66,22 @@ class JobApplication(models.Model):
     remote_option = models.BooleanField(default=False)
     source = models.CharField(max_length=100, blank=True)
     url = models.URLField(blank=True)
+
+    objects = JobApplicationQuerySet.as_manager()
     
     class Meta:
         """Meta options for JobApplication model."""
         db_table = 'job_applications'
         ordering = ['-application_date']
         indexes = [
-            models.Index(fields=['user', '-application_date']),
+            # One per SORT_FIELDS entry, scanned backwards for the other direction
+            models.Index(fields=['user', '-application_date', '-id']),
+            models.Index(fields=['user', 'last_updated', 'id']),
+            models.Index(fields=['user', 'company_name', 'id']),
+            models.Index(fields=['user', 'position', 'id']),
+            models.Index(fields=['user', 'status', 'id']),
+            # Newest first within a status filter
+            models.Index(fields=['user', 'status', '-application_date', '-id']),
             models.Index(fields=['status']),
         ]
 
@@ -52,6 +89,27 @@ class JobApplication(models.Model):
         """String representation of the JobApplication."""
         return f"{self.company_name} - {self.position}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Load an instance, remembering the fields its owner's rollup counts."""
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'user_id', 'status'}:
+            instance._rollup_state = instance.rollup_state()
+        return instance
+
+    def rollup_state(self) -> tuple:
+        """Return the (user_id, status) the statistics rollup counts."""
+        return (self.user_id, self.status)
+
+    def save(self, *args, **kwargs):
+        """Save the application and update its owner's rollup in one transaction.
+
+        The rollup itself is updated by the post_save handler in signals.py.
+        """
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
     def clean(self):
         """Validate model fields."""
         if not self.company_name:
@@ -91,3 +149,69 @@ class Communication(models.Model):
     def __str__(self):
         """String representation of the Communication."""
         return f"{self.get_type_display()} on {self.date}"
+
+
+class ApplicationStats(models.Model):
+    """Per-user rollup of application counts.
+
+    Holds the number of applications per status, so totals and rates are
+    read from one row instead of counting applications. It is updated in the same
+    transaction as every application save, delete and
+    ``JobApplication.objects.update_status()`` (see
+    services.stats_rollup); the rebuild_application_stats command rebuilds
+    it from the applications.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='application_stats'
+    )
+    status_counts = models.JSONField(default=dict, help_text='Number of applications per status')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta options for ApplicationStats model."""
+        db_table = 'application_stats'
+        verbose_name_plural = 'application stats'
+
+    def __str__(self):
+        """String representation of the ApplicationStats."""
+        return f"Application stats for {self.user}"
+
+    @property
+    def total(self) -> int:
+        """Total number of applications."""
+        return sum(self.status_counts.values())
+
+
+class ApplicationMetrics(models.Model):
+    """Snapshot of a user's application metrics, as computed by MetricsService."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='application_metrics',
+        help_text='User who owns these metrics'
+    )
+    total_applications = models.IntegerField(default=0, help_text='Total number of applications sent')
+    response_rate = models.FloatField(default=0.0, help_text='Percentage of applications that received a response')
+    interview_rate = models.FloatField(default=0.0, help_text='Percentage of applications that led to interviews')
+    ghosted_rate = models.FloatField(default=0.0, help_text='Percentage of applications with no response')
+    avg_response_time = models.FloatField(default=0.0, help_text='Average number of days to receive a response')
+    best_companies = models.JSONField(default=dict, help_text='Companies with highest response rates')
+    worst_companies = models.JSONField(default=dict, help_text='Companies with lowest response rates')
+    created_at = models.DateTimeField(default=timezone.now, help_text='Timestamp when these metrics were calculated')
+
+    class Meta:
+        """Meta options for ApplicationMetrics model."""
+        db_table = 'application_metrics'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        """String representation of the ApplicationMetrics."""
+        return f"Application metrics for {self.user} at {self.created_at}"
@@ -0,0 +1,202 @@
+"""Pagination for job application lists.
+
+Page-number pagination counts the user's applications on every page and
+skips the rows before the page with OFFSET, so deep pages get slower the
+deeper they are. ``KeysetPagination`` instead continues after the last row
+served: the cursor holds that row's sort key and id, and the next page is
+the rows after it in (sort key, id) order. Each page costs one indexed range
+scan of page size + 1 rows, however deep; with the default newest-first
+order that is the (user, -application_date) index.
+
+``ApplicationPagination`` serves keyset pages by default and page-number
+pages to clients passing ``page`` (or ``pagination=page``), which get the
+``count`` they expect.
+"""
+
+import logging
+from typing import List, NamedTuple, Optional
+
+from django.core import signing
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import JobApplication
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CURSOR_SALT = 'job_applications.pagination.cursor'
+
+
+class Cursor(NamedTuple):
+    """Position between two rows: after ``(value, pk)``, or before it when ``reverse``."""
+
+    value: object
+    pk: int
+    reverse: bool
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination keyed on the queryset's sort field and the primary key.
+
+    The sort field is the first field the queryset is ordered by; the
+    primary key breaks ties, so the order is total and stable while rows are
+    added or removed between requests. Cursors are signed, so clients
+    cannot forge positions.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    # Fields a cursor can follow: non-null, so every row has a position
+    ordering_fields = (*JobApplication.SORT_FIELDS, 'id')
+    default_ordering = '-application_date'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None) -> List:
+        """Return the page of ``queryset`` the request's cursor points at."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.field, self.descending = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+
+        rows = list(self.page_queryset(queryset, cursor)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if cursor is not None and cursor.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def page_queryset(self, queryset, cursor: Optional[Cursor]):
+        """Return ``queryset`` from ``cursor`` on, in page order.
+
+        Uses the sort field and direction ``paginate_queryset`` read from the
+        queryset.
+        """
+        descending = self.descending != bool(cursor and cursor.reverse)
+        queryset = queryset.order_by(*(f'-{name}' if descending else name for name in (self.field, 'pk')))
+        if cursor is not None:
+            lookup = 'lt' if descending else 'gt'
+            # The first condition is implied by the second; it lets the
+            # database seek into the index instead of filtering every row
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}e': cursor.value}),
+                Q(**{f'{self.field}__{lookup}': cursor.value})
+                | Q(**{self.field: cursor.value, f'pk__{lookup}': cursor.pk}),
+            )
+        return queryset
+
+    def get_paginated_response(self, data) -> Response:
+        """Wrap a page of serialized rows with the links to its neighbours."""
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        """Return the schema of a paginated response."""
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self) -> Optional[str]:
+        """Return the URL of the page after this one, or None on the last page."""
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        """Return the URL of the page before this one, or None on the first page."""
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Past the end: the previous page is the last one
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_ordering(self, queryset) -> tuple:
+        """Return the (field name, descending) the queryset is ordered by.
+
+        Raises:
+            ValidationError: If the ordering is not one a cursor can follow
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or [self.default_ordering]
+        first = ordering[0]
+        if not isinstance(first, str):
+            raise ValidationError({'sort': 'Cursor pagination needs ordering by a field'})
+        name = first.removeprefix('-')
+        name = 'id' if name == 'pk' else name
+        if name not in self.ordering_fields:
+            raise ValidationError({
+                'sort': f'Cursor pagination supports sorting by: {", ".join(self.ordering_fields)}'
+            })
+        return name, first.startswith('-')
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        """Return the URL of the position next to ``row``."""
+        value = getattr(row, self.field)
+        payload = [self.field, value.isoformat() if hasattr(value, 'isoformat') else value, row.pk]
+        if reverse:
+            payload.append(1)
+        token = signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request) -> Optional[Cursor]:
+        """Return the request's cursor, or None for the first page.
+
+        Raises:
+            NotFound: If the cursor is malformed, forged or for another sort field
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            field, value, pk, *reverse = signing.loads(token, salt=CURSOR_SALT)
+            if field != self.field:
+                raise ValueError(f"cursor for {field}, not {self.field}")
+            value = self.model._meta.get_field(field).to_python(value)
+            return Cursor(value, int(pk), bool(reverse))
+        except (signing.BadSignature, ValueError, TypeError, DjangoValidationError) as e:
+            logger.debug("Rejected pagination cursor: %s", e)
+            raise NotFound(self.invalid_cursor_message)
+
+
+class ApplicationPagination(BasePagination):
+    """Keyset pagination, or page-number pagination for clients asking for pages.
+
+    Requests with a ``page`` parameter, or ``pagination=page``, are served by
+    ``PageNumberPagination``; all others by ``KeysetPagination``.
+    """
+
+    mode_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None) -> List:
+        """Paginate with the paginator the request asks for."""
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data) -> Response:
+        """Return the response of the paginator used."""
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginator(self, request) -> BasePagination:
+        """Return the paginator for ``request``."""
+        page_param = PageNumberPagination.page_query_param
+        if page_param in request.query_params or request.query_params.get(self.mode_query_param) == 'page':
+            return PageNumberPagination()
+        return KeysetPagination()
@@ -5,11 +5,12 @@ This module provides functionality for sending follow-up emails using Gmail API
 
 import base64
 from email.mime.text import MIMEText
-from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
 from django.core.mail import send_mail
 from django.conf import settings
 
+from gmail.retry import default_policy
+from gmail.service_cache import get_gmail_service
 from job_applications.models import JobApplication
 
 
@@ -95,7 +96,7 @@ Best regards,
         try:
             # Create Gmail API service
             creds = Credentials.from_authorized_user_info(credentials)
-            service = build('gmail', 'v1', credentials=creds)
+            service = get_gmail_service(creds)
             
             # Create message
             message = MIMEText(body)
@@ -111,11 +112,12 @@ Best regards,
             # Create message body
             body = {'raw': raw_message}
             
-            # Send message
-            service.users().messages().send(
+            # Send message; only retried if Gmail rejected it outright
+            request = service.users().messages().send(
                 userId='me',
                 body=body
-            ).execute()
+            )
+            default_policy.call(request.execute, idempotent=False)
             
             return {
                 'success': True,
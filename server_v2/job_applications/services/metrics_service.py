@@ -1,15 +1,31 @@
 """Service for calculating job application metrics.
 
 This module provides functionality for analyzing job application data and calculating metrics.
+
+Every figure is computed by the database (counts from the statistics rollup,
+averages and per-company rates from grouped queries), so the cost of a call
+does not grow with the number of applications held in memory.
 """
 
 from datetime import timedelta
-from collections import defaultdict
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, FloatField, Q
 from django.utils import timezone
-from django.db.models import Count, Avg, F, ExpressionWrapper, fields, FloatField
-from django.db.models.functions import Cast
 
-from job_applications.models import Application, ApplicationMetrics
+from job_applications.models import ApplicationMetrics, JobApplication
+from job_applications.services.stats_rollup import StatsRollupService
+
+# Companies listed as best and as worst
+RANKED_COMPANIES = 3
+# Applications a company needs to be ranked
+MIN_COMPANY_APPLICATIONS = 2
+# Fields of an ApplicationMetrics snapshot, in the metrics dict
+SNAPSHOT_FIELDS = (
+    'total_applications', 'response_rate', 'interview_rate', 'ghosted_rate',
+    'avg_response_time', 'best_companies', 'worst_companies',
+)
 
 
 class MetricsService:
@@ -19,15 +35,21 @@ class MetricsService:
     def calculate_metrics(user) -> dict:
         """Calculate job application metrics for a user.
 
+        Counts and rates come from the user's statistics rollup; an
+        application has had a response once it left the 'applied' status,
+        and is ghosted when still 'applied' GHOSTED_AFTER_DAYS days on.
+        The metrics are stored as an ApplicationMetrics snapshot when they
+        differ from the user's latest one (see ``store_snapshot``).
+
         Args:
             user: User instance to calculate metrics for.
 
         Returns:
             dict: Dictionary containing calculated metrics.
         """
-        # Get all applications for the user
-        applications = Application.objects.filter(user=user)
-        total_applications = applications.count()
+        rollup = StatsRollupService.get_stats(user)
+        status_counts = rollup.status_counts if rollup else {}
+        total_applications = sum(status_counts.values())
 
         if total_applications == 0:
             return {
@@ -41,75 +63,99 @@ class MetricsService:
             }
 
         # Count applications by status
-        responded = applications.exclude(status__in=['applied', 'ghosted']).count()
-        interviewed = applications.filter(status='interviewed').count()
-        ghosted = applications.filter(status='ghosted').count()
+        applied = status_counts.get('applied', 0)
+        responded = total_applications - applied
+        interviewed = sum(status_counts.get(status, 0) for status in JobApplication.INTERVIEW_STATUSES)
+        applications = JobApplication.objects.filter(user=user)
+        # Only the recent applications are read: the rest of 'applied' is ghosted
+        ghosted = applied - applications.filter(
+            status='applied',
+            application_date__gt=timezone.now() - timedelta(days=JobApplication.GHOSTED_AFTER_DAYS),
+        ).count()
 
         # Calculate rates
         response_rate = round((responded / total_applications) * 100, 2)
         interview_rate = round((interviewed / total_applications) * 100, 2)
         ghosted_rate = round((ghosted / total_applications) * 100, 2)
 
-        # Calculate average response time
-        responded_apps = applications.exclude(
-            status__in=['applied', 'ghosted']
-        ).exclude(updated_at=None)
-        total_days = 0
-        count = 0
-        for app in responded_apps:
-            days = (app.updated_at - app.created_at).days
-            if days >= 0:  # Only count positive days
-                total_days += days
-                count += 1
-        avg_response_time = round(total_days / count if count > 0 else 0.0, 2)
-
-        # Calculate company response rates
-        company_stats = defaultdict(lambda: {'total': 0, 'responded': 0})
-        for app in applications:
-            company = app.company_name
-            company_stats[company]['total'] += 1
-            if app.status not in ['applied', 'ghosted']:
-                company_stats[company]['responded'] += 1
-
-        # Convert to response rates and sort
-        company_rates = {
-            company: {
-                'response_rate': round((stats['responded'] / stats['total']) * 100, 2),
-                'total_applications': stats['total']
-            }
-            for company, stats in company_stats.items()
-            if stats['total'] >= 2  # Only consider companies with at least 2 applications
-        }
-        sorted_companies = sorted(
-            company_rates.items(),
-            key=lambda x: x[1]['response_rate'],
-            reverse=True
-        )
-
-        # Get top 3 and bottom 3 companies
-        best_companies = dict(sorted_companies[:3]) if sorted_companies else {}
-        worst_companies = dict(sorted_companies[-3:]) if sorted_companies else {}
+        best_companies, worst_companies = MetricsService._rank_companies(applications)
 
         metrics = {
             'total_applications': total_applications,
             'response_rate': response_rate,
             'interview_rate': interview_rate,
             'ghosted_rate': ghosted_rate,
-            'avg_response_time': avg_response_time,
+            'avg_response_time': MetricsService._average_response_days(applications),
             'best_companies': best_companies,
             'worst_companies': worst_companies
         }
 
-        # Store metrics in database
-        ApplicationMetrics.objects.create(
-            user=user,
-            total_applications=total_applications,
-            response_rate=response_rate,
-            interview_rate=interview_rate,
-            ghosted_rate=ghosted_rate,
-            avg_response_time=avg_response_time,
-            best_companies=best_companies,
-            worst_companies=worst_companies
+        MetricsService.store_snapshot(user, metrics)
+        return metrics
+
+    @staticmethod
+    def store_snapshot(user, metrics: dict) -> Optional[ApplicationMetrics]:
+        """Store ``metrics`` as the user's latest snapshot if they changed.
+
+        Nothing is stored when the metrics equal the latest snapshot, nor
+        within APPLICATION_METRICS_SNAPSHOT_INTERVAL seconds of it.
+
+        Args:
+            user: User the metrics belong to
+            metrics: Metrics as returned by ``calculate_metrics``
+
+        Returns:
+            Optional[ApplicationMetrics]: The new snapshot, or None if none was stored
+        """
+        latest = ApplicationMetrics.objects.filter(user=user).first()
+        if latest is not None:
+            if all(getattr(latest, field) == metrics[field] for field in SNAPSHOT_FIELDS):
+                return None
+            interval = getattr(settings, 'APPLICATION_METRICS_SNAPSHOT_INTERVAL', 0)
+            if interval and timezone.now() - latest.created_at < timedelta(seconds=interval):
+                return None
+        return ApplicationMetrics.objects.create(user=user, **{field: metrics[field] for field in SNAPSHOT_FIELDS})
+
+    @staticmethod
+    def _average_response_days(applications) -> float:
+        """Average days from applying to the last update of responded applications."""
+        average = (
+            applications.exclude(status='applied')
+            .filter(last_updated__gte=F('application_date'))
+            .aggregate(average=Avg(ExpressionWrapper(F('last_updated') - F('application_date'),
+                                                     output_field=DurationField())))
+        )['average']
+        return round(average / timedelta(days=1), 2) if average is not None else 0.0
+
+    @staticmethod
+    def _rank_companies(applications) -> tuple:
+        """Return the companies with the highest and the lowest response rates.
+
+        Only companies with MIN_COMPANY_APPLICATIONS or more applications are
+        ranked; both results are ordered from the highest rate down.
+
+        Returns:
+            tuple: (best_companies, worst_companies) dicts of company name to
+            its response rate and number of applications
+        """
+        companies = (
+            applications.values('company_name')
+            .annotate(
+                total=Count('id'),
+                responded=Count('id', filter=~Q(status='applied')),
+            )
+            .filter(total__gte=MIN_COMPANY_APPLICATIONS)
+            .annotate(rate=ExpressionWrapper(F('responded') * 100.0 / F('total'), output_field=FloatField()))
         )
+        best = companies.order_by('-rate', 'company_name')[:RANKED_COMPANIES]
+        worst = list(companies.order_by('rate', '-company_name')[:RANKED_COMPANIES])[::-1]
 
-        return metrics
+        def to_dict(rows) -> Dict[str, dict]:
+            return {
+                row['company_name']: {
+                    'response_rate': round(row['responded'] / row['total'] * 100, 2),
+                    'total_applications': row['total']
+                }
+                for row in rows
+            }
+        return to_dict(best), to_dict(worst)
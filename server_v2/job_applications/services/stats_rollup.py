@@ -0,0 +1,167 @@
+"""Service maintaining the per-user application statistics rollup.
+
+Each user's ``ApplicationStats`` row counts their applications per status.
+Every change to an
+application is applied to the row as a delta in the transaction making the
+change, so the rollup is never out of step with committed applications:
+
+- saves and deletes go through the handlers in signals.py;
+- bulk status changes go through ``JobApplication.objects.update_status()``,
+  which counts the affected rows before updating them.
+
+``bulk_create``, raw SQL and ``update()`` calls changing user or status
+bypass both; ``rebuild`` (the rebuild_application_stats
+command) recomputes rows from the applications.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count
+
+from job_applications.models import ApplicationStats, JobApplication
+from job_applications.utils.stats_cache import stats_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Change in the number of applications per status
+Deltas = Dict[str, int]
+
+
+class StatsRollupService:
+    """Service class for maintaining ApplicationStats rows."""
+
+    @staticmethod
+    def application_changed(before: Optional[tuple], after: Optional[tuple]) -> None:
+        """Apply one application's change to its owners' rollups.
+
+        Args:
+            before: ``JobApplication.rollup_state()`` before the change, or
+                None for a new application
+            after: The state after the change, or None for a deletion
+        """
+        if before == after:
+            return
+        deltas: Dict[int, Counter] = defaultdict(Counter)
+        if before is not None:
+            user_id, status = before
+            deltas[user_id][status] -= 1
+        if after is not None:
+            user_id, status = after
+            deltas[user_id][status] += 1
+        for user_id, user_deltas in deltas.items():
+            # Removing the last application must not create a row, nor fail
+            # when the row goes with its user in a cascading delete
+            StatsRollupService.apply(user_id, user_deltas, create=after is not None and after[0] == user_id)
+
+    @staticmethod
+    def apply(user_id: int, deltas: Deltas, create: bool = True) -> None:
+        """Add ``deltas`` to the user's rollup, under a row lock.
+
+        Args:
+            user_id: Primary key of the user
+            deltas: Change in applications per status
+            create: Create the row if the user has none; otherwise a missing
+                row is left missing
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        # No savepoint: a failure here must roll back the change being counted
+        with transaction.atomic(savepoint=False):
+            rows = ApplicationStats.objects.select_for_update()
+            if create:
+                stats, _ = rows.get_or_create(user_id=user_id)
+            else:
+                stats = rows.filter(user_id=user_id).first()
+                if stats is None:
+                    return
+            for status, delta in deltas.items():
+                StatsRollupService._add(stats.status_counts, status, delta)
+            stats.save()
+
+    @staticmethod
+    def update_status(queryset, status: str) -> int:
+        """Set the status of the applications in ``queryset``, updating rollups.
+
+        Args:
+            queryset: JobApplication queryset
+            status: New status
+
+        Returns:
+            int: Number of applications updated
+        """
+        with transaction.atomic(using=queryset.db):
+            # Lock the rows changing, so the deltas match what the update changes
+            changing = queryset.exclude(status=status).select_for_update().values_list('user_id', 'status')
+            deltas: Dict[int, Counter] = defaultdict(Counter)
+            for user_id, old_status in changing:
+                deltas[user_id][old_status] -= 1
+                deltas[user_id][status] += 1
+
+            updated = queryset.update(status=status)
+            for user_id, user_deltas in deltas.items():
+                StatsRollupService.apply(user_id, user_deltas)
+                StatsRollupService._invalidate_on_commit(user_id)
+        return updated
+
+    @staticmethod
+    def rebuild(user_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute rollups from the applications.
+
+        Args:
+            user_ids: Users to rebuild, or None for every user with
+                applications or a rollup
+
+        Returns:
+            int: Number of rollups written
+        """
+        applications = JobApplication.objects.all()
+        rollups = ApplicationStats.objects.all()
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            applications = applications.filter(user_id__in=user_ids)
+            rollups = rollups.filter(user_id__in=user_ids)
+
+        with transaction.atomic():
+            rows = applications.values('user_id', 'status').annotate(count=Count('id')).order_by()
+            status_counts: Dict[int, Dict[str, int]] = defaultdict(dict)
+            for row in rows:
+                StatsRollupService._add(status_counts[row['user_id']], row['status'], row['count'])
+
+            # Users whose applications are all gone lose their row
+            emptied = rollups.exclude(user_id__in=list(status_counts))
+            emptied_ids = list(emptied.values_list('user_id', flat=True))
+            emptied.delete()
+            for user_id, counts in status_counts.items():
+                ApplicationStats.objects.update_or_create(
+                    user_id=user_id,
+                    defaults={'status_counts': counts},
+                )
+
+        for user_id in [*status_counts, *emptied_ids]:
+            StatsRollupService._invalidate_on_commit(user_id)
+        logger.info("Rebuilt application statistics of %d user(s)", len(status_counts))
+        return len(status_counts)
+
+    @staticmethod
+    def get_stats(user) -> Optional[ApplicationStats]:
+        """Return the user's rollup, or None if they have no applications."""
+        return ApplicationStats.objects.filter(user=user).first()
+
+    @staticmethod
+    def _invalidate_on_commit(user_id: int) -> None:
+        """Make the user's cached statistics stale once the transaction commits."""
+        transaction.on_commit(lambda: stats_cache.invalidate(user_id))
+
+    @staticmethod
+    def _add(counts: Dict[str, int], status: str, delta: int) -> None:
+        """Add ``delta`` to ``counts[status]``, dropping the status at zero."""
+        count = counts.get(status, 0) + delta
+        if count:
+            counts[status] = count
+        else:
+            counts.pop(status, None)
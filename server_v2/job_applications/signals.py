@@ -0,0 +1,46 @@
+"""Signal handlers for job applications."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import JobApplication
+from .services.stats_rollup import StatsRollupService
+from .utils.stats_cache import stats_cache
+
+
+@receiver(pre_save, sender=JobApplication, dispatch_uid='job_applications_rollup_state')
+def remember_rollup_state(sender, instance, raw, **kwargs):
+    """Read the stored state of an existing application not loaded from the database."""
+    if raw or instance.pk is None or getattr(instance, '_rollup_state', None) is not None:
+        return
+    instance._rollup_state = (
+        sender._base_manager.using(kwargs['using']).filter(pk=instance.pk)
+        .values_list('user_id', 'status').first()
+    )
+
+
+@receiver(post_save, sender=JobApplication, dispatch_uid='job_applications_rollup_on_save')
+def update_rollup_on_save(sender, instance, created, raw, **kwargs):
+    """Apply a created or changed application to its owner's statistics rollup."""
+    if raw:
+        return
+    state = instance.rollup_state()
+    StatsRollupService.application_changed(getattr(instance, '_rollup_state', None), state)
+    instance._rollup_state = state
+
+
+@receiver(post_delete, sender=JobApplication, dispatch_uid='job_applications_rollup_on_delete')
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Remove a deleted application from its owner's statistics rollup."""
+    state = getattr(instance, '_rollup_state', None) or instance.rollup_state()
+    StatsRollupService.application_changed(state, None)
+    instance._rollup_state = None
+
+
+@receiver(post_save, sender=JobApplication, dispatch_uid='job_applications_stats_on_save')
+@receiver(post_delete, sender=JobApplication, dispatch_uid='job_applications_stats_on_delete')
+def invalidate_application_stats(sender, instance, **kwargs):
+    """Make the owner's cached statistics stale once the change is committed."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: stats_cache.invalidate(user_id))
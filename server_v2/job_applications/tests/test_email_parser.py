@@ -1,5 +1,10 @@
 """Tests for email parsing functionality."""
+import re
+import time
 import unittest
+from unittest.mock import patch
+
+from gmail.parse_cache import ParseCache
 from ..utils.email_parser import EmailParser
 from .data.sample_emails import (
     SAMPLE_HTML_EMAIL,
@@ -91,3 +96,128 @@ class TestEmailParser(unittest.TestCase):
 
 if __name__ == '__main__':
     unittest.main()
+
+
+class TestEmailParserHtml(unittest.TestCase):
+    """Test cases for HTML handling in EmailParser."""
+
+    def test_email_addresses_are_not_html(self):
+        """Test angle-bracketed addresses survive instead of being stripped as tags."""
+        result = EmailParser().parse_email('Position: Data Engineer\nCompany: Acme <jobs@acme.com>')
+        self.assertEqual(result['company_name'], 'Acme <jobs@acme.com>')
+
+    def test_html_body(self):
+        """Test HTML bodies are reduced to their visible text."""
+        result = EmailParser().parse_email(
+            '<div style="display:none">Company: Hidden</div><p>Position: Data Engineer</p>'
+            '<p>Company: Globex</p>')
+        self.assertEqual(result['position'], 'Data Engineer')
+        self.assertEqual(result['company_name'], 'Globex')
+
+
+class TestEmailParserBacktracking(unittest.TestCase):
+    """Test cases for parse time on adversarial input."""
+
+    ORIGINAL_PATTERNS = [
+        r'(?i)position.*?(?:for|of)\s+([^:\n,]+)',
+        r'(?i)applying for.*?position.*?of\s+([^:\n,]+)',
+        r'(?i)job.*?at\s+([^:\n,]+)',
+    ]
+
+    def test_anchored_patterns_match_originals(self):
+        """Test the anchored patterns extract what the unanchored ones did."""
+        parser = EmailParser()
+        rewritten = parser.patterns['position'][3:] + parser.patterns['company_name'][4:]
+        texts = [
+            SAMPLE_PLAIN_TEXT_EMAIL, SAMPLE_HTML_EMAIL, SAMPLE_MINIMAL_EMAIL,
+            'We reviewed your application for the position of Data Engineer',
+            'Thank you for applying for the open position: list of Backend Developer',
+            'the job posting\nyour new job at Acme Corp, Berlin',
+            'position position job for\nPosition of at Globex\njob job at at Initech',
+            'nothing to see here',
+        ]
+        for text in texts:
+            for original, pattern in zip(self.ORIGINAL_PATTERNS, rewritten):
+                with self.subTest(text=text[:30], pattern=original):
+                    match, expected = re.search(pattern, text), re.search(original, text)
+                    self.assertEqual(match and match.group(1), expected and expected.group(1))
+
+    def test_keyword_dense_text(self):
+        """Test a long line full of keywords but no match parses quickly."""
+        parser = EmailParser()
+        started = time.perf_counter()
+        with patch.object(EmailParser, 'cache', None):
+            result = parser.parse_email('applying for position job at data ' * 1000)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertTrue(result['company_name'].startswith('data applying for'))
+
+
+class TestEmailParserQuotedText(unittest.TestCase):
+    """Test cases for quoted reply removal in EmailParser."""
+
+    def test_quoted_history_is_ignored(self):
+        """Test details in the quoted history do not override the reply."""
+        body = ('Thanks for applying!\nCompany: Globex\n\n'
+                'On Mon, Jan 1, 2024 Jane wrote:\nPosition: Old Role\nCompany: Initech')
+        with patch.object(EmailParser, 'cache', None):
+            result = EmailParser().parse_email(body, 'Application received')
+        self.assertEqual(result['company_name'], 'Globex')
+        self.assertEqual(result['position'], '')
+
+
+class TestEmailParserSubject(unittest.TestCase):
+    """Test cases for reading the position from the subject line."""
+
+    def test_position_from_subject(self):
+        """Test the title keyword starts the position, or a seniority word shortly before it."""
+        subjects = {
+            'Interview: Backend Developer, Remote': 'Developer',
+            'Your application - Senior Data Engineer': 'Senior Data Engineer',
+            'Sr. Product Manager role': 'Sr. Product Manager role',
+            'Senior leadership update for the Engineering team': 'Engineering team',
+            'Thanks for applying': '',
+        }
+        with patch.object(EmailParser, 'cache', None):
+            for subject, position in subjects.items():
+                with self.subTest(subject=subject):
+                    self.assertEqual(EmailParser().parse_email('Hello', subject)['position'], position)
+
+
+class TestEmailParserCache(unittest.TestCase):
+    """Test cases for EmailParser result caching."""
+
+    def test_line_endings_share_a_cache_entry(self):
+        """Test bodies differing only in line endings parse once."""
+        cache = ParseCache(cache_alias=None)
+        with patch.object(EmailParser, 'cache', cache):
+            unix = EmailParser().parse_email(SAMPLE_PLAIN_TEXT_EMAIL, 'Application')
+            windows = EmailParser().parse_email(SAMPLE_PLAIN_TEXT_EMAIL.replace('\n', '\r\n'), 'Application')
+        self.assertEqual(unix, windows)
+        self.assertEqual(cache.stats()['hits'], 1)
+        with patch.object(EmailParser, 'cache', None):
+            self.assertEqual(EmailParser().parse_email(SAMPLE_PLAIN_TEXT_EMAIL.replace('\n', '\r\n'), 'Application'),
+                             unix)
+
+
+class TestEmailParserBatch(unittest.TestCase):
+    """Test cases for EmailParser.parse_batch."""
+
+    def test_parse_batch(self):
+        """Test batch parsing matches parsing one email at a time."""
+        emails = [
+            {'body': body, 'subject': 'Job Application'}
+            for body in (SAMPLE_PLAIN_TEXT_EMAIL, SAMPLE_HTML_EMAIL, SAMPLE_MINIMAL_EMAIL) * 4
+        ]
+        results = list(EmailParser.parse_batch(emails, workers=2, chunk_size=5))
+        parser = EmailParser()
+        self.assertEqual([result.index for result in results], list(range(12)))
+        for email, result in zip(emails, results):
+            self.assertIsNone(result.error)
+            self.assertEqual(result.value, parser.parse_email(email['body'], email['subject']))
+
+    def test_parse_batch_isolates_failures(self):
+        """Test a malformed email does not fail the batch."""
+        results = list(EmailParser.parse_batch([{'body': SAMPLE_MINIMAL_EMAIL}, None], workers=1))
+        self.assertEqual(results[0].value['company_name'], 'StartUp Tech')
+        self.assertIsNone(results[1].value)
+        self.assertIsNotNone(results[1].error)
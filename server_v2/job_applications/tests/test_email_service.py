@@ -57,7 +57,7 @@ class EmailServiceTests(TestCase):
         self.assertIn(self.application.applicant_name, content)
         self.assertIn(self.application.created_at.strftime('%B %d, %Y'), content)
 
-    @patch('job_applications.services.email_service.build')
+    @patch('job_applications.services.email_service.get_gmail_service')
     def test_send_via_gmail_api_success(self, mock_build):
         """Test successful email sending via Gmail API."""
         # Mock Gmail API service
@@ -87,7 +87,7 @@ class EmailServiceTests(TestCase):
         self.assertEqual(args['userId'], 'me')
         self.assertIn('raw', args['body'])
 
-    @patch('job_applications.services.email_service.build')
+    @patch('job_applications.services.email_service.get_gmail_service')
     def test_send_via_gmail_api_failure(self, mock_build):
         """Test Gmail API failure handling."""
         # Mock Gmail API service to raise exception
@@ -0,0 +1,107 @@
+"""Test cases for JobTracker application statistics."""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from backend.testing import LOCMEM_CACHES
+from job_applications.models import JobApplication
+from job_applications.utils.job_tracker import JobTracker
+from job_applications.utils.stats_cache import stats_cache
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class JobTrackerStatsTests(TestCase):
+    """Test cases for JobTracker.get_application_stats."""
+
+    def setUp(self):
+        """Set up applications across statuses and date windows."""
+        patcher = patch.object(stats_cache, '_disabled_until', 0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+        self.user = User.objects.create_user(username='tracker', email='tracker@example.com', password='testpass123')
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        now = timezone.now()
+        for status, days_ago in [
+            ('applied', 0), ('applied', 40), ('interview_scheduled', 5), ('interviewing', 15),
+            ('offer_received', 25), ('rejected', 35), ('applied', 3),
+        ]:
+            JobApplication.objects.create(user=self.user, company_name='Acme', position='Engineer',
+                                          status=status, application_date=now - timedelta(days=days_ago))
+        JobApplication.objects.create(user=other, company_name='Acme', position='Engineer', status='rejected')
+        self.tracker = JobTracker(self.user)
+
+    def test_stats_queries_and_payload(self):
+        """Test the statistics take two queries, rollup and recent window, and have the expected payload."""
+        with self.assertNumQueries(2):
+            stats = self.tracker.get_application_stats()
+
+        self.assertEqual(stats, {
+            'total_applications': 7,
+            'applications_last_30_days': 5,
+            'applications_last_7_days': 3,
+            'status_breakdown': {
+                'applied': 3, 'interview_scheduled': 1, 'interviewing': 1, 'offer_received': 1, 'rejected': 1,
+            },
+            'recent_status_breakdown': {
+                'applied': 2, 'interview_scheduled': 1, 'interviewing': 1, 'offer_received': 1,
+            },
+            'interview_rate': 28.6,
+            'offer_rate': 14.3,
+            'response_rate': 57.1,
+            'ghosted_applications': 1,
+        })
+
+    def test_windows_are_exact_to_the_second(self):
+        """Test the windows and ghosted cut-off are exact times, not whole days."""
+        now = timezone.now()
+        for status, age in [('applied', timedelta(days=7) - timedelta(minutes=1)),
+                            ('applied', timedelta(days=30) - timedelta(minutes=1)),
+                            ('applied', timedelta(days=30, minutes=1))]:
+            JobApplication.objects.create(user=self.user, company_name='Initech', position='Engineer',
+                                          status=status, application_date=now - age)
+        stats = self.tracker.get_application_stats()
+        self.assertEqual(stats['applications_last_7_days'], 4)
+        self.assertEqual(stats['applications_last_30_days'], 7)
+        self.assertEqual(stats['ghosted_applications'], 2)
+
+    def test_no_applications(self):
+        """Test a user without applications gets zero rates."""
+        user = User.objects.create_user(username='new', email='new@example.com', password='testpass123')
+        stats = JobTracker(user).get_application_stats()
+        self.assertEqual(stats['total_applications'], 0)
+        self.assertEqual(stats['status_breakdown'], {})
+        self.assertEqual(stats['response_rate'], 0.0)
+
+    def test_stats_are_cached_until_applications_change(self):
+        """Test repeat reads hit the cache, and saves and deletes invalidate it."""
+        self.tracker.get_application_stats()
+        with self.assertNumQueries(0):
+            self.tracker.get_application_stats()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            application = JobApplication.objects.create(user=self.user, company_name='Globex',
+                                                        position='Analyst', status='offer_received')
+        with self.assertNumQueries(2):
+            self.assertEqual(self.tracker.get_application_stats()['status_breakdown']['offer_received'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            application.delete()
+        self.assertEqual(self.tracker.get_application_stats()['status_breakdown']['offer_received'], 1)
+
+    def test_other_users_changes_keep_the_cache(self):
+        """Test another user's changes do not invalidate this user's statistics."""
+        self.tracker.get_application_stats()
+        other = User.objects.get(username='other')
+        with self.captureOnCommitCallbacks(execute=True):
+            JobApplication.objects.create(user=other, company_name='Globex', position='Analyst')
+        with self.assertNumQueries(0):
+            self.tracker.get_application_stats()
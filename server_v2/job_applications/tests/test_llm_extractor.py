@@ -0,0 +1,194 @@
+"""Tests for the LLM fallback extractor."""
+import json
+import re
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from gmail.parse_cache import ParseCache
+from ..utils import llm_extractor
+from ..utils.email_parser import EmailParser
+from ..utils.llm_extractor import CircuitBreaker, LLMExtractor
+
+EMAIL = re.compile(r'<email id="([^"]*)">\n(.*?)\n</email>', re.S)
+
+
+class FakeCompletions:
+    """Transport answering prompts like a model, recording what it was sent."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url, headers, payload, timeout):
+        emails = EMAIL.findall(payload['messages'][-1]['content'])
+        with self._lock:
+            self.prompts.append([text for _, text in emails])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError('API unavailable')
+            results = [{'id': email_id, 'position': f'Role {text}', 'company_name': 'Acme'}
+                       for email_id, text in emails]
+            return {
+                'choices': [{'message': {'content': json.dumps({'results': results})}}],
+                'usage': {'prompt_tokens': 10 * len(emails), 'completion_tokens': 5 * len(emails)},
+            }
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_extractor(transport, **kwargs):
+    extractor = LLMExtractor('test-key', 'http://llm.test/v1', transport=transport, **kwargs)
+    extractor.cache = ParseCache(cache_alias=None)
+    return extractor
+
+
+class TestLLMExtractor(unittest.TestCase):
+    """Test cases for LLMExtractor."""
+
+    def test_emails_are_batched(self):
+        """Test emails are packed into prompts, deduplicated, with results in order."""
+        transport = FakeCompletions()
+        extractor = make_extractor(transport, batch_size=4, max_concurrency=1)
+        texts = [str(index) for index in range(10)] + ['3']
+
+        results = extractor.extract_many(texts)
+
+        self.assertEqual([result['position'] for result in results], [f'Role {text}' for text in texts])
+        self.assertEqual([len(prompt) for prompt in transport.prompts], [4, 4, 2])
+        self.assertEqual(extractor.stats.as_dict()['prompt_tokens'], 100)
+
+    def test_concurrency_is_bounded(self):
+        """Test no more than max_concurrency requests are in flight."""
+        transport = FakeCompletions(delay=0.05)
+        extractor = make_extractor(transport, batch_size=1, max_concurrency=2)
+        threads = [threading.Thread(target=extractor.extract_many, args=([f'{n}a', f'{n}b', f'{n}c'],))
+                   for n in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(transport.prompts), 9)
+        self.assertEqual(transport.max_in_flight, 2)
+
+    def test_results_are_cached(self):
+        """Test an email is only sent once."""
+        transport = FakeCompletions()
+        extractor = make_extractor(transport)
+        first = extractor.extract('Hello')
+        self.assertEqual(extractor.extract('Hello'), first)
+        self.assertEqual(len(transport.prompts), 1)
+        self.assertEqual(extractor.stats.as_dict()['cache_hits'], 1)
+
+    def test_failures_open_the_circuit(self):
+        """Test failed requests give empty, uncached results and open the breaker."""
+        transport = FakeCompletions(fail=True)
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+        extractor = make_extractor(transport, batch_size=1, max_concurrency=1, breaker=breaker)
+
+        results = extractor.extract_many(['a', 'b', 'c'])
+
+        self.assertEqual(results, [llm_extractor.empty_result()] * 3)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(len(transport.prompts), 2)
+        self.assertEqual(extractor.stats.as_dict()['rejected'], 1)
+
+        # After the reset timeout one trial request is made, and its success closes the breaker
+        now[0] = 31.0
+        transport.fail = False
+        self.assertEqual(extractor.extract('a')['company_name'], 'Acme')
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_unreadable_response(self):
+        """Test a malformed response gives empty results without opening the breaker."""
+        extractor = make_extractor(lambda *args: {'choices': [{'message': {'content': 'not json'}}]},
+                                   breaker=CircuitBreaker(failure_threshold=1))
+        self.assertEqual(extractor.extract('a'), llm_extractor.empty_result())
+        self.assertEqual(extractor.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(extractor.stats.as_dict()['failures'], 1)
+
+    def test_disabled_without_api_key(self):
+        """Test the fallback is off unless enabled and given an API key."""
+        with override_settings(USE_OPENAI_FALLBACK=True, OPENAI_API_KEY=None):
+            self.assertIsNone(llm_extractor.default_extractor())
+        with override_settings(USE_OPENAI_FALLBACK=False, OPENAI_API_KEY='key'):
+            self.assertIsNone(llm_extractor.default_extractor())
+        with override_settings(USE_OPENAI_FALLBACK=True, OPENAI_API_KEY='key'):
+            self.assertEqual(llm_extractor.default_extractor().api_key, 'key')
+
+
+class TestEmailParserFallback(unittest.TestCase):
+    """Test cases for the EmailParser LLM fallback."""
+
+    def setUp(self):
+        self.transport = FakeCompletions()
+        self.extractor = make_extractor(self.transport, batch_size=2, max_concurrency=2)
+        for name, value in (('cache', None), ('fallback_extractor', staticmethod(lambda: self.extractor))):
+            patcher = patch.object(EmailParser, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_fallback_only_when_regex_finds_nothing(self):
+        """Test the LLM is asked only about emails the patterns cannot read."""
+        parser = EmailParser()
+        self.assertEqual(parser.parse_email('Company: Globex', 'Hello')['company_name'], 'Globex')
+        self.assertEqual(self.transport.prompts, [])
+
+        result = parser.parse_email('We would love to talk', 'Hello')
+        self.assertEqual(result, {'position': 'Role Hello\nWe would love to talk', 'company_name': 'Acme'})
+
+    def test_fallback_reuses_the_regex_pass(self):
+        """Test an email the patterns miss goes through each stage only once."""
+        pipeline = EmailParser.pipeline()
+        pipeline.reset_stats()
+        self.addCleanup(pipeline.reset_stats)
+
+        result = EmailParser().parse_email('We would love to talk', 'Hello')
+
+        self.assertEqual(result['company_name'], 'Acme')
+        stats = pipeline.stats()
+        self.assertEqual({name: totals['runs'] for name, totals in stats.items()},
+                         dict.fromkeys(stats, 1))
+
+    def test_parse_batch_fallback_matches_once(self):
+        """Test batch results needing the fallback are not matched against the patterns again."""
+        pipeline = EmailParser.pipeline()
+        pipeline.reset_stats()
+        self.addCleanup(pipeline.reset_stats)
+
+        results = list(EmailParser.parse_batch([{'body': 'Note', 'subject': 'Hi'}], workers=1))
+
+        self.assertEqual(results[0].value['company_name'], 'Acme')
+        stats = pipeline.stats()
+        # A single worker parses in this process, so its pass is counted too
+        self.assertEqual(stats['extract']['runs'], 1)
+        self.assertEqual(stats['fallback']['runs'], 1)
+
+    def test_parse_batch_packs_fallback_emails(self):
+        """Test batch parsing sends the emails needing the fallback in shared prompts."""
+        emails = [{'body': f'Note {index}', 'subject': 'Hi'} for index in range(5)]
+        emails.insert(2, {'body': 'Company: Globex'})
+
+        results = list(EmailParser.parse_batch(emails, workers=1))
+
+        self.assertEqual([result.index for result in results], list(range(6)))
+        self.assertEqual(results[2].value['company_name'], 'Globex')
+        self.assertEqual([result.value['company_name'] for result in results], ['Acme'] * 2 + ['Globex'] + ['Acme'] * 3)
+        self.assertEqual(sorted(map(len, self.transport.prompts)), [1, 2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Test cases for job application list pagination."""
+
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from backend.testing import LOCMEM_CACHES
+from job_applications.models import JobApplication
+from job_applications.pagination import KeysetPagination
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cases for KeysetPagination."""
+
+    def setUp(self):
+        """Set up applications with repeated dates and companies."""
+        self.user = User.objects.create_user(username='pages', email='pages@example.com', password='testpass123')
+        now = timezone.now()
+        for index in range(11):
+            # Pairs of applications share a date, so the id has to break ties
+            JobApplication.objects.create(user=self.user, company_name=f'Company {index % 3}', position='Engineer',
+                                          application_date=now - timedelta(days=index // 2))
+        self.factory = APIRequestFactory()
+
+    def paginate(self, ordering, url='/applications/', page_size=4):
+        paginator = KeysetPagination()
+        paginator.page_size = page_size
+        queryset = JobApplication.objects.filter(user=self.user).order_by(*ordering)
+        page = paginator.paginate_queryset(queryset, Request(self.factory.get(url)))
+        return page, paginator
+
+    def walk(self, ordering, backwards=False):
+        """Return the ids of every page, following next (or previous) links."""
+        pages = []
+        page, paginator = self.paginate(ordering)
+        while True:
+            pages.append([application.pk for application in page])
+            link = paginator.get_next_link()
+            if link is None:
+                break
+            page, paginator = self.paginate(ordering, link)
+        if backwards:
+            pages = [pages[-1]]
+            while True:
+                link = paginator.get_previous_link()
+                if link is None:
+                    break
+                page, paginator = self.paginate(ordering, link)
+                pages.insert(0, [application.pk for application in page])
+        return pages
+
+    def test_pages_follow_the_ordering(self):
+        """Test walking forward visits every row once in (sort key, id) order."""
+        for ordering in [('-application_date', '-id'), ('company_name', 'id'), ('-company_name',)]:
+            with self.subTest(ordering=ordering):
+                pages = self.walk(ordering)
+                self.assertEqual([len(page) for page in pages], [4, 4, 3])
+                field = ordering[0].lstrip('-')
+                descending = ordering[0].startswith('-')
+                expected = list(JobApplication.objects.filter(user=self.user).order_by(
+                    *(f'-{name}' if descending else name for name in (field, 'id'))
+                ).values_list('id', flat=True))
+                self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_links_return_the_same_pages(self):
+        """Test walking back from the last page gives the pages walked forward."""
+        ordering = ('-application_date',)
+        self.assertEqual(self.walk(ordering, backwards=True), self.walk(ordering))
+
+    def test_first_and_last_page_links(self):
+        """Test the first page has no previous link and the last no next link."""
+        page, paginator = self.paginate(('-application_date',), page_size=20)
+        self.assertEqual(len(page), 11)
+        self.assertIsNone(paginator.get_next_link())
+        self.assertIsNone(paginator.get_previous_link())
+
+    def test_new_rows_do_not_shift_pages(self):
+        """Test rows added before the cursor do not repeat rows on the next page."""
+        first, paginator = self.paginate(('-application_date',))
+        JobApplication.objects.create(user=self.user, company_name='Newest', position='Engineer')
+        second, _ = self.paginate(('-application_date',), paginator.get_next_link())
+        self.assertFalse({a.pk for a in first} & {a.pk for a in second})
+        self.assertEqual(len(second), 4)
+
+    def test_cursor_is_opaque_and_signed(self):
+        """Test cursors do not expose their position and tampered ones are rejected."""
+        _, paginator = self.paginate(('-application_date',))
+        cursor = parse_qs(urlparse(paginator.get_next_link()).query)['cursor'][0]
+        self.assertNotIn('application_date', cursor)
+        with self.assertRaises(NotFound):
+            self.paginate(('-application_date',), f'/applications/?cursor={cursor[:-2]}xx')
+        with self.assertRaises(NotFound):
+            # A cursor for another sort field
+            self.paginate(('company_name',), f'/applications/?cursor={cursor}')
+
+    def test_unsupported_ordering(self):
+        """Test orderings a cursor cannot follow are rejected."""
+        with self.assertRaises(ValidationError):
+            self.paginate(('next_follow_up',))
+
+    def test_page_query_uses_the_index(self):
+        """Test a deep page is an index range scan, with no count or offset."""
+        _, paginator = self.paginate(('-application_date', '-id'))
+        with self.assertNumQueries(1) as queries:
+            self.paginate(('-application_date', '-id'), paginator.get_next_link())
+        sql = queries.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ApplicationListPaginationTests(TestCase):
+    """Test cases for the pagination modes of the applications list."""
+
+    def setUp(self):
+        """Set up an authenticated client and more than a page of applications."""
+        self.user = User.objects.create_user(username='lister', email='lister@example.com', password='testpass123')
+        for index in range(25):
+            JobApplication.objects.create(user=self.user, company_name=f'Company {index}', position='Engineer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('job-application-list')
+
+    def test_cursor_pagination_by_default(self):
+        """Test the list is cursor paginated, without a count."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIn('cursor=', response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_number_pagination_for_old_clients(self):
+        """Test a page parameter, or pagination=page, gives numbered pages with a count."""
+        for query in ['?page=2', '?pagination=page']:
+            with self.subTest(query=query):
+                response = self.client.get(self.url + query)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(self.client.get(self.url + '?page=2').data['results']), 5)
@@ -0,0 +1,115 @@
+"""Test cases for the supported sort orders of the applications list."""
+
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from backend.testing import LOCMEM_CACHES
+from job_applications.models import JobApplication
+from job_applications.pagination import Cursor, KeysetPagination
+
+User = get_user_model()
+
+
+def index_for(*fields) -> str:
+    """Return the name of the JobApplication index on exactly ``fields``, in either direction."""
+    for index in JobApplication._meta.indexes:
+        if [field.lstrip('-') for field in index.fields] == [field.lstrip('-') for field in fields]:
+            return index.name
+    raise AssertionError(f"No index on {fields}")
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Plans are checked on SQLite and PostgreSQL')
+class SortIndexPlanTests(TestCase):
+    """Test every supported ordering reads its index in order, without sorting."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up applications for two users."""
+        now = timezone.now()
+        for username in ('sorter', 'other'):
+            user = User.objects.create_user(username=username, email=f'{username}@example.com',
+                                            password='testpass123')
+            for index in range(30):
+                JobApplication.objects.create(
+                    user=user, company_name=f'Company {index % 7}', position=f'Engineer {index % 5}',
+                    status=JobApplication.STATUS_CHOICES[index % 3][0],
+                    application_date=now - timedelta(days=index),
+                )
+        cls.user = User.objects.get(username='sorter')
+
+    def setUp(self):
+        """Keep PostgreSQL from preferring sequential scans of the small test table."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Assert the plan of ``queryset`` reads ``index_name`` and sorts nothing."""
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        if connection.vendor == 'sqlite':
+            self.assertNotIn('TEMP B-TREE', plan)
+        else:
+            self.assertNotIn('Sort', plan)
+
+    def page_queries(self, queryset):
+        """Return the queries of a first and a later keyset page of ``queryset``."""
+        paginator = KeysetPagination()
+        paginator.page_size = 5
+        row = paginator.paginate_queryset(queryset, Request(APIRequestFactory().get('/')))[-1]
+        cursor = Cursor(getattr(row, paginator.field), row.pk, reverse=False)
+        return [paginator.page_queryset(queryset, position)[:paginator.page_size + 1]
+                for position in (None, cursor)]
+
+    def test_supported_orderings_use_their_index(self):
+        """Test each sort field, both directions, reads its (user, field, id) index."""
+        applications = JobApplication.objects.filter(user=self.user)
+        for field in JobApplication.SORT_FIELDS:
+            for sort in (field, f'-{field}'):
+                with self.subTest(sort=sort):
+                    tie_breaker = '-id' if sort.startswith('-') else 'id'
+                    queryset = applications.order_by(sort, tie_breaker)
+                    for query in self.page_queries(queryset):
+                        self.assertUsesIndex(query, index_for('user', field, 'id'))
+
+    def test_status_filter_uses_its_index(self):
+        """Test newest first within a status reads the (user, status, application_date, id) index."""
+        queryset = JobApplication.objects.filter(user=self.user, status='applied').order_by('-application_date', '-id')
+        for query in self.page_queries(queryset):
+            self.assertUsesIndex(query, index_for('user', 'status', 'application_date', 'id'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SortWhitelistTests(TestCase):
+    """Test cases for the sort parameter of the applications list."""
+
+    def setUp(self):
+        """Set up an authenticated client."""
+        self.user = User.objects.create_user(username='lister', email='lister@example.com', password='testpass123')
+        JobApplication.objects.create(user=self.user, company_name='Acme', position='Engineer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('job-application-list')
+
+    def test_supported_sorts(self):
+        """Test every supported sort, ascending and descending, is accepted."""
+        for field in JobApplication.SORT_FIELDS:
+            for sort in (field, f'-{field}'):
+                with self.subTest(sort=sort):
+                    self.assertEqual(self.client.get(self.url, {'sort': sort}).status_code, 200)
+
+    def test_unsupported_sorts_are_rejected(self):
+        """Test sorting by other columns, or relations, is a bad request."""
+        for sort in ('notes', '-next_follow_up', 'user__password', '?', '--status'):
+            with self.subTest(sort=sort):
+                response = self.client.get(self.url, {'sort': sort})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('sort', response.data['detail'])
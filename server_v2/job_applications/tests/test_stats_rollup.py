@@ -0,0 +1,136 @@
+"""Test cases for the per-user application statistics rollup."""
+
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from job_applications.admin import JobApplicationAdmin
+from job_applications.models import ApplicationStats, JobApplication
+from job_applications.services.stats_rollup import StatsRollupService
+
+User = get_user_model()
+
+
+class StatsRollupTests(TestCase):
+    """Test cases for keeping ApplicationStats in step with applications."""
+
+    def setUp(self):
+        """Set up a user with applications on two days."""
+        self.user = User.objects.create_user(username='rollup', email='rollup@example.com', password='testpass123')
+        self.now = timezone.now()
+        self.applications = [
+            self.create(status='applied'),
+            self.create(status='applied', days_ago=3),
+            self.create(status='rejected', days_ago=3),
+        ]
+
+    def create(self, status='applied', days_ago=0, user=None):
+        return JobApplication.objects.create(user=user or self.user, company_name='Acme', position='Engineer',
+                                             status=status, application_date=self.now - timedelta(days=days_ago))
+
+    def rollup(self, user=None):
+        return ApplicationStats.objects.get(user=user or self.user)
+
+    def assertMatchesRebuild(self):
+        """Assert the incrementally maintained rows equal freshly built ones."""
+        maintained = {stats.user_id: stats.status_counts for stats in ApplicationStats.objects.all()}
+        StatsRollupService.rebuild()
+        rebuilt = {stats.user_id: stats.status_counts for stats in ApplicationStats.objects.all()}
+        self.assertEqual(maintained, rebuilt)
+
+    def test_create(self):
+        """Test new applications are counted by status."""
+        stats = self.rollup()
+        self.assertEqual(stats.status_counts, {'applied': 2, 'rejected': 1})
+        self.assertEqual(stats.total, 3)
+        self.assertMatchesRebuild()
+
+    def test_status_and_date_change(self):
+        """Test a saved status change moves the application between statuses."""
+        application = JobApplication.objects.get(pk=self.applications[0].pk)
+        application.status = 'interviewing'
+        application.application_date = self.now - timedelta(days=3)
+        application.save()
+
+        stats = self.rollup()
+        self.assertEqual(stats.status_counts, {'applied': 1, 'interviewing': 1, 'rejected': 1})
+        self.assertMatchesRebuild()
+
+    def test_unrelated_change_leaves_rollup(self):
+        """Test saving without changing owner or status does not touch the rollup."""
+        application = JobApplication.objects.get(pk=self.applications[0].pk)
+        application.notes = 'Followed up'
+        application.application_date = self.now - timedelta(days=1)
+        with self.assertNumQueries(1):
+            application.save()
+
+    def test_save_of_unloaded_instance(self):
+        """Test saving an instance built by hand reads its stored state first."""
+        stored = self.applications[1]
+        JobApplication(pk=stored.pk, user=self.user, company_name='Acme', position='Engineer',
+                       status='accepted', application_date=stored.application_date).save()
+        self.assertEqual(self.rollup().status_counts, {'applied': 1, 'accepted': 1, 'rejected': 1})
+        self.assertMatchesRebuild()
+
+    def test_user_change(self):
+        """Test reassigning an application moves it to the new owner's rollup."""
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        application = self.applications[2]
+        application.user = other
+        application.save()
+        self.assertEqual(self.rollup().status_counts, {'applied': 2})
+        self.assertEqual(self.rollup(other).status_counts, {'rejected': 1})
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        """Test deleted applications, one by one or by queryset, are removed."""
+        self.applications[0].delete()
+        self.assertEqual(self.rollup().status_counts, {'applied': 1, 'rejected': 1})
+
+        JobApplication.objects.filter(user=self.user).delete()
+        self.assertEqual(self.rollup().status_counts, {})
+
+    def test_user_delete(self):
+        """Test deleting a user with applications cascades cleanly."""
+        self.user.delete()
+        self.assertFalse(ApplicationStats.objects.exists())
+
+    def test_update_status(self):
+        """Test bulk status updates keep the rollup in step."""
+        updated = JobApplication.objects.filter(user=self.user, status='applied').update_status('rejected')
+        self.assertEqual(updated, 2)
+        self.assertEqual(self.rollup().status_counts, {'rejected': 3})
+        self.assertMatchesRebuild()
+
+    def test_admin_actions(self):
+        """Test the admin bulk actions update the rollup."""
+        admin = JobApplicationAdmin(JobApplication, AdminSite())
+        admin.message_user = MagicMock()
+        admin.mark_as_accepted(None, JobApplication.objects.filter(pk=self.applications[0].pk))
+        admin.mark_as_interviewed(None, JobApplication.objects.filter(pk__in=[a.pk for a in self.applications[1:]]))
+        self.assertEqual(self.rollup().status_counts, {'accepted': 1, 'interviewing': 2})
+        self.assertMatchesRebuild()
+
+    def test_rebuild_command(self):
+        """Test the repair command rebuilds rollups bulk inserts bypassed."""
+        JobApplication.objects.bulk_create([
+            JobApplication(user=self.user, company_name='Globex', position='Analyst', status='withdrawn')
+        ])
+        self.assertNotIn('withdrawn', self.rollup().status_counts)
+
+        out = StringIO()
+        call_command('rebuild_application_stats', '--user', str(self.user.pk), stdout=out)
+        self.assertIn('1 user(s)', out.getvalue())
+        self.assertEqual(self.rollup().status_counts, {'applied': 2, 'rejected': 1, 'withdrawn': 1})
+
+    def test_rebuild_removes_rollups_without_applications(self):
+        """Test rebuilding drops the rows of users without applications."""
+        JobApplication.objects.filter(user=self.user)._raw_delete(JobApplication.objects.db)
+        StatsRollupService.rebuild()
+        self.assertFalse(ApplicationStats.objects.filter(user=self.user).exists())
@@ -1,12 +1,44 @@
 """Email parsing utilities."""
+import logging
+import os
 import re
-from typing import Dict, List, Optional
-from bs4 import BeautifulSoup
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from gmail import parallel
+from gmail.extraction import ExtractionContext, ExtractionPipeline, mean_score, pipeline_for
+from gmail.keywords import SENIORITY, TITLE, get_automaton
+from gmail.parse_cache import ParseCache, parse_cache
+from .llm_extractor import LLMExtractor, default_extractor
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Text allowed between a seniority word and the title it qualifies, as the
+# " Data " of "Senior Data Engineer": words, spaces and hyphens, after the
+# period of an abbreviation such as "Sr."
+_TITLE_WORDS = re.compile(r'\.?[\w\s-]*')
 
 
 class EmailParser:
     """Parse emails to extract job application information."""
     
+    # Bump whenever a change alters parse results, to invalidate cached ones
+    PARSER_VERSION = '4'
+
+    # Result cache consulted by parse_email; None disables caching
+    cache: Optional[ParseCache] = parse_cache
+
+    # Input caps keeping parse time bounded on huge emails (characters)
+    MAX_BODY_LENGTH = 1_000_000
+    MAX_TEXT_LENGTH = 100_000
+
+    # Extraction pipeline stages, overridable in EMAIL_EXTRACTION_PIPELINES
+    PIPELINE_NAME = 'job_applications'
+    STAGES = ['decode', 'html_to_text', 'strip_quotes', 'compose', 'normalize', 'extract', 'score', 'fallback']
+    # Fields score 1 when found and 0 when not, so the fallback stage only
+    # runs for emails where the patterns found nothing
+    CONFIDENCE_THRESHOLD = 0.5
+
     EMPTY_RESULT = {
         'applicant_name': '',
         'position': '',
@@ -17,25 +49,33 @@ class EmailParser:
     
     def __init__(self):
         """Initialize the email parser."""
+        # Patterns with a lazy '.*?' after a keyword only ever match from the
+        # first keyword on a line: a later one can only reach a subset of the
+        # same text. They are anchored there (^ plus atomic groups) so a failed
+        # search costs one scan per line instead of one per keyword occurrence,
+        # e.g. r'(?i)position.*?(?:for|of)\s+([^:\n,]+)' becomes the form below.
         self.patterns = {
             'position': [
                 r'Position:\s*([^:\n]+)',
                 r'Job Title:\s*([^:\n]+)',
                 r'Role:\s*([^:\n]+)',
-                r'(?i)position.*?(?:for|of)\s+([^:\n,]+)',
-                r'(?i)applying for.*?position.*?of\s+([^:\n,]+)'
+                r'(?im)^(?>[^\n]*?position).*?(?:for|of)\s+([^:\n,]+)',
+                r'(?im)^(?>[^\n]*?applying for)(?>.*?position).*?of\s+([^:\n,]+)'
             ],
             'company_name': [
                 r'Company:\s*([^:\n]+)',
                 r'Organization:\s*([^:\n]+)',
                 r'(?i)position at\s+([^:\n,]+)',
                 r'(?i)role at\s+([^:\n,]+)',
-                r'(?i)job.*?at\s+([^:\n,]+)'
+                r'(?im)^(?>[^\n]*?job).*?at\s+([^:\n,]+)'
             ]
         }
     
     def parse_email(self, email_body: str, email_subject: str = '') -> dict:
         """Parse email content for job details.
+
+        When the patterns find nothing and the LLM fallback is enabled, the
+        email is sent to the LLM extractor.
         
         Args:
             email_body: The body of the email
@@ -44,25 +84,102 @@ class EmailParser:
         Returns:
             dict: Extracted job details
         """
-        # Clean and combine text
-        text = email_body or ''
-        if email_subject:
-            text = f"{email_subject}\n\n{text}"
-            
-        # Remove HTML tags if present
-        if '<' in text and '>' in text:
-            soup = BeautifulSoup(text, 'html.parser')
-            text = soup.get_text()
-        
-        # Fix common formatting issues
-        text = text.replace('\r\n', '\n')
-        text = text.replace('\r', '\n')
-        
-        # Normalize whitespace
-        lines = text.split('\n')
-        lines = [re.sub(r'\s+', ' ', line.strip()) for line in lines]
-        text = '\n'.join(line for line in lines if line)
-        
+        contexts: List[ExtractionContext] = []
+        details = self._parse_regex(email_body, email_subject, contexts)
+        if not any(details.values()) and self.fallback_extractor() is not None:
+            # Finish the regex pass's context, unless the result came from the cache
+            context = contexts[0] if contexts else self._regex_context(email_body, email_subject)
+            self.pipeline().resume([context], {'fallback'})
+            details = context.values
+        return details
+
+    @staticmethod
+    def fallback_extractor() -> Optional[LLMExtractor]:
+        """Return the LLM extractor used when regex extraction finds nothing, if enabled."""
+        return default_extractor()
+
+    @classmethod
+    def pipeline(cls) -> ExtractionPipeline:
+        """Return the extraction pipeline of this parser class."""
+        return pipeline_for(cls)
+
+    @classmethod
+    def stage_options(cls) -> Dict[str, Dict]:
+        """Return the options of each pipeline stage for this parser.
+
+        Returns:
+            Dict[str, Dict]: Keyword arguments per stage name
+        """
+        parser = cls()
+        return {
+            'decode': {'max_length': cls.MAX_BODY_LENGTH},
+            'compose': {'headers': (('subject', ''),), 'separator': '\n\n', 'skip_empty': True},
+            'normalize': {'collapse_whitespace': True, 'max_length': cls.MAX_TEXT_LENGTH},
+            'extract': {'extract': parser._extract_fields},
+            'score': {'score': mean_score},
+            'fallback': {'get_extractor': lambda: cls.fallback_extractor()},
+        }
+
+    @staticmethod
+    def _email(email_body: str, email_subject: str = '') -> Dict:
+        """Return the email dictionary the pipeline takes."""
+        return {'body': email_body or '', 'subject': email_subject or ''}
+
+    def _parse_regex(self, email_body: str, email_subject: str = '',
+                     contexts: Optional[List[ExtractionContext]] = None) -> dict:
+        """Parse with the regex patterns only, through the result cache.
+
+        Args:
+            email_body: The body of the email
+            email_subject: The email subject line
+            contexts: List receiving the pipeline context when the email is
+                actually parsed rather than read from the cache
+        """
+        def parse() -> dict:
+            context = self._regex_context(email_body, email_subject)
+            if contexts is not None:
+                contexts.append(context)
+            return context.values
+
+        if self.cache is None:
+            return parse()
+        return self.cache.get_or_parse(
+            f'{type(self).__module__}.{type(self).__qualname__}:{self.PARSER_VERSION}:{get_automaton().fingerprint}'
+            f':{self.pipeline().fingerprint}',
+            self._cache_key_parts(email_body, email_subject),
+            parse,
+        )
+
+    @staticmethod
+    def _cache_key_parts(email_body: str, email_subject: str = '') -> tuple:
+        """Return the content a parse result depends on, for the cache key.
+
+        Line endings in the body are normalised, as parsing does the same.
+        """
+        body = (email_body or '').replace('\r\n', '\n').replace('\r', '\n')
+        return (email_subject or '', body)
+
+    def _prepare_text(self, email_body: str, email_subject: str = '') -> str:
+        """Reduce an email to the normalised text the extraction reads."""
+        return self.pipeline().prepare(self._email(email_body, email_subject)).text
+
+    def _parse_email(self, email_body: str, email_subject: str = '') -> dict:
+        """Parse email content for job details, without consulting the cache or the LLM."""
+        return self._regex_context(email_body, email_subject).values
+
+    def _regex_context(self, email_body: str, email_subject: str = '') -> ExtractionContext:
+        """Run the pipeline without its fallback stage, returning the context."""
+        context = self.pipeline().run(self._email(email_body, email_subject), skip={'fallback'})
+        removed = context.bytes_removed('strip_quotes')
+        if removed:
+            logger.debug("Stripped %d bytes of quoted text", removed)
+        return context
+
+    def _extract_fields(self, context: ExtractionContext) -> Dict[str, Tuple[str, float]]:
+        """Extract stage: match the patterns against the prepared text."""
+        text = context.text
+        email_subject = context.email.get('subject', '')
+
         # Extract information
         details = {
             'position': '',
@@ -79,13 +196,120 @@ class EmailParser:
         
         # If no position found in patterns, try to extract from subject
         if not details['position'] and email_subject:
-            # Common position keywords
-            keywords = ['Engineer', 'Developer', 'Manager', 'Analyst', 'Designer']
-            for keyword in keywords:
-                if keyword.lower() in email_subject.lower():
-                    position = re.search(fr'.*?({keyword}[^\n,]*)', email_subject, re.I)
-                    if position:
-                        details['position'] = position.group(1).strip()
-                        break
+            details['position'] = self._position_from_subject(email_subject)
         
-        return details
+        return {field: (value, 1.0 if value else 0.0) for field, value in details.items()}
+
+    @staticmethod
+    def _position_from_subject(email_subject: str) -> str:
+        """Find a job title in the subject line, from its seniority word if any.
+
+        The title runs from the first title keyword (e.g. "Engineer") to the
+        next comma or line end; a seniority word a few words before it
+        ("Senior Data Engineer") starts it instead.
+        """
+        keywords = get_automaton()
+        title = keywords.first(email_subject, TITLE)
+        if title is None:
+            return ''
+
+        start = title.start
+        for hit in keywords.find(email_subject[:title.start], (SENIORITY,)):
+            between = email_subject[hit.end:title.start]
+            if _TITLE_WORDS.fullmatch(between) and len(between.split()) <= 3:
+                start = min(start, hit.start)
+
+        end = len(email_subject)
+        for separator in (',', '\n'):
+            position = email_subject.find(separator, title.end)
+            if position != -1:
+                end = min(end, position)
+        return email_subject[start:end].strip()
+
+    @classmethod
+    def parse_batch(
+        cls,
+        emails: Iterable[Dict],
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        ordered: bool = True,
+    ) -> Iterator[parallel.ParseResult]:
+        """Parse many emails on a process pool, streaming the results.
+
+        Args:
+            emails: Dictionaries with the email 'body' and optional 'subject'
+            workers: Worker processes; defaults to the number of CPUs
+            chunk_size: Emails sent to a worker at a time
+            ordered: Yield results in input order rather than as completed
+
+        Returns:
+            Iterator[ParseResult]: Index, job details or error message per email
+        """
+        extractor = cls.fallback_extractor()
+        if extractor is None:
+            return parallel.parse_batch(cls, emails, workers, chunk_size, ordered)
+
+        # Keep each email until its result is out, for the LLM fallback
+        unresolved: Dict[int, Dict] = {}
+
+        def remember(items: Iterable[Dict]) -> Iterator[Dict]:
+            for index, email in enumerate(items):
+                unresolved[index] = email
+                yield email
+
+        # Size chunks from the input, which the wrapper below hides
+        chunk_size = chunk_size or parallel.default_chunk_size(emails, workers or os.cpu_count() or 1)
+        results = parallel.parse_batch(cls, remember(emails), workers, chunk_size, ordered)
+        return cls._with_fallback(results, unresolved, extractor)
+
+    @classmethod
+    def _with_fallback(
+        cls,
+        results: Iterable[parallel.ParseResult],
+        emails: Dict[int, Dict],
+        extractor: LLMExtractor,
+    ) -> Iterator[parallel.ParseResult]:
+        """Fill empty batch results from the LLM, a few prompts' worth at a time.
+
+        Results are held back from the first one needing the fallback until
+        enough have collected to fill ``max_concurrency`` prompts, so the
+        pipeline's fallback stage can send full, concurrent batches.
+        """
+        pipeline = cls.pipeline()
+        window = extractor.batch_size * extractor.max_concurrency
+        held: List[parallel.ParseResult] = []
+        empty: List[int] = []
+
+        def flush() -> Iterator[parallel.ParseResult]:
+            # The workers already ran the patterns: rebuild only the text and
+            # their (empty) fields, then run the fallback stage alone
+            contexts = []
+            for position in empty:
+                email = emails[held[position].index]
+                context = pipeline.prepare(cls._email(email.get('body', ''), email.get('subject', '')))
+                context.fields = {field: (value, 0.0) for field, value in held[position].value.items()}
+                contexts.append(context)
+            pipeline.resume(contexts, {'fallback'})
+            for position, context in zip(empty, contexts):
+                held[position] = held[position]._replace(value=context.values)
+            for result in held:
+                emails.pop(result.index, None)
+            yield from held
+            held.clear()
+            empty.clear()
+
+        for result in results:
+            if result.error is None and not any(result.value.values()):
+                empty.append(len(held))
+            elif not empty:
+                emails.pop(result.index, None)
+                yield result
+                continue
+            held.append(result)
+            if len(empty) >= window:
+                yield from flush()
+        yield from flush()
+
+    def _parse_item(self, email: Dict) -> dict:
+        """Parse one email of a batch; the LLM fallback runs in the calling process."""
+        return self._parse_regex(email.get('body', ''), email.get('subject', ''))
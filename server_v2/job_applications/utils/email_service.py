@@ -6,10 +6,12 @@ This module provides functionality for sending emails related to job application
 import logging
 from django.conf import settings
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from email.mime.text import MIMEText
 import base64
 
+from gmail.retry import default_policy
+from gmail.service_cache import get_gmail_service
+
 logger = logging.getLogger(__name__)
 
 class EmailService:
@@ -30,7 +32,7 @@ class EmailService:
                 client_secret=credentials_dict.get('client_secret'),
                 scopes=credentials_dict.get('scopes')
             )
-            return build('gmail', 'v1', credentials=credentials)
+            return get_gmail_service(credentials)
         except Exception as e:
             logger.error(f"Error creating Gmail service: {str(e)}")
             raise
@@ -55,11 +57,12 @@ class EmailService:
             raw = base64.urlsafe_b64encode(message.as_bytes())
             raw = raw.decode()
             
-            # Send message
-            service.users().messages().send(
+            # Send message; only retried if Gmail rejected it outright
+            request = service.users().messages().send(
                 userId='me',
                 body={'raw': raw}
-            ).execute()
+            )
+            default_policy.call(request.execute, idempotent=False)
 
             return {
                 'success': True,
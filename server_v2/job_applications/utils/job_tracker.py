@@ -3,7 +3,9 @@
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db.models import Count, Q
-from ..models import JobApplication
+from ..models import ApplicationStats, JobApplication
+from ..services.stats_rollup import StatsRollupService
+from .stats_cache import stats_cache
 
 class JobTracker:
     """Class for tracking job applications."""
@@ -18,50 +20,64 @@ class JobTracker:
 
     def get_application_stats(self):
         """Get statistics for the user's job applications.
+
+        Statistics are cached per user until one of the user's applications
+        changes; see utils.stats_cache.
         
         Returns:
             dict: Dictionary containing application statistics.
         """
+        return stats_cache.get_or_compute(self.user.pk, self._compute_application_stats)
+
+    def _compute_application_stats(self):
+        """Compute the application statistics from the user's rollup.
+
+        Totals per status come from the user's ApplicationStats row, so they
+        cost one query whatever the number of applications. The 30- and
+        7-day windows are counted to the second by a second query, which
+        only reads the last 30 days of applications.
+
+        Returns:
+            dict: Dictionary containing application statistics.
+        """
+        rollup = StatsRollupService.get_stats(self.user) or ApplicationStats(user=self.user)
+        status_breakdown = dict(sorted(rollup.status_counts.items()))
+        total_applications = sum(status_breakdown.values())
+
         today = timezone.now()
         thirty_days_ago = today - timedelta(days=30)
         seven_days_ago = today - timedelta(days=7)
-        
-        # Get all applications for the user
-        applications = JobApplication.objects.filter(user=self.user)
-        total_applications = applications.count()
-        
-        # Get recent applications
-        recent_applications = applications.filter(application_date__gte=thirty_days_ago)
+        rows = list(
+            JobApplication.objects.filter(user=self.user, application_date__gte=thirty_days_ago)
+            .values('status')
+            .annotate(
+                last_30_days=Count('id'),
+                last_7_days=Count('id', filter=Q(application_date__gte=seven_days_ago)),
+                # Applied exactly thirty days ago is in the window and also ghosted
+                not_ghosted=Count('id', filter=Q(status='applied', application_date__gt=thirty_days_ago)),
+            )
+            .order_by('status')
+        )
         
         # Calculate statistics
         stats = {
             'total_applications': total_applications,
-            'applications_last_30_days': recent_applications.count(),
-            'applications_last_7_days': applications.filter(
-                application_date__gte=seven_days_ago
-            ).count(),
-            'status_breakdown': dict(
-                applications.values_list('status').annotate(count=Count('id'))
-            ),
-            'recent_status_breakdown': dict(
-                recent_applications.values_list('status').annotate(count=Count('id'))
-            ),
+            'applications_last_30_days': sum(row['last_30_days'] for row in rows),
+            'applications_last_7_days': sum(row['last_7_days'] for row in rows),
+            'status_breakdown': status_breakdown,
+            'recent_status_breakdown': {row['status']: row['last_30_days'] for row in rows},
             'interview_rate': 0.0,
             'offer_rate': 0.0,
             'response_rate': 0.0,
-            'ghosted_applications': applications.filter(
-                status='applied',
-                application_date__lte=thirty_days_ago
-            ).count()
+            'ghosted_applications': status_breakdown.get('applied', 0) - sum(row['not_ghosted'] for row in rows)
         }
         
         # Calculate rates if there are applications
         if total_applications > 0:
-            interviewed = applications.filter(
-                status__in=['interview_scheduled', 'interviewing']
-            ).count()
-            offers = applications.filter(status='offer_received').count()
-            responses = applications.exclude(status='applied').count()
+            interviewed = sum(status_breakdown.get(status, 0)
+                              for status in JobApplication.INTERVIEW_STATUSES)
+            offers = status_breakdown.get('offer_received', 0)
+            responses = total_applications - status_breakdown.get('applied', 0)
             
             stats.update({
                 'interview_rate': round(interviewed / total_applications * 100, 1),
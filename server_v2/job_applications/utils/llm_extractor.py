@@ -0,0 +1,373 @@
+"""LLM fallback extraction of job details from emails.
+
+When the regex patterns of the email parser find neither a position nor a
+company, a chat-completion model can be asked instead. Model calls are slow
+and billed per token, so ``LLMExtractor``:
+
+- packs up to ``batch_size`` emails into one prompt and asks for a result
+  per email;
+- sends prompts concurrently, with at most ``max_concurrency`` requests in
+  flight across all threads of the process;
+- gives every request a timeout, and stops calling the API for
+  ``reset_timeout`` seconds after ``failure_threshold`` consecutive failures;
+- caches results by content hash, so the same email is never sent twice.
+
+Failures never raise: the emails affected get empty results, which are not
+cached, and the regex result stands. Any OpenAI-compatible
+``/chat/completions`` endpoint can serve the requests, so
+``benchmarks.llm_stub`` stands in for the real API offline.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import requests
+from django.conf import settings
+
+from gmail.parse_cache import ParseCache, parse_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'BASE_URL': 'https://api.openai.com/v1',
+    'MODEL': 'gpt-3.5-turbo',
+    'BATCH_SIZE': 8,
+    'MAX_CONCURRENCY': 4,
+    'TIMEOUT': 20,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 60,
+}
+
+# Bump whenever the prompt or response handling changes, to invalidate cached results
+PROMPT_VERSION = '1'
+# Characters of each email sent to the model
+MAX_EMAIL_LENGTH = 4000
+
+FIELDS = ('position', 'company_name')
+
+SYSTEM_PROMPT = (
+    'You extract job application details from emails. Each email is given '
+    'between <email id="..."> and </email> tags. For every email, return the '
+    'job position and the company name exactly as written, or an empty string '
+    'when the email does not say. Reply with JSON only, in the form '
+    '{"results": [{"id": "<email id>", "position": "...", "company_name": "..."}]}.'
+)
+
+_EMAIL_TAG = re.compile(r'</?email\b', re.I)
+
+
+class CircuitBreaker:
+    """Stop calling a failing service for a while.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    refuses calls for ``reset_timeout`` seconds. Then one trial call is let
+    through; its success closes the breaker and its failure opens it again.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker
+        reset_timeout: Seconds the breaker stays open
+        clock: Monotonic time source, replaceable in tests
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        """The breaker state: closed, open or half-open."""
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if self.clock() - self._opened_at < self.reset_timeout:
+                return self.OPEN
+            return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; a half-open breaker allows one at a time."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self.clock() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the breaker."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker at the threshold."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("LLM extraction disabled for %ss after %d failures",
+                                   self.reset_timeout, self._failures)
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+
+class ExtractorStats:
+    """Thread-safe counters of LLM extractor activity."""
+
+    COUNTERS = ('emails', 'cache_hits', 'requests', 'failures', 'rejected',
+                'prompt_tokens', 'completion_tokens')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all counters."""
+        with self._lock:
+            for name in self.COUNTERS:
+                setattr(self, name, 0)
+
+    def add(self, **counts: int) -> None:
+        """Add ``counts`` to the named counters."""
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the counters as a dictionary."""
+        with self._lock:
+            return {name: getattr(self, name) for name in self.COUNTERS}
+
+
+def empty_result() -> Dict[str, str]:
+    """Return a result with every field empty."""
+    return {field: '' for field in FIELDS}
+
+
+class LLMExtractor:
+    """Extract job details from emails with a chat-completion model.
+
+    Args:
+        api_key: API key sent as a bearer token
+        base_url: API root, up to and excluding ``/chat/completions``
+        model: Model name
+        batch_size: Emails packed into one prompt
+        max_concurrency: Requests in flight at once, across threads
+        timeout: Seconds allowed per request, and for a free request slot
+        breaker: Circuit breaker guarding the API
+        transport: Callable taking (url, headers, payload, timeout) and
+            returning the decoded response; defaults to an HTTP POST
+    """
+
+    # Result cache; None disables caching
+    cache: Optional[ParseCache] = parse_cache
+
+    def __init__(
+        self,
+        api_key: str = '',
+        base_url: str = DEFAULT_SETTINGS['BASE_URL'],
+        model: str = DEFAULT_SETTINGS['MODEL'],
+        batch_size: int = DEFAULT_SETTINGS['BATCH_SIZE'],
+        max_concurrency: int = DEFAULT_SETTINGS['MAX_CONCURRENCY'],
+        timeout: float = DEFAULT_SETTINGS['TIMEOUT'],
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[Callable[[str, Dict, Dict, float], Dict]] = None,
+    ):
+        self.api_key = api_key
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport or self._post
+        self.stats = ExtractorStats()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_concurrency)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    @classmethod
+    def from_settings(cls, api_key: str) -> 'LLMExtractor':
+        """Build an extractor configured by the LLM_EXTRACTOR setting."""
+        config = {**DEFAULT_SETTINGS, **getattr(settings, 'LLM_EXTRACTOR', {})}
+        return cls(
+            api_key=api_key,
+            base_url=config['BASE_URL'],
+            model=config['MODEL'],
+            batch_size=config['BATCH_SIZE'],
+            max_concurrency=config['MAX_CONCURRENCY'],
+            timeout=config['TIMEOUT'],
+            breaker=CircuitBreaker(config['FAILURE_THRESHOLD'], config['RESET_TIMEOUT']),
+        )
+
+    @property
+    def cache_namespace(self) -> str:
+        return f'{__name__}:{self.model}:{PROMPT_VERSION}'
+
+    def extract(self, text: str) -> Dict[str, str]:
+        """Extract the position and company of one email.
+
+        Args:
+            text: Email text, subject included
+
+        Returns:
+            Dict with 'position' and 'company_name', empty where unknown
+        """
+        return self.extract_many([text])[0]
+
+    def extract_many(self, texts: Sequence[str]) -> List[Dict[str, str]]:
+        """Extract the position and company of many emails in few requests.
+
+        Cached emails are answered from the cache, and the rest are sent in
+        prompts of ``batch_size`` emails, concurrently.
+
+        Args:
+            texts: Email texts, subjects included
+
+        Returns:
+            One dict per text, in order, with 'position' and 'company_name'
+        """
+        results: List[Optional[Dict[str, str]]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            text = text[:MAX_EMAIL_LENGTH]
+            cached = self.cache.get(self.cache_namespace, (text,)) if self.cache is not None else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.setdefault(text, []).append(index)
+        self.stats.add(emails=len(texts), cache_hits=len(texts) - sum(map(len, pending.values())))
+
+        unique = list(pending)
+        batches = [unique[start:start + self.batch_size] for start in range(0, len(unique), self.batch_size)]
+        if len(batches) == 1:
+            answers = [self._complete(batches[0])]
+        elif batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                answers = list(executor.map(self._complete, batches))
+        else:
+            answers = []
+
+        for batch, answer in zip(batches, answers):
+            for position, text in enumerate(batch):
+                result = answer.get(str(position)) if answer is not None else None
+                if result is not None and self.cache is not None:
+                    self.cache.set(self.cache_namespace, (text,), result)
+                for index in pending[text]:
+                    results[index] = dict(result) if result is not None else empty_result()
+
+        return results  # type: ignore[return-value]
+
+    def _complete(self, texts: List[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """Send one prompt for ``texts``.
+
+        Returns:
+            Results keyed by the email's position in ``texts`` as a string,
+            or None if the request was not made or failed
+        """
+        # Fail fast while the breaker is open, without waiting for a slot
+        if self.breaker.state == CircuitBreaker.OPEN:
+            self.stats.add(rejected=1)
+            return None
+        if not self._slots.acquire(timeout=self.timeout):
+            logger.warning("No LLM request slot free within %ss", self.timeout)
+            self.stats.add(rejected=1)
+            return None
+        try:
+            if not self.breaker.allow():
+                self.stats.add(rejected=1)
+                return None
+            self.stats.add(requests=1)
+            response = self.transport(self.url, self._headers(), self._payload(texts), self.timeout)
+        except Exception as e:
+            logger.warning("LLM extraction request failed: %s", e)
+            self.stats.add(failures=1)
+            self.breaker.record_failure()
+            return None
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        usage = response.get('usage') or {}
+        self.stats.add(prompt_tokens=usage.get('prompt_tokens', 0),
+                       completion_tokens=usage.get('completion_tokens', 0))
+        try:
+            return self._read_results(response)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.warning("Unreadable LLM extraction response: %s", e)
+            self.stats.add(failures=1)
+            return None
+
+    def _headers(self) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'}
+
+    def _payload(self, texts: List[str]) -> Dict:
+        emails = '\n\n'.join(
+            f'<email id="{position}">\n{_EMAIL_TAG.sub("<", text)}\n</email>'
+            for position, text in enumerate(texts)
+        )
+        return {
+            'model': self.model,
+            'temperature': 0,
+            'response_format': {'type': 'json_object'},
+            'messages': [
+                {'role': 'system', 'content': SYSTEM_PROMPT},
+                {'role': 'user', 'content': emails},
+            ],
+        }
+
+    @staticmethod
+    def _read_results(response: Dict) -> Dict[str, Dict[str, str]]:
+        """Map email ids to results from a chat completion response."""
+        content = json.loads(response['choices'][0]['message']['content'])
+        results = {}
+        for item in content['results']:
+            results[str(item['id'])] = {
+                field: item.get(field).strip() if isinstance(item.get(field), str) else ''
+                for field in FIELDS
+            }
+        return results
+
+    def _post(self, url: str, headers: Dict, payload: Dict, timeout: float) -> Dict:
+        response = self._session.post(url, headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+_default_extractor: Optional[LLMExtractor] = None
+_default_lock = threading.Lock()
+
+
+def default_extractor() -> Optional[LLMExtractor]:
+    """Return the process-wide extractor, or None when the fallback is disabled.
+
+    The fallback is enabled by USE_OPENAI_FALLBACK together with an
+    OPENAI_API_KEY.
+    """
+    global _default_extractor
+    api_key = getattr(settings, 'OPENAI_API_KEY', None)
+    if not getattr(settings, 'USE_OPENAI_FALLBACK', False) or not api_key:
+        return None
+    with _default_lock:
+        if _default_extractor is None or _default_extractor.api_key != api_key:
+            _default_extractor = LLMExtractor.from_settings(api_key)
+        return _default_extractor
@@ -0,0 +1,115 @@
+"""Per-user cache of job application statistics.
+
+The statistics endpoint is loaded on every dashboard view, while a user's
+applications change far less often. ``StatsCache`` keeps each user's
+statistics in the configured Django cache under a versioned key:
+``invalidate`` bumps the user's version (from the JobApplication
+``post_save``/``post_delete`` signals), so the next read misses and
+recomputes, and stale entries simply expire. Entries also expire after
+CACHE_TIMEOUT seconds, as the statistics count date windows that move with
+time.
+
+When the cache backend is unreachable the statistics are computed on every
+call, and the backend is retried after a short interval.
+"""
+
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'job_applications:stats:'
+# How long to skip the cache after a backend error (seconds)
+CACHE_RETRY_INTERVAL = 30
+
+
+class StatsCache:
+    """Versioned per-user statistics cache.
+
+    Args:
+        cache_alias: Django cache to use
+        timeout: Seconds an entry lives; defaults to the CACHE_TIMEOUT setting
+    """
+
+    def __init__(self, cache_alias: str = 'default', timeout: Optional[int] = None):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self._disabled_until = 0.0
+
+    def get_or_compute(self, user_id: int, compute: Callable[[], Dict]) -> Dict:
+        """Return the user's cached statistics, computing them on a miss.
+
+        Args:
+            user_id: Primary key of the user
+            compute: Zero-argument callable producing the statistics
+
+        Returns:
+            Dict: The statistics
+        """
+        cache = self._cache
+        if cache is None:
+            return compute()
+        try:
+            key = f'{CACHE_KEY_PREFIX}{user_id}:{self._version(cache, user_id)}'
+            stats = cache.get(key)
+        except Exception as e:
+            self._failed(e)
+            return compute()
+
+        if stats is None:
+            stats = compute()
+            try:
+                cache.set(key, stats, self.timeout or getattr(settings, 'CACHE_TIMEOUT', 300))
+            except Exception as e:
+                self._failed(e)
+        return stats
+
+    def invalidate(self, user_id: int) -> None:
+        """Make the user's cached statistics stale."""
+        cache = self._cache
+        if cache is None:
+            return
+        try:
+            cache.incr(self._version_key(user_id))
+        except ValueError:
+            # No version yet: the next read starts a new one
+            pass
+        except Exception as e:
+            self._failed(e)
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f'{CACHE_KEY_PREFIX}{user_id}:version'
+
+    def _version(self, cache, user_id: int) -> int:
+        """Return the user's current version, starting one if there is none.
+
+        New versions start from the clock, so a version key lost to eviction
+        never comes back with a number that old entries were stored under.
+        """
+        key = self._version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    @property
+    def _cache(self):
+        """The Django cache, or None while it is unavailable."""
+        if time.monotonic() < self._disabled_until:
+            return None
+        from django.core.cache import caches
+        return caches[self.cache_alias]
+
+    def _failed(self, error: Exception) -> None:
+        logger.warning("Statistics cache unavailable, computing statistics uncached: %s", error)
+        self._disabled_until = time.monotonic() + CACHE_RETRY_INTERVAL
+
+
+# Cache of the statistics served by JobTracker
+stats_cache = StatsCache()
@@ -14,9 +14,10 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters import rest_framework as django_filters
 from django.utils import timezone
 from django.db.models import Q
-from rest_framework.exceptions import APIException as Http404
+from rest_framework.exceptions import APIException as Http404, ValidationError
 
 from .models import JobApplication, Communication
+from .pagination import ApplicationPagination
 from .serializers import JobApplicationSerializer, CommunicationSerializer
 from .utils.email_parser import EmailParser
 from .utils.job_tracker import JobTracker
@@ -28,6 +29,7 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
     """ViewSet for managing job applications."""
     permission_classes = [IsAuthenticated]
     serializer_class = JobApplicationSerializer
+    pagination_class = ApplicationPagination
     
     def get_queryset(self):
         """Get applications for the current user with optional filters."""
@@ -55,9 +57,13 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
                     Q(position__icontains=search)
                 )
             
-            # Sort by field
+            # Sort by field, then id so rows with equal values keep their order
             sort_by = self.request.query_params.get('sort', '-application_date')
-            return queryset.order_by(sort_by)
+            if sort_by.removeprefix('-') not in JobApplication.SORT_FIELDS:
+                raise ValidationError({
+                    'sort': f'Sort by one of: {", ".join(JobApplication.SORT_FIELDS)}, with "-" for descending'
+                })
+            return queryset.order_by(sort_by, '-id' if sort_by.startswith('-') else 'id')
         except Exception as e:
             logger.error(f"Error in get_queryset: {str(e)}")
             raise